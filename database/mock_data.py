@@ -2,10 +2,20 @@
 """
 管道信息模拟数据生成脚本
 生成真实可信的管道信息数据用于系统测试
+
+交互模式：python mock_data.py
+批量模式：python mock_data.py --rows 10000000 --workers 8 --method load-data --seed 42
+导出文件：python mock_data.py --rows 10000000 --output pipeline_info.parquet
 """
 
+import argparse
+import csv
 import mysql.connector
+import multiprocessing
 import random
+import sys
+import tempfile
+import time
 from datetime import datetime
 import os
 from dotenv import load_dotenv
@@ -69,6 +79,24 @@ LAYING_METHODS = [
     "悬吊", "综合管廊", "明挖", "暗挖"
 ]
 
+# 灾害类型权重分配（大部分地区无明显灾害）
+DISASTER_WEIGHTS = [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 10]  # "无明显灾害"权重更高
+
+# 建成年份分布（近年来建设较多）：2000年后权重3，1990年后权重2，更早为1
+YEARS = list(range(1980, 2024))
+YEAR_WEIGHTS = [3 if year >= 2000 else 2 if year >= 1990 else 1 for year in YEARS]
+
+# 写入的字段（id、created_at、updated_at由数据库生成）
+DATA_COLUMNS = (
+    "province", "city", "street", "road", "location", "disaster_type",
+    "geological_feature", "pipeline_type", "build_year", "laying_method"
+)
+
+INSERT_SQL = f"""
+INSERT INTO pipeline_info ({", ".join(DATA_COLUMNS)})
+VALUES ({", ".join(["%s"] * len(DATA_COLUMNS))})
+"""
+
 
 def create_connection():
     """创建数据库连接"""
@@ -108,6 +136,7 @@ def generate_mock_data(count=1000):
         
         print(f"开始生成{count}条模拟数据...")
         
+        batch = []
         for i in range(count):
             # 随机选择省份和对应城市
             province = random.choice(PROVINCES)
@@ -116,46 +145,27 @@ def generate_mock_data(count=1000):
             road = random.choice(ROADS)
             location = generate_location(street, road)
             
-            # 灾害类型权重分配（大部分地区无明显灾害）
-            disaster_weights = [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 10]  # "无明显灾害"权重更高
-            disaster_type = random.choices(DISASTER_TYPES, weights=disaster_weights)[0]
-            
+            disaster_type = random.choices(DISASTER_TYPES, weights=DISASTER_WEIGHTS)[0]
             geological_feature = random.choice(GEOLOGICAL_FEATURES)
             pipeline_type = random.choice(PIPELINE_TYPES)
-            
-            # 建成年份分布（近年来建设较多）
-            year_weights = []
-            for year in range(1980, 2024):
-                if year >= 2000:
-                    year_weights.append(3)  # 2000年后权重更高
-                elif year >= 1990:
-                    year_weights.append(2)
-                else:
-                    year_weights.append(1)
-            
-            build_year = random.choices(range(1980, 2024), weights=year_weights)[0]
+            build_year = random.choices(YEARS, weights=YEAR_WEIGHTS)[0]
             laying_method = random.choice(LAYING_METHODS)
             
-            # 插入数据
-            query = """
-            INSERT INTO pipeline_info 
-            (province, city, street, road, location, disaster_type, geological_feature, 
-            pipeline_type, build_year, laying_method)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            values = (
+            batch.append((
                 province, city, street, road, location, disaster_type,
                 geological_feature, pipeline_type, build_year, laying_method
-            )
+            ))
             
-            cursor.execute(query, values)
-            
-            # 每100条提交一次
-            if (i + 1) % 100 == 0:
+            # 每1000条以多行INSERT写入并提交一次
+            if len(batch) >= 1000:
+                cursor.executemany(INSERT_SQL, batch)
                 connection.commit()
+                batch = []
                 print(f"已生成 {i + 1} 条数据")
         
+        if batch:
+            cursor.executemany(INSERT_SQL, batch)
+        
         # 最终提交
         connection.commit()
         print(f"成功生成并插入 {count} 条模拟数据")
@@ -179,8 +189,321 @@ def generate_mock_data(count=1000):
             print("数据库连接已关闭")
 
 
+# ==================== 批量生成与加载 ====================
+
+LOCATION_TEMPLATES = 6
+
+
+def generate_rows(count, seed, chunk_index=0, start_id=None):
+    """
+    以向量化方式生成一批模拟数据（需要numpy）
+    
+    随机数生成器由 (seed, chunk_index) 确定，同一种子下各批数据与并行进程数无关、可重复生成
+    
+    Args:
+        count: 行数
+        seed: 随机种子
+        chunk_index: 批次序号
+        start_id: 指定时在每行开头加入从该值开始的id（导出文件使用）
+        
+    Returns:
+        list: 行元组列表，字段顺序同DATA_COLUMNS
+    """
+    import numpy as np
+    
+    rng = np.random.default_rng([seed, chunk_index])
+    
+    province_index = rng.integers(0, len(PROVINCES), count)
+    city_counts = np.array([len(CITIES[province]) for province in PROVINCES])
+    city_index = (rng.random(count) * city_counts[province_index]).astype(np.int64)
+    city_offsets = np.concatenate(([0], np.cumsum(city_counts)[:-1]))
+    city_table = np.array([city for province in PROVINCES for city in CITIES[province]], dtype=object)
+    
+    provinces = np.array(PROVINCES, dtype=object)[province_index]
+    cities = city_table[city_offsets[province_index] + city_index]
+    streets = np.array(STREETS, dtype=object)[rng.integers(0, len(STREETS), count)]
+    roads = np.array(ROADS, dtype=object)[rng.integers(0, len(ROADS), count)]
+    
+    disaster_p = np.array(DISASTER_WEIGHTS, dtype=float) / sum(DISASTER_WEIGHTS)
+    disasters = np.array(DISASTER_TYPES, dtype=object)[rng.choice(len(DISASTER_TYPES), count, p=disaster_p)]
+    geological = np.array(GEOLOGICAL_FEATURES, dtype=object)[rng.integers(0, len(GEOLOGICAL_FEATURES), count)]
+    pipeline_types = np.array(PIPELINE_TYPES, dtype=object)[rng.integers(0, len(PIPELINE_TYPES), count)]
+    year_p = np.array(YEAR_WEIGHTS, dtype=float) / sum(YEAR_WEIGHTS)
+    build_years = np.array(YEARS)[rng.choice(len(YEARS), count, p=year_p)]
+    laying = np.array(LAYING_METHODS, dtype=object)[rng.integers(0, len(LAYING_METHODS), count)]
+    
+    # 具体位置：模板与数字随机量向量化生成，最后逐行格式化
+    templates = rng.integers(0, LOCATION_TEMPLATES, count)
+    distances = rng.integers(10, 501, count)
+    numbers = rng.integers(1, 1000, count)
+    kilometers = rng.integers(1, 51, count)
+    directions = ("北", "南", "东", "西")
+    locations = [
+        f"{street}与{road}交叉口{directions[template]}侧{distance}米" if template < 4
+        else f"{street}{number}号附近" if template == 4
+        else f"{road}沿线{kilometer}公里处"
+        for street, road, template, distance, number, kilometer in zip(
+            streets, roads, templates.tolist(), distances.tolist(), numbers.tolist(), kilometers.tolist()
+        )
+    ]
+    
+    columns = [
+        provinces, cities, streets, roads, locations, disasters,
+        geological, pipeline_types, build_years.tolist(), laying
+    ]
+    if start_id is not None:
+        columns.insert(0, range(start_id, start_id + count))
+    return list(zip(*columns))
+
+
+def plan_chunks(total, chunk_size):
+    """按批次大小切分，返回 (批次序号, 行数, 起始id)"""
+    return [
+        (index, min(chunk_size, total - start), start + 1)
+        for index, start in enumerate(range(0, total, chunk_size))
+    ]
+
+
+def insert_batches(connection, rows, batch_size):
+    """以executemany多行INSERT分批写入，每批提交一次"""
+    cursor = connection.cursor()
+    try:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(INSERT_SQL, rows[start:start + batch_size])
+            connection.commit()
+    finally:
+        cursor.close()
+
+
+def load_data_infile(connection, rows):
+    """写入临时CSV后以 LOAD DATA LOCAL INFILE 导入（需要服务端开启 local_infile）"""
+    handle = tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8", newline="", delete=False)
+    try:
+        with handle:
+            csv.writer(handle, lineterminator="\n").writerows(rows)
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE pipeline_info CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                f"LINES TERMINATED BY '\\n' ({', '.join(DATA_COLUMNS)})",
+                (handle.name,)
+            )
+            connection.commit()
+        finally:
+            cursor.close()
+    finally:
+        os.unlink(handle.name)
+
+
+def _load_chunk(task):
+    """工作进程：生成一批数据并写入数据库，返回行数"""
+    (chunk_index, count, _), seed, method, batch_size = task
+    rows = generate_rows(count, seed, chunk_index)
+    connection = mysql.connector.connect(**DB_CONFIG, allow_local_infile=(method == "load-data"))
+    try:
+        cursor = connection.cursor()
+        # 批量导入期间跳过唯一性与外键检查
+        cursor.execute("SET unique_checks = 0, foreign_key_checks = 0")
+        cursor.close()
+        if method == "load-data":
+            load_data_infile(connection, rows)
+        else:
+            insert_batches(connection, rows, batch_size)
+    finally:
+        connection.close()
+    return count
+
+
+def drop_secondary_indexes(cursor):
+    """
+    删除pipeline_info的二级索引，返回重建所需的索引定义
+    
+    InnoDB不支持 ALTER TABLE ... DISABLE KEYS，批量导入期间改为先删除、导入完成后一次性重建
+    """
+    cursor.execute("SHOW INDEX FROM pipeline_info")
+    names = [description[0] for description in cursor.description]
+    indexes = {}
+    for row in cursor.fetchall():
+        index = dict(zip(names, row))
+        if index["Key_name"] == "PRIMARY":
+            continue
+        entry = indexes.setdefault(index["Key_name"], {"unique": not int(index["Non_unique"]), "columns": []})
+        entry["columns"].append((int(index["Seq_in_index"]), index["Column_name"]))
+    
+    definitions = []
+    for name, entry in indexes.items():
+        columns = ", ".join(f"`{column}`" for _, column in sorted(entry["columns"]))
+        definitions.append(f"ADD {'UNIQUE ' if entry['unique'] else ''}INDEX `{name}` ({columns})")
+    if indexes:
+        cursor.execute("ALTER TABLE pipeline_info " + ", ".join(f"DROP INDEX `{name}`" for name in indexes))
+        print(f"已暂时删除二级索引: {', '.join(indexes)}")
+    return definitions
+
+
+def restore_indexes(cursor, definitions):
+    """一次性重建二级索引"""
+    if not definitions:
+        return
+    start_time = time.time()
+    print("正在重建二级索引...")
+    cursor.execute("ALTER TABLE pipeline_info " + ", ".join(definitions))
+    print(f"二级索引重建完成，耗时 {time.time() - start_time:.1f} 秒")
+
+
+def _report(done, total, start_time):
+    elapsed = time.time() - start_time
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"已写入 {done}/{total} 条，{rate:,.0f} 行/秒")
+
+
+def bulk_load(total, workers=4, method="executemany", seed=42, chunk_size=100000,
+              batch_size=5000, defer_indexes=True, truncate=False):
+    """
+    并行批量生成并写入模拟数据
+    
+    Args:
+        total: 总行数
+        workers: 工作进程数
+        method: executemany（多行INSERT）或 load-data（CSV + LOAD DATA LOCAL INFILE）
+        seed: 随机种子
+        chunk_size: 每个工作任务生成的行数
+        batch_size: executemany 每批行数
+        defer_indexes: 导入期间删除二级索引，完成后重建
+        truncate: 导入前清空表
+        
+    Returns:
+        bool: 是否成功
+    """
+    connection = create_connection()
+    if not connection:
+        return False
+    
+    cursor = connection.cursor()
+    definitions = []
+    success = False
+    start_time = time.time()
+    try:
+        if truncate:
+            cursor.execute("TRUNCATE TABLE pipeline_info")
+        if defer_indexes:
+            definitions = drop_secondary_indexes(cursor)
+        
+        print(f"开始生成并写入{total}条模拟数据（{workers}个进程，方式: {method}，种子: {seed}）...")
+        tasks = [(chunk, seed, method, batch_size) for chunk in plan_chunks(total, chunk_size)]
+        done = 0
+        with multiprocessing.Pool(workers) as pool:
+            for count in pool.imap_unordered(_load_chunk, tasks):
+                done += count
+                _report(done, total, start_time)
+        load_time = time.time() - start_time
+        print(f"数据写入完成: {total} 条，耗时 {load_time:.1f} 秒，{total / max(load_time, 1e-9):,.0f} 行/秒")
+        success = True
+        return True
+    
+    except mysql.connector.Error as e:
+        print(f"批量导入失败: {e}")
+        return False
+    
+    finally:
+        try:
+            restore_indexes(cursor, definitions)
+        except mysql.connector.Error as e:
+            print(f"重建二级索引失败，请手动执行: ALTER TABLE pipeline_info {', '.join(definitions)}; 错误: {e}")
+        if success:
+            total_time = time.time() - start_time
+            print(f"总耗时 {total_time:.1f} 秒（含索引重建），{total / max(total_time, 1e-9):,.0f} 行/秒")
+        cursor.close()
+        connection.close()
+
+
+def _generate_chunk(task):
+    """工作进程：生成一批带id的数据"""
+    (chunk_index, count, start_id), seed = task
+    return generate_rows(count, seed, chunk_index, start_id)
+
+
+def export_dataset(total, path, workers=4, seed=42, chunk_size=100000):
+    """
+    并行生成数据集并按批次顺序写入本地CSV或Parquet文件（Parquet需要pyarrow），供离线基准测试使用
+    
+    Args:
+        total: 总行数
+        path: 输出路径，按扩展名 .csv / .parquet 选择格式
+        workers: 工作进程数
+        seed: 随机种子
+        chunk_size: 每批行数（Parquet中每批为一个行组）
+    """
+    columns = ("id",) + DATA_COLUMNS
+    parquet = path.endswith(".parquet")
+    if parquet:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([
+            (name, pa.int64() if name in ("id", "build_year") else pa.string()) for name in columns
+        ])
+        writer = pq.ParquetWriter(path, schema, compression="zstd")
+    else:
+        handle = open(path, "w", encoding="utf-8", newline="")
+        writer = csv.writer(handle, lineterminator="\n")
+        writer.writerow(columns)
+    
+    print(f"开始生成{total}条模拟数据到 {path}（{workers}个进程，种子: {seed}）...")
+    start_time = time.time()
+    done = 0
+    try:
+        tasks = [(chunk, seed) for chunk in plan_chunks(total, chunk_size)]
+        with multiprocessing.Pool(workers) as pool:
+            # 按批次顺序写入，保证同一种子下文件内容一致
+            for rows in pool.imap(_generate_chunk, tasks):
+                if parquet:
+                    data = list(zip(*rows))
+                    writer.write_table(pa.table(
+                        {name: list(values) for name, values in zip(columns, data)}, schema=schema
+                    ))
+                else:
+                    writer.writerows(rows)
+                done += len(rows)
+                _report(done, total, start_time)
+    finally:
+        if parquet:
+            writer.close()
+        else:
+            handle.close()
+    elapsed = time.time() - start_time
+    print(f"导出完成: {done} 条，耗时 {elapsed:.1f} 秒，{done / max(elapsed, 1e-9):,.0f} 行/秒")
+
+
+def parse_args(argv):
+    """解析批量模式命令行参数"""
+    parser = argparse.ArgumentParser(description="管道信息模拟数据生成器（不带参数时进入交互模式）")
+    parser.add_argument("--rows", type=int, required=True, help="生成的数据条数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="并行工作进程数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子，相同种子生成相同的数据")
+    parser.add_argument("--method", choices=["executemany", "load-data"], default="executemany",
+                        help="写入方式：多行INSERT 或 CSV + LOAD DATA LOCAL INFILE")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="每个工作任务生成的行数")
+    parser.add_argument("--batch-size", type=int, default=5000, help="executemany 每批行数")
+    parser.add_argument("--keep-indexes", action="store_true", help="导入期间保留二级索引（默认先删除、导入后重建）")
+    parser.add_argument("--truncate", action="store_true", help="导入前清空 pipeline_info")
+    parser.add_argument("--output", help="只生成数据并写入本地 .csv / .parquet 文件，不连接数据库")
+    return parser.parse_args(argv)
+
+
 def main():
     """主函数"""
+    if len(sys.argv) > 1:
+        args = parse_args(sys.argv[1:])
+        if args.output:
+            export_dataset(args.rows, args.output, args.workers, args.seed, args.chunk_size)
+            return
+        success = bulk_load(
+            args.rows, args.workers, args.method, args.seed, args.chunk_size,
+            args.batch_size, not args.keep_indexes, args.truncate
+        )
+        print("数据生成完成！" if success else "数据生成失败！")
+        return
+    
     print("=== 管道信息模拟数据生成器 ===")
     
     # 检查数据库连接
@@ -0,0 +1,88 @@
+"""
+响应编码模块
+提供快速JSON编码与按大小阈值的gzip/brotli压缩
+"""
+
+import gzip
+import json
+from typing import Any, Optional
+from fastapi.responses import Response
+from config import config
+
+# 可选依赖：orjson编码速度明显快于标准库json，brotli压缩率更高
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 可选依赖
+    brotli = None
+
+
+def encode_json(payload: Any) -> bytes:
+    """
+    将对象编码为紧凑的UTF-8 JSON
+
+    Args:
+        payload: 待编码对象
+
+    Returns:
+        bytes: JSON字节串
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=str)
+    return json.dumps(
+        payload, ensure_ascii=False, separators=(",", ":"), default=str
+    ).encode("utf-8")
+
+
+def _choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """根据Accept-Encoding选择压缩算法，优先brotli"""
+    if not accept_encoding:
+        return None
+    accepted = {item.split(";")[0].strip().lower() for item in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def json_response(
+    payload: Any,
+    accept_encoding: Optional[str] = None,
+    status_code: int = 200
+) -> Response:
+    """
+    构建JSON响应，超过RESPONSE_COMPRESSION_MIN_SIZE字节时按客户端支持压缩
+
+    Args:
+        payload: 响应对象
+        accept_encoding: 请求头Accept-Encoding
+        status_code: HTTP状态码
+
+    Returns:
+        Response: 已编码(及压缩)的响应
+    """
+    body = encode_json(payload)
+    headers = {"Vary": "Accept-Encoding"}
+
+    encoding = (
+        _choose_encoding(accept_encoding)
+        if len(body) >= config.RESPONSE_COMPRESSION_MIN_SIZE else None
+    )
+    if encoding == "br":
+        body = brotli.compress(body, quality=4)
+        headers["Content-Encoding"] = "br"
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers
+    )
@@ -3,12 +3,25 @@ API路由定义
 定义所有的HTTP API端点
 """
 
+import asyncio
+import json
 import logging
-from typing import Dict, Any
-from fastapi import APIRouter, HTTPException, Query, Body
-from fastapi.responses import JSONResponse
-from ..models.schemas import QueryRequest, QueryResponse, ErrorResponse
-from ..services.sql_generator import SQLGenerator
+import secrets
+import time
+from contextlib import nullcontext
+from typing import Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Query, Body, Depends, Header, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from ..models.schemas import (
+    QueryRequest, QueryResponse, ErrorResponse, ExportRequest, BatchQueryRequest
+)
+from ..services.database_service import QueryGuardError
+from ..services.export_service import EXPORT_FORMATS
+from ..services.metrics import StageTimings, registry
+from ..services.profiler import ProfilerBusyError, SamplingProfiler, profile_call
+from ..services.sql_generator import SQLGenerator, QueryError
+from .encoding import json_response
+from config import config
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -20,12 +33,26 @@ router = APIRouter()
 # 初始化SQL生成器
 try:
     sql_generator = SQLGenerator()
+    registry.register_collector(sql_generator.collect_metrics)
     logger.info("API路由初始化完成")
 except Exception as e:
     logger.error(f"API路由初始化失败: {e}")
     sql_generator = None
 
 
+def verify_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """
+    管理接口鉴权
+    
+    配置了ADMIN_TOKEN时要求请求头X-Admin-Token一致；未配置时仅在调试模式下开放
+    """
+    if config.ADMIN_TOKEN:
+        if not x_admin_token or not secrets.compare_digest(x_admin_token, config.ADMIN_TOKEN):
+            raise HTTPException(status_code=403, detail="无权访问管理接口")
+    elif not config.DEBUG:
+        raise HTTPException(status_code=403, detail="管理接口未启用，请配置ADMIN_TOKEN")
+
+
 @router.get("/health")
 async def health_check():
     """健康检查接口"""
@@ -39,20 +66,54 @@ async def get_database_info():
         if not sql_generator:
             raise HTTPException(status_code=500, detail="服务未正确初始化")
         
-        info = sql_generator.get_database_info()
+        info = await sql_generator.get_database_info_async()
         return info
     except Exception as e:
         logger.error(f"获取数据库信息失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/database/pool")
+async def get_pool_status():
+    """获取数据库连接池状态接口"""
+    try:
+        if not sql_generator:
+            raise HTTPException(status_code=500, detail="服务未正确初始化")
+        
+        return sql_generator.db_service.get_pool_status()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"获取连接池状态失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/query", response_model=QueryResponse)
-async def process_query(request: QueryRequest):
+async def process_query(
+    request: QueryRequest,
+    http_request: Request,
+    format: str = Query(default="json", pattern="^(json|columnar)$", description="响应格式"),
+    orient: str = Query(default="rows", pattern="^(rows|columns)$", description="列式格式的组织方式"),
+    timings: bool = Query(default=False, description="是否在响应中附带各阶段耗时(毫秒)"),
+    x_profile: Optional[str] = Header(default=None),
+    x_admin_token: Optional[str] = Header(default=None)
+):
     """
     处理自然语言查询请求
     
+    format=columnar 时返回列式结构：columns 只出现一次，orient=rows 时 rows 为行数组，
+    orient=columns 时 data 为按列组织的向量；较大的响应按 Accept-Encoding 压缩。
+    各阶段耗时写入 Server-Timing 响应头，timings=true 时同时附带在响应体中。
+    开启PROFILING_ENABLED时，请求头 X-Profile: 1 (需管理接口权限) 以cProfile剖析查询处理，
+    profile 字段返回按累计耗时排序的函数
+    
     Args:
         request: 查询请求对象
+        format: 响应格式
+        orient: 列式格式的组织方式
+        timings: 是否在响应中附带各阶段耗时
+        x_profile: 请求头X-Profile
+        x_admin_token: 请求头X-Admin-Token
         
     Returns:
         QueryResponse: 查询响应
@@ -61,29 +122,203 @@ async def process_query(request: QueryRequest):
         if not sql_generator:
             raise HTTPException(status_code=500, detail="服务未正确初始化")
         
-        # 验证问题
-        validation = sql_generator.validate_question(request.question)
+        # 验证问题（续页请求只携带令牌）
+        validation = (
+            sql_generator.validate_question(request.question)
+            if request.question else {"is_valid": True}
+        )
         if not validation["is_valid"]:
             raise HTTPException(
                 status_code=400, 
                 detail=f"问题验证失败: {', '.join(validation['errors'])}"
             )
         
-        # 处理查询
-        response = sql_generator.process_query(request)
+        profiling = config.PROFILING_ENABLED and x_profile == "1"
+        if profiling:
+            verify_admin(x_admin_token)
         
-        if response.status == "error":
-            raise HTTPException(status_code=400, detail=response.message)
+        stage_timings = StageTimings()
+        accept_encoding = http_request.headers.get("accept-encoding")
         
-        return response
+        # 列式格式：跳过逐行字典与pydantic校验，直接编码
+        if format == "columnar":
+            if request.cursor or request.page_size:
+                raise HTTPException(status_code=400, detail="列式格式暂不支持分页查询")
+            with profile_call(config.PROFILE_TOP_FUNCTIONS) if profiling else nullcontext() as call_profile:
+                columnar = await sql_generator.process_query_columnar_async(
+                    request, orient, stage_timings, timings
+                )
+            if columnar["status"] == "error":
+                raise HTTPException(status_code=400, detail=columnar["message"])
+            if call_profile is not None:
+                columnar["profile"] = call_profile.top
+            with stage_timings.stage("serialize"):
+                http_response = json_response(columnar, accept_encoding)
+        else:
+            # 处理查询
+            with profile_call(config.PROFILE_TOP_FUNCTIONS) if profiling else nullcontext() as call_profile:
+                response = await sql_generator.process_query_async(request, stage_timings, timings)
+            
+            if response.status == "error":
+                raise HTTPException(status_code=400, detail=response.message)
+            if call_profile is not None:
+                response.profile = call_profile.top
+            
+            with stage_timings.stage("serialize"):
+                http_response = json_response(response.model_dump(), accept_encoding)
+        
+        http_response.headers["Server-Timing"] = stage_timings.server_timing()
+        return http_response
         
     except HTTPException:
         raise
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"查询处理异常: {e}")
         raise HTTPException(status_code=500, detail=f"服务器内部错误: {str(e)}")
 
 
+@router.post("/query/stream")
+async def stream_query(request: QueryRequest):
+    """
+    流式处理自然语言查询请求
+    
+    以NDJSON格式(application/x-ndjson)逐帧返回：header帧(sql, columns, plan)、
+    rows帧(行数组批次)、trailer帧(count, timings)；结果由服务端游标分批读取，
+    行数上限为STREAM_MAX_ROWS
+    
+    Args:
+        request: 查询请求对象
+        
+    Returns:
+        StreamingResponse: NDJSON流
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    if not request.question:
+        raise HTTPException(status_code=400, detail="缺少问题参数")
+    
+    validation = sql_generator.validate_question(request.question)
+    if not validation["is_valid"]:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"问题验证失败: {', '.join(validation['errors'])}"
+        )
+    
+    started_at = time.time()
+    try:
+        sql, source = await sql_generator.prepare_sql(request.question.strip())
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except Exception as e:
+        logger.error(f"流式查询处理异常: {e}")
+        raise HTTPException(status_code=500, detail=f"服务器内部错误: {str(e)}")
+    
+    optimized_sql = sql_generator.llm_service.optimize_sql(sql, limit=config.STREAM_MAX_ROWS)
+    try:
+        plan = await sql_generator.db_service.check_cost_async(optimized_sql, streaming=True)
+    except QueryGuardError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    return StreamingResponse(
+        sql_generator.stream_query_results(optimized_sql, started_at, plan, source),
+        media_type="application/x-ndjson",
+        headers={"X-Query-Source": source}
+    )
+
+
+@router.post("/query/batch")
+async def batch_query(request: BatchQueryRequest):
+    """
+    批量处理自然语言查询
+    
+    相同问题只处理一次，各问题并行处理；以NDJSON格式按完成顺序返回：header帧(total, unique)、
+    每个问题一个result帧(index为问题在请求中的序号，其余字段同 /query 响应)、summary帧
+    
+    Args:
+        request: 批量查询请求对象
+        
+    Returns:
+        StreamingResponse: NDJSON流
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    if len(request.questions) > config.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单批最多 {config.BATCH_MAX_QUESTIONS} 个问题"
+        )
+    
+    return StreamingResponse(
+        sql_generator.process_batch(request.questions, request.concurrency),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.post("/query/export")
+async def export_query(request: ExportRequest):
+    """
+    导出查询结果
+    
+    根据问题或已生成的SQL导出完整结果，格式为 csv、arrow(Arrow IPC流) 或 parquet；
+    结果按批从服务端游标读取并转换为带类型的列，内存占用与单批大小相关
+    
+    Args:
+        request: 导出请求对象
+        
+    Returns:
+        StreamingResponse: 导出文件流
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    if not sql_generator.export_service.is_format_available(request.format):
+        raise HTTPException(status_code=501, detail=f"服务器未安装pyarrow，无法导出{request.format}格式")
+    
+    try:
+        if request.sql:
+            sql, source = request.sql.strip().rstrip(";"), "sql"
+            if not sql_generator.db_service.validate_sql(sql):
+                raise HTTPException(status_code=400, detail="查询不符合安全要求")
+        else:
+            validation = sql_generator.validate_question(request.question)
+            if not validation["is_valid"]:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"问题验证失败: {', '.join(validation['errors'])}"
+                )
+            sql, source = await sql_generator.prepare_sql(request.question.strip())
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"导出处理异常: {e}")
+        raise HTTPException(status_code=500, detail=f"服务器内部错误: {str(e)}")
+    
+    optimized_sql = sql_generator.llm_service.optimize_sql(sql, limit=config.EXPORT_MAX_ROWS)
+    try:
+        plan = await sql_generator.db_service.check_cost_async(optimized_sql, streaming=True)
+    except QueryGuardError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    
+    media_type, extension = EXPORT_FORMATS[request.format]
+    return StreamingResponse(
+        sql_generator.export_service.export_async(optimized_sql, request.format),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="pipeline_export.{extension}"',
+            "X-Query-Source": source,
+            # 执行计划汇总（不含各表访问明细）
+            "X-Query-Plan": json.dumps({
+                key: plan[key] for key in ("estimated_rows", "full_scan", "max_execution_time_ms")
+            })
+        }
+    )
+
+
 @router.get("/suggestions")
 async def get_query_suggestions(q: str = Query(default="", description="部分查询文本")):
     """
@@ -146,6 +381,7 @@ async def validate_question(request: Dict[str, str] = Body(...)):
         if not question:
             raise HTTPException(status_code=400, detail="缺少问题参数")
         
+        await sql_generator.refresh_entity_index()
         validation = sql_generator.validate_question(question)
         return validation
         
@@ -168,7 +404,7 @@ async def get_database_stats():
         if not sql_generator:
             raise HTTPException(status_code=500, detail="服务未正确初始化")
         
-        info = sql_generator.get_database_info()
+        info = await sql_generator.get_database_info_async()
         if info["status"] != "connected":
             raise HTTPException(status_code=503, detail=info["message"])
         
@@ -181,5 +417,212 @@ async def get_database_stats():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/admin/cache/sql", dependencies=[Depends(verify_admin)])
+async def get_sql_cache(limit: int = Query(default=100, ge=0, le=10000, description="返回的条目数")):
+    """
+    查看问题->SQL缓存
+    
+    Args:
+        limit: 返回的条目数
+        
+    Returns:
+        Dict: 缓存统计与条目
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    return sql_generator.llm_service.get_sql_cache_info(limit)
+
+
+@router.delete("/admin/cache/sql", dependencies=[Depends(verify_admin)])
+async def purge_sql_cache(question: Optional[str] = Query(default=None, description="只清除该问题的缓存")):
+    """
+    清除问题->SQL缓存
+    
+    Args:
+        question: 指定问题时只清除该问题，否则清空全部
+        
+    Returns:
+        Dict: 清除的条目数
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    removed = sql_generator.llm_service.purge_sql_cache(question)
+    return {"removed": removed}
+
+
+@router.get("/admin/cache/result", dependencies=[Depends(verify_admin)])
+async def get_result_cache():
+    """
+    查看查询结果缓存
+    
+    Returns:
+        Dict: 缓存统计与数据版本
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    return sql_generator.db_service.get_result_cache_info()
+
+
+@router.delete("/admin/cache/result", dependencies=[Depends(verify_admin)])
+async def purge_result_cache():
+    """
+    清空查询结果缓存
+    
+    Returns:
+        Dict: 清除的条目数
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    return {"removed": sql_generator.db_service.purge_result_cache()}
+
+
+@router.get("/admin/llm", dependencies=[Depends(verify_admin)])
+async def get_llm_status():
+    """
+    查看大模型调用治理状态
+    
+    Returns:
+        Dict: 熔断器状态、延迟分位数与调用统计
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    return sql_generator.llm_service.gateway.get_status()
+
+
+@router.get("/admin/coalescing", dependencies=[Depends(verify_admin)])
+async def get_coalescing_stats():
+    """
+    查看请求合并统计
+    
+    Returns:
+        Dict: 大模型调用与数据库执行的实际次数与节省次数
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    return sql_generator.get_coalescing_stats()
+
+
+@router.get("/admin/workload", dependencies=[Depends(verify_admin)])
+async def get_workload(limit: int = Query(default=20, ge=1, le=200, description="返回的查询摘要数")):
+    """
+    查看查询负载汇总
+    
+    Returns:
+        Dict: 按总耗时排序的前N个查询摘要(字面量替换为占位符)：执行次数、总/平均/最小/最大/p95耗时、
+        返回行数、慢查询与失败(含超时)次数、最近执行时间及谓词、GROUP BY、ORDER BY字段集合
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    return sql_generator.db_service.workload.get_summary(limit)
+
+
+@router.get("/admin/entity-index", dependencies=[Depends(verify_admin)])
+async def get_entity_index():
+    """
+    查看实体词典索引状态
+    
+    Returns:
+        Dict: 各字段取值数、词条数与加载统计
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    return sql_generator.entity_index.get_status()
+
+
+@router.post("/admin/entity-index/refresh", dependencies=[Depends(verify_admin)])
+async def refresh_entity_index():
+    """
+    全量重建实体词典索引
+    
+    Returns:
+        Dict: 重建后的索引状态
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    await sql_generator.db_service.run_in_executor(sql_generator.entity_index.refresh, True)
+    return sql_generator.entity_index.get_status()
+
+
+@router.get("/admin/cube", dependencies=[Depends(verify_admin)])
+async def get_cube_status():
+    """
+    查看聚合立方体状态
+    
+    Returns:
+        Dict: 明细单元数、已物化的分组、数据版本与命中统计
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    return sql_generator.cube.get_status()
+
+
+@router.post("/admin/cube/rebuild", dependencies=[Depends(verify_admin)])
+async def rebuild_cube():
+    """
+    全量重建聚合立方体
+    
+    Returns:
+        Dict: 重建后的立方体状态
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    try:
+        await sql_generator.db_service.run_in_executor(sql_generator.cube.rebuild)
+    except Exception as e:
+        logger.error(f"聚合立方体重建失败: {e}")
+        raise HTTPException(status_code=500, detail=f"聚合立方体重建失败: {str(e)}")
+    return sql_generator.cube.get_status()
+
+
+@router.get("/admin/replica", dependencies=[Depends(verify_admin)])
+async def get_replica_status():
+    """
+    查看列式副本状态
+    
+    Returns:
+        Dict: 行数、内存占用、字典大小、同步水位与复核统计
+    """
+    if not sql_generator:
+        raise HTTPException(status_code=500, detail="服务未正确初始化")
+    
+    return sql_generator.replica.get_status()
+
+
+@router.get("/admin/profile", dependencies=[Depends(verify_admin)])
+async def profile_worker(
+    duration: float = Query(default=10, gt=0, le=config.PROFILE_MAX_DURATION, description="采样时长(秒)"),
+    interval: float = Query(default=config.PROFILE_SAMPLE_INTERVAL, ge=0.001, le=1, description="采样间隔(秒)")
+):
+    """
+    对当前工作进程采样剖析
+    
+    在独立线程中按间隔读取所有线程的调用栈，返回折叠栈文本(每行 "帧;帧;... 次数")，
+    可直接交给 flamegraph.pl 或 speedscope 生成火焰图；需开启PROFILING_ENABLED
+    
+    Returns:
+        PlainTextResponse: 折叠栈文本，X-Profile-Samples 为采样次数
+    """
+    if not config.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="性能剖析未开启，请配置PROFILING_ENABLED")
+    
+    profiler = SamplingProfiler(interval)
+    try:
+        collapsed = await asyncio.to_thread(profiler.run, duration)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(collapsed, headers={"X-Profile-Samples": str(profiler.samples)})
+
+
 # 注意：异常处理器应该在主应用中定义，而不是在路由中
 # 这里移除了错误的异常处理器定义 
\ No newline at end of file
@@ -6,6 +6,8 @@
 from .schemas import (
     QueryRequest,
     QueryResponse,
+    ExportRequest,
+    BatchQueryRequest,
     PipelineInfo,
     DatabaseStats
 )
@@ -13,6 +15,8 @@ from .schemas import (
 __all__ = [
     "QueryRequest",
     "QueryResponse", 
+    "ExportRequest",
+    "BatchQueryRequest",
     "PipelineInfo",
     "DatabaseStats"
 ] 
\ No newline at end of file
@@ -4,13 +4,22 @@
 """
 
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
 
 
 class QueryRequest(BaseModel):
     """查询请求模型"""
-    question: str = Field(..., description="用户查询问题", min_length=1, max_length=500)
+    question: Optional[str] = Field(None, description="用户查询问题", min_length=1, max_length=500)
+    page_size: Optional[int] = Field(None, description="分页查询的每页行数", ge=1, le=10000)
+    cursor: Optional[str] = Field(None, description="上一页返回的续页令牌")
+    
+    @model_validator(mode="after")
+    def check_question_or_cursor(self):
+        """首页查询需要问题，续页查询只需令牌"""
+        if not self.question and not self.cursor:
+            raise ValueError("question 与 cursor 至少需要提供一个")
+        return self
     
     class Config:
         json_schema_extra = {
@@ -20,6 +29,45 @@ class QueryRequest(BaseModel):
         }
 
 
+class ExportRequest(BaseModel):
+    """导出请求模型"""
+    question: Optional[str] = Field(None, description="用户查询问题", min_length=1, max_length=500)
+    sql: Optional[str] = Field(None, description="已生成的SQL语句", min_length=1, max_length=5000)
+    format: str = Field("csv", description="导出格式", pattern="^(csv|arrow|parquet)$")
+    
+    @model_validator(mode="after")
+    def check_question_or_sql(self):
+        """问题与SQL需且仅需提供一个"""
+        if bool(self.question) == bool(self.sql):
+            raise ValueError("question 与 sql 需且仅需提供一个")
+        return self
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "question": "查询广东省的燃气管道",
+                "format": "parquet"
+            }
+        }
+
+
+class BatchQueryRequest(BaseModel):
+    """批量查询请求模型"""
+    questions: List[str] = Field(..., description="问题列表", min_length=1)
+    concurrency: Optional[int] = Field(None, description="并行处理的问题数，默认为BATCH_CONCURRENCY", ge=1)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "questions": [
+                    "查询广东省的燃气管道数量",
+                    "按敷设方式统计管道数量"
+                ],
+                "concurrency": 8
+            }
+        }
+
+
 class PipelineInfo(BaseModel):
     """管道信息模型"""
     id: int = Field(..., description="主键ID")
@@ -63,6 +111,12 @@ class QueryResponse(BaseModel):
     sql: Optional[str] = Field(None, description="生成的SQL语句")
     count: Optional[int] = Field(None, description="结果数量")
     execution_time: Optional[float] = Field(None, description="执行时间(秒)")
+    next_cursor: Optional[str] = Field(None, description="下一页的续页令牌，没有更多数据时为空")
+    has_more: Optional[bool] = Field(None, description="分页查询是否还有更多数据")
+    source: Optional[str] = Field(None, description="SQL来源: cache(问题缓存) | template(规则模板) | template_fallback(大模型不可用时的模板降级) | llm(大模型)")
+    plan: Optional[Dict[str, Any]] = Field(None, description="执行计划汇总: estimated_rows(预计扫描行数)、full_scan、access(各表访问方式)、max_execution_time_ms")
+    timings: Optional[Dict[str, float]] = Field(None, description="各阶段耗时(毫秒)，请求参数 timings=true 时返回")
+    profile: Optional[List[Dict[str, Any]]] = Field(None, description="按累计耗时排序的函数(cProfile)，请求头 X-Profile: 1 时返回")
     
     class Config:
         json_schema_extra = {
@@ -92,6 +146,8 @@ class DatabaseStats(BaseModel):
     pipeline_types: Dict[str, int] = Field(..., description="管道类型统计")
     disaster_types: Dict[str, int] = Field(..., description="灾害类型统计")
     yearly_distribution: Dict[str, int] = Field(..., description="年份分布")
+    snapshot_age: Optional[float] = Field(None, description="统计快照的年龄(秒)")
+    refreshed_at: Optional[datetime] = Field(None, description="统计快照的刷新时间")
     
     class Config:
         json_schema_extra = {
@@ -113,7 +169,9 @@ class DatabaseStats(BaseModel):
                     "2020": 100,
                     "2021": 120,
                     "2022": 110
-                }
+                },
+                "snapshot_age": 12.5,
+                "refreshed_at": "2025-08-31T10:00:00"
             }
         }
 
@@ -3,12 +3,24 @@
 包含所有业务逻辑和外部服务集成
 """
 
+from .aggregate_cube import AggregateCube
+from .columnar_replica import ColumnarReplica
 from .database_service import DatabaseService
+from .entity_index import EntityIndex
+from .export_service import ExportService
 from .llm_service import LLMService
 from .sql_generator import SQLGenerator
+from .stats_service import StatsService
+from .template_engine import TemplateEngine
 
 __all__ = [
+    "AggregateCube",
+    "ColumnarReplica",
     "DatabaseService",
+    "EntityIndex",
+    "ExportService",
     "LLMService", 
-    "SQLGenerator"
+    "SQLGenerator",
+    "StatsService",
+    "TemplateEngine"
 ] 
\ No newline at end of file
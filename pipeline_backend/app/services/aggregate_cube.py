@@ -0,0 +1,469 @@
+"""
+聚合立方体模块
+在内存中维护pipeline_info按低基数维度(省份、城市、管线类型、灾害类型、地质特性、敷设方式、建成年份)
+聚合的计数立方体，按id与updated_at增量维护；
+可由立方体精确回答的COUNT/GROUP BY查询(按SQL指纹判定)直接在内存中计算，不再扫描MySQL
+"""
+
+import logging
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .cache import LRUCache
+from .database_service import DatabaseService
+from .sql_parser import (
+    Between, Binary, Column, Function, InList, IsTest, Literal, ParsedSQL, Select,
+    SQLValidationError, TableRef, parse_sql, render
+)
+from .table_mirror import TableMirror, fold_collation as _fold
+from config import config
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = (
+    "province", "city", "pipeline_type", "disaster_type",
+    "geological_feature", "laying_method", "build_year"
+)
+_DIMENSION_INDEX = {name: index for index, name in enumerate(DIMENSIONS)}
+_NUMERIC_DIMENSIONS = {"build_year"}
+_RANGE_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b
+}
+
+Predicate = Callable[[Any], bool]
+
+
+class _NotAnswerable(Exception):
+    """查询无法由立方体精确回答"""
+
+
+@dataclass(frozen=True)
+class CubePlan:
+    """可由立方体回答的查询计划"""
+    filters: Tuple[Tuple[int, Predicate], ...]      # (维度序号, 判定函数)
+    group_by: Tuple[int, ...]                        # 分组维度序号
+    outputs: Tuple[Tuple[str, Optional[int]], ...]   # (dimension|count|count_column|count_distinct, 维度序号)
+    columns: Tuple[str, ...]
+    order_by: Tuple[Tuple[str, int, bool], ...]      # (output|group, 序号, 是否降序)
+    limit: Optional[Tuple[int, int]]                 # (offset, count)
+
+    @property
+    def dimensions(self) -> Tuple[int, ...]:
+        used = {index for index, _ in self.filters} | set(self.group_by)
+        used.update(index for kind, index in self.outputs if index is not None)
+        return tuple(sorted(used))
+
+
+class _Planner:
+    """将解析后的SQL转换为立方体查询计划"""
+
+    def __init__(self, select: Select):
+        self.select = select
+        source = select.source
+        self.aliases = {source.alias or source.name}
+
+    def dimension(self, node: Any) -> int:
+        if isinstance(node, Column) and (node.table is None or node.table in self.aliases):
+            index = _DIMENSION_INDEX.get(node.name.lower())
+            if index is not None:
+                return index
+        raise _NotAnswerable()
+
+    @staticmethod
+    def literal(node: Any, numeric: bool) -> Any:
+        if not isinstance(node, Literal):
+            raise _NotAnswerable()
+        if numeric:
+            try:
+                value = float(node.value)
+            except ValueError:
+                raise _NotAnswerable()
+            return int(value) if value.is_integer() else value
+        # 字符串维度与数字比较时MySQL按浮点数比较，不在立方体中处理
+        if node.kind != "string":
+            raise _NotAnswerable()
+        return _fold(node.value)
+
+    def predicate(self, condition: Any) -> Tuple[int, Predicate]:
+        if isinstance(condition, Binary):
+            if isinstance(condition.right, Column) and not isinstance(condition.left, Column):
+                flipped = {"<": ">", ">": "<", "<=": ">=", ">=": "<="}.get(condition.op, condition.op)
+                condition = Binary(flipped, condition.right, condition.left)
+            index = self.dimension(condition.left)
+            numeric = DIMENSIONS[index] in _NUMERIC_DIMENSIONS
+            value = self.literal(condition.right, numeric)
+            if condition.op == "=":
+                return index, lambda v: v is not None and _fold(v) == value
+            if condition.op == "<>":
+                return index, lambda v: v is not None and _fold(v) != value
+            if condition.op in _RANGE_OPERATORS and numeric:
+                compare = _RANGE_OPERATORS[condition.op]
+                return index, lambda v: v is not None and compare(v, value)
+            raise _NotAnswerable()
+
+        if isinstance(condition, InList):
+            index = self.dimension(condition.expr)
+            numeric = DIMENSIONS[index] in _NUMERIC_DIMENSIONS
+            values = frozenset(self.literal(item, numeric) for item in condition.items)
+            if condition.negated:
+                return index, lambda v: v is not None and _fold(v) not in values
+            return index, lambda v: v is not None and _fold(v) in values
+
+        if isinstance(condition, IsTest) and condition.value == "NULL":
+            index = self.dimension(condition.expr)
+            if condition.negated:
+                return index, lambda v: v is not None
+            return index, lambda v: v is None
+
+        if isinstance(condition, Between):
+            index = self.dimension(condition.expr)
+            if DIMENSIONS[index] not in _NUMERIC_DIMENSIONS:
+                raise _NotAnswerable()
+            low = self.literal(condition.low, True)
+            high = self.literal(condition.high, True)
+            if condition.negated:
+                return index, lambda v: v is not None and not (low <= v <= high)
+            return index, lambda v: v is not None and low <= v <= high
+
+        raise _NotAnswerable()
+
+    def conjuncts(self, node: Any) -> List[Any]:
+        if node is None:
+            return []
+        if isinstance(node, Binary) and node.op == "AND":
+            return self.conjuncts(node.left) + self.conjuncts(node.right)
+        return [node]
+
+    @staticmethod
+    def resolve_alias(expr: Any, alias_map: Dict[str, Any]) -> Any:
+        """将GROUP BY/ORDER BY中的别名解析为对应表达式"""
+        if not isinstance(expr, Column) or expr.table is not None:
+            return expr
+        name = expr.name.lower()
+        if name not in alias_map:
+            return expr
+        target = alias_map[name]
+        # 别名与维度字段同名却指向其他表达式时，解析规则依赖MySQL版本，不由立方体回答
+        if name in _DIMENSION_INDEX and not (isinstance(target, Column) and target.name.lower() == name):
+            raise _NotAnswerable()
+        return target
+
+    def output(self, expr: Any) -> Tuple[str, Optional[int]]:
+        if isinstance(expr, Function) and expr.name == "COUNT":
+            if expr.star and not expr.distinct:
+                return "count", None
+            if len(expr.args) != 1:
+                raise _NotAnswerable()
+            arg = expr.args[0]
+            if isinstance(arg, Literal) and arg.kind == "number" and not expr.distinct:
+                return "count", None
+            index = self.dimension(arg)
+            return ("count_distinct" if expr.distinct else "count_column"), index
+        return "dimension", self.dimension(expr)
+
+    def plan(self) -> CubePlan:
+        select = self.select
+        if select.distinct or select.having is not None or select.rollup or select.joins:
+            raise _NotAnswerable()
+
+        items = select.items
+        alias_map = {item.alias.lower(): item.expr for item in items if item.alias}
+
+        group_by = [self.dimension(self.resolve_alias(expr, alias_map)) for expr in select.group_by]
+
+        outputs = tuple(self.output(item.expr) for item in items)
+        if not any(kind != "dimension" for kind, _ in outputs):
+            raise _NotAnswerable()
+        # 非聚合列必须出现在GROUP BY中(ONLY_FULL_GROUP_BY)
+        if any(kind == "dimension" and index not in group_by for kind, index in outputs):
+            raise _NotAnswerable()
+
+        filters = tuple(self.predicate(condition) for condition in self.conjuncts(select.where))
+
+        columns = tuple(
+            item.alias if item.alias else (item.expr.name if isinstance(item.expr, Column) else render(item.expr))
+            for item in items
+        )
+
+        order_by = []
+        rendered_items = [render(item.expr) for item in items]
+        for order in select.order_by:
+            expr = self.resolve_alias(order.expr, alias_map)
+            rendered = render(expr)
+            if rendered in rendered_items:
+                order_by.append(("output", rendered_items.index(rendered), order.descending))
+                continue
+            index = self.dimension(expr)
+            if index not in group_by:
+                raise _NotAnswerable()
+            order_by.append(("group", group_by.index(index), order.descending))
+
+        limit = None
+        if select.limit is not None:
+            if not isinstance(select.limit.count, int) or not isinstance(select.limit.offset, int):
+                raise _NotAnswerable()
+            limit = (select.limit.offset, select.limit.count)
+
+        return CubePlan(filters, tuple(group_by), outputs, columns, tuple(order_by), limit)
+
+
+def plan_query(parsed: ParsedSQL) -> Optional[CubePlan]:
+    """
+    判定查询能否由立方体精确回答
+
+    支持：单表pipeline_info上的COUNT(*)/COUNT(维度)/COUNT(DISTINCT 维度)，
+    按维度分组，WHERE为维度上等值、不等、IN、IS NULL与建成年份范围条件的合取，ORDER BY与LIMIT
+
+    Args:
+        parsed: 解析结果
+
+    Returns:
+        Optional[CubePlan]: 无法精确回答时返回None
+    """
+    select = parsed.ast
+    if (
+        parsed.has_placeholders
+        or not isinstance(select, Select)
+        or not isinstance(select.source, TableRef)
+        or select.source.name.lower() != "pipeline_info"
+    ):
+        return None
+    try:
+        return _Planner(select).plan()
+    except _NotAnswerable:
+        return None
+
+
+class AggregateCube(TableMirror):
+    """
+    聚合立方体
+
+    基础单元为全部维度取值组合及其行数；按需物化的低维子立方体(cuboid)缓存于内存，
+    数据变化后清空。每行所属单元以id为下标记录在紧凑数组中，
+    新增与更新的行可按id/updated_at增量修正计数，检测到删除时全量重建
+    """
+
+    label = "聚合立方体"
+
+    def __init__(self, db_service: DatabaseService):
+        """
+        初始化聚合立方体
+
+        Args:
+            db_service: 数据库服务
+        """
+        super().__init__(db_service)
+        self._cuboids: "OrderedDict[Tuple[int, ...], Dict[Tuple[Any, ...], int]]" = OrderedDict()
+        self._plans = LRUCache(maxsize=config.SQL_PARSE_CACHE_SIZE)
+        self.stats.update({"answered": 0, "not_answerable": 0, "stale": 0})
+        self._reset()
+
+    @property
+    def enabled(self) -> bool:
+        return config.CUBE_ENABLED
+
+    @property
+    def refresh_interval(self) -> float:
+        return config.CUBE_REFRESH_INTERVAL
+
+    # 维护 ---------------------------------------------------------------
+
+    def _cell_id(self, values: Tuple[Any, ...]) -> int:
+        cell_id = self._cell_index.get(values)
+        if cell_id is None:
+            cell_id = len(self._cells)
+            self._cells.append(values)
+            self._cell_index[values] = cell_id
+            self._counts.append(0)
+        return cell_id
+
+    def _apply_row(self, row_id: int, values: Tuple[Any, ...]) -> None:
+        """写入一行的当前取值，已存在的行先从原单元中扣除"""
+        if row_id >= len(self._row_cells):
+            self._row_cells.extend([0] * (row_id + 1 - len(self._row_cells)))
+        old = self._row_cells[row_id]
+        new = self._cell_id(values)
+        if old == new:
+            return
+        if old:
+            self._counts[old] -= 1
+        else:
+            self.row_count += 1
+        self._counts[new] += 1
+        self._row_cells[row_id] = new
+
+    def _select_sql(self, where: str) -> str:
+        return f"SELECT id, {', '.join(DIMENSIONS)}, updated_at FROM pipeline_info{where}"
+
+    def _apply(self, rows: List[Tuple[Any, ...]]) -> None:
+        for row in rows:
+            self._apply_row(row[0], tuple(row[1:-1]))
+        if len(self._cells) > config.CUBE_MAX_CELLS:
+            raise OverflowError(f"维度组合数超过CUBE_MAX_CELLS({config.CUBE_MAX_CELLS})")
+
+    def _reset(self) -> None:
+        super()._reset()
+        self._cells: List[Tuple[Any, ...]] = [()]    # 单元序号 -> 维度取值，0号保留表示行不存在
+        self._cell_index: Dict[Tuple[Any, ...], int] = {}
+        self._counts = array("q", [0])
+        self._row_cells = array("I")                  # 行id -> 单元序号
+        self._cuboids.clear()
+
+    def _build_summary(self) -> str:
+        return f"，{len(self._cell_index)} 个维度组合"
+
+    def _on_delta(self) -> None:
+        self._cuboids.clear()
+
+    # 查询 ---------------------------------------------------------------
+
+    def plan(self, sql: str) -> Optional[CubePlan]:
+        """按SQL文本(指纹)缓存判定结果"""
+        cached = self._plans.get(sql)
+        if cached is None:
+            try:
+                cached = plan_query(parse_sql(sql)) or False
+            except SQLValidationError:
+                cached = False
+            self._plans.set(sql, cached)
+        return cached or None
+
+    def _cuboid(self, dimensions: Tuple[int, ...]) -> Dict[Tuple[Any, ...], int]:
+        """获取(必要时物化)指定维度上的子立方体"""
+        cuboid = self._cuboids.get(dimensions)
+        if cuboid is not None:
+            self._cuboids.move_to_end(dimensions)
+            return cuboid
+        cuboid = {}
+        counts = self._counts
+        for cell_id in range(1, len(self._cells)):
+            count = counts[cell_id]
+            if count:
+                values = self._cells[cell_id]
+                key = tuple(values[index] for index in dimensions)
+                cuboid[key] = cuboid.get(key, 0) + count
+        self._cuboids[dimensions] = cuboid
+        while len(self._cuboids) > config.CUBE_MAX_CUBOIDS:
+            self._cuboids.popitem(last=False)
+        return cuboid
+
+    def _evaluate(self, plan: CubePlan) -> List[Tuple[Any, ...]]:
+        dimensions = plan.dimensions
+        position = {index: offset for offset, index in enumerate(dimensions)}
+        filters = [(position[index], predicate) for index, predicate in plan.filters]
+        group_positions = [position[index] for index in plan.group_by]
+        distinct_positions = {
+            index: position[index] for kind, index in plan.outputs if kind == "count_distinct"
+        }
+
+        # 分组键按排序规则折叠，与过滤和COUNT(DISTINCT)一致；输出该组遇到的第一个原始取值
+        groups: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        for key, count in self._cuboid(dimensions).items():
+            if not all(predicate(key[offset]) for offset, predicate in filters):
+                continue
+            group_key = tuple(_fold(key[offset]) for offset in group_positions)
+            state = groups.get(group_key)
+            if state is None:
+                state = groups[group_key] = {
+                    "count": 0, "columns": {}, "distinct": {},
+                    "label": tuple(key[offset] for offset in group_positions)
+                }
+            state["count"] += count
+            for kind, index in plan.outputs:
+                if kind == "count_column" and key[position[index]] is not None:
+                    state["columns"][index] = state["columns"].get(index, 0) + count
+                elif kind == "count_distinct" and key[distinct_positions[index]] is not None:
+                    state["distinct"].setdefault(index, set()).add(_fold(key[distinct_positions[index]]))
+
+        # 无GROUP BY的聚合总返回一行
+        if not plan.group_by and not groups:
+            groups[()] = {"count": 0, "columns": {}, "distinct": {}, "label": ()}
+
+        rows = []
+        for group_key, state in groups.items():
+            row = []
+            for kind, index in plan.outputs:
+                if kind == "dimension":
+                    row.append(state["label"][plan.group_by.index(index)])
+                elif kind == "count":
+                    row.append(state["count"])
+                elif kind == "count_column":
+                    row.append(state["columns"].get(index, 0))
+                else:
+                    row.append(len(state["distinct"].get(index, ())))
+            rows.append((group_key, tuple(row)))
+
+        # 无ORDER BY时按分组键输出，保证结果稳定；排序同样按折叠后的取值比较
+        rows.sort(key=lambda item: tuple((value is not None, value) for value in item[0]))
+        for source, offset, descending in reversed(plan.order_by):
+            if source == "output":
+                rows.sort(key=lambda item: (item[1][offset] is not None, _fold(item[1][offset])), reverse=descending)
+            else:
+                rows.sort(key=lambda item: (item[0][offset] is not None, item[0][offset]), reverse=descending)
+
+        result = [row for _, row in rows]
+        if plan.limit is not None:
+            offset, count = plan.limit
+            result = result[offset:offset + count]
+        return result
+
+    def answer(self, sql: str) -> Optional[Tuple[List[str], List[Tuple[Any, ...]], float]]:
+        """
+        尝试由立方体回答查询
+
+        立方体版本与当前数据版本一致时才回答，否则交由MySQL执行并等待后台刷新
+
+        Args:
+            sql: SQL语句
+
+        Returns:
+            Optional[Tuple[List[str], List[Tuple[Any, ...]], float]]: 列名、元组行与耗时，无法回答时返回None
+        """
+        if not self.is_ready:
+            return None
+        plan = self.plan(sql)
+        if plan is None:
+            self.stats["not_answerable"] += 1
+            return None
+        if self.db_service.get_data_version() != self.version:
+            self.stats["stale"] += 1
+            return None
+
+        # 刷新进行中时不等待，交由MySQL执行
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            start_time = time.time()
+            rows = self._evaluate(plan)
+        finally:
+            self._lock.release()
+        self.stats["answered"] += 1
+        execution_time = time.time() - start_time
+        logger.debug(f"聚合立方体回答查询，返回 {len(rows)} 条记录，耗时 {execution_time * 1e6:.0f} 微秒")
+        return list(plan.columns), rows, execution_time
+
+    async def answer_async(self, sql: str, params: Optional[Tuple[Any, ...]] = None) -> Optional[Tuple[List[str], List[Tuple[Any, ...]], float]]:
+        """异步尝试由立方体回答查询（带参数的查询不由立方体回答）"""
+        if params or not self.is_ready or self.plan(sql) is None:
+            return None
+        return await self.db_service.run_in_executor(self.answer, sql)
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取立方体状态"""
+        return {
+            "enabled": config.CUBE_ENABLED,
+            "ready": self.is_ready,
+            "disabled_reason": self.disabled_reason,
+            "rows": self.row_count,
+            "cells": len(self._cell_index),
+            "cuboids": {",".join(DIMENSIONS[index] for index in key) or "(all)": len(cuboid) for key, cuboid in self._cuboids.items()},
+            "max_id": self.max_id,
+            "max_updated_at": str(self.max_updated_at) if self.max_updated_at is not None else None,
+            "plans": self._plans.get_stats(),
+            "stats": dict(self.stats)
+        }
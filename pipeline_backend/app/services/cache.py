@@ -0,0 +1,187 @@
+"""
+缓存模块
+提供线程安全的LRU/TTL缓存，供SQL缓存、结果缓存等复用
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class _CacheEntry:
+    """缓存条目"""
+
+    __slots__ = ("value", "size", "created_at", "expires_at", "hits")
+
+    def __init__(self, value: Any, ttl: Optional[float], size: int = 0):
+        self.value = value
+        self.size = size
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl if ttl else None
+        self.hits = 0
+
+    def is_expired(self, now: float) -> bool:
+        return self.expires_at is not None and now >= self.expires_at
+
+
+class LRUCache:
+    """
+    线程安全的LRU缓存，支持条目过期时间
+
+    - maxsize: 最大条目数，超出后淘汰最久未使用的条目
+    - ttl: 条目存活时间(秒)，为0或None时永不过期
+    - max_bytes: 内存上限(字节)，需同时提供sizeof估算条目大小
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None
+    ):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.max_bytes = max_bytes if sizeof else None
+        self.sizeof = sizeof
+        self._data: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+            default: 未命中时的返回值
+
+        Returns:
+            Any: 缓存值或default
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry.is_expired(time.time()):
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 覆盖默认的存活时间
+
+        Returns:
+            bool: 是否写入（超过内存上限的单个条目不会缓存）
+        """
+        size = self.sizeof(value) if self.sizeof else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = _CacheEntry(value, ttl if ttl is not None else self.ttl, size)
+            self._bytes += size
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def _remove(self, key: Hashable) -> Optional[_CacheEntry]:
+        """删除条目并更新内存占用（调用方需持有锁）"""
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        return entry
+
+    def delete(self, key: Hashable) -> bool:
+        """删除指定条目，返回是否存在"""
+        with self._lock:
+            return self._remove(key) is not None
+
+    def clear(self) -> int:
+        """清空缓存，返回清除的条目数"""
+        with self._lock:
+            count = len(self._data)
+            self._data.clear()
+            self._bytes = 0
+            return count
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and not entry.is_expired(time.time())
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        列出缓存条目（最近使用的在前）
+
+        Args:
+            limit: 最多返回的条目数
+
+        Returns:
+            List[Dict[str, Any]]: 条目信息
+        """
+        now = time.time()
+        with self._lock:
+            items = list(reversed(self._data.items()))
+        if limit is not None:
+            items = items[:limit]
+        return [
+            {
+                "key": key,
+                "value": entry.value,
+                "age": round(now - entry.created_at, 3),
+                "ttl_remaining": round(entry.expires_at - now, 3) if entry.expires_at else None,
+                "hits": entry.hits,
+                "size": entry.size
+            }
+            for key, entry in items
+            if not entry.is_expired(now)
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            Dict[str, Any]: 命中、未命中、淘汰等计数
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,796 @@
+"""
+列式副本模块
+将pipeline_info加载为内存中的NumPy列数组：字符串与时间列按字典编码为整数编码加取值字典，
+id与build_year为整数数组，按id/updated_at水位增量同步；
+向量化执行器以布尔位图过滤、按编码分组计数回答生成SQL中受支持的子集，其余查询回退到MySQL，
+每条SQL首次由副本回答前与MySQL结果比对，之后按比例抽样复核
+"""
+
+import asyncio
+import logging
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .cache import LRUCache
+from .database_service import DatabaseService
+from .sql_parser import (
+    Between, Binary, Column, Function, InList, IsTest, Like, Literal, ParsedSQL, Select,
+    SQLValidationError, Star, TableRef, Unary, parse_sql, render
+)
+from .table_mirror import TableMirror, fold_collation as _fold
+from config import config
+
+# 可选依赖：列式副本需要numpy
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 可选依赖
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# 与表定义顺序一致，SELECT * 按此顺序展开
+COLUMNS = (
+    "id", "province", "city", "street", "road", "location", "disaster_type",
+    "geological_feature", "pipeline_type", "build_year", "laying_method",
+    "created_at", "updated_at"
+)
+_INTEGER_COLUMNS = {"id", "build_year"}
+_TEMPORAL_COLUMNS = {"created_at", "updated_at"}
+_COMPARISONS: Dict[str, Callable[[Any, Any], Any]] = {
+    "=": lambda a, b: a == b,
+    "<>": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b
+}
+_FLIPPED = {"<": ">", ">": "<", "<=": ">=", ">=": "<="}
+
+# 三值逻辑的条件结果：(为真的行, 结果为UNKNOWN的行)
+Truth = Tuple[Any, Any]
+Condition = Callable[["ColumnarReplica"], Truth]
+
+
+class _Unsupported(Exception):
+    """查询超出向量化执行器支持的子集"""
+
+
+def _like_regex(pattern: str, escape: str = "\\") -> "re.Pattern":
+    """将LIKE模式转换为正则(不区分大小写)"""
+    parts = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == escape and index + 1 < len(pattern):
+            index += 1
+            parts.append(re.escape(pattern[index]))
+        elif char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return re.compile("".join(parts), re.IGNORECASE | re.DOTALL)
+
+
+class _Dictionary:
+    """字典编码列的取值字典，编码-1表示NULL"""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.index: Dict[Any, int] = {}
+        self._canonical = None
+        self._rank = None
+
+    def encode(self, value: Any) -> int:
+        if value is None:
+            return -1
+        code = self.index.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.index[value] = code
+            self._canonical = self._rank = None
+        return code
+
+    def lookup(self, predicate: Callable[[Any], bool]) -> "np.ndarray":
+        """对字典逐项求值，得到按编码查表的布尔数组(末尾多一项对应NULL编码-1)"""
+        table = np.fromiter((predicate(value) for value in self.values), dtype=bool, count=len(self.values))
+        return np.append(table, False)
+
+    def canonical(self) -> "np.ndarray":
+        """编码 -> 按排序规则相等的取值中首个编码(末尾一项对应NULL)"""
+        if self._canonical is None:
+            first: Dict[Any, int] = {}
+            self._canonical = np.fromiter(
+                (first.setdefault(_fold(value), code) for code, value in enumerate(self.values)),
+                dtype=np.int64, count=len(self.values)
+            )
+            self._canonical = np.append(self._canonical, -1)
+        return self._canonical
+
+    def rank(self) -> "np.ndarray":
+        """编码 -> 排序名次，排序规则相等的取值名次相同，NULL为-1"""
+        if self._rank is None:
+            folded = sorted({_fold(value) for value in self.values})
+            position = {value: rank for rank, value in enumerate(folded)}
+            self._rank = np.fromiter(
+                (position[_fold(value)] for value in self.values), dtype=np.int64, count=len(self.values)
+            )
+            self._rank = np.append(self._rank, -1)
+        return self._rank
+
+
+@dataclass(frozen=True)
+class _Output:
+    """输出项：column为字段值，count/count_column/count_distinct为计数"""
+    kind: str
+    column: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ReplicaQuery:
+    """向量化执行计划"""
+    where: Optional[Condition]
+    outputs: Tuple[_Output, ...]
+    columns: Tuple[str, ...]
+    grouped: bool                                   # 是否为聚合/DISTINCT查询
+    group_by: Tuple[str, ...]
+    order_by: Tuple[Tuple[_Output, bool], ...]      # (排序键, 是否降序)
+    order_positions: Optional[Tuple[int, ...]]      # 排序键全部为输出列时的列序号，用于结果比对
+    limit: Optional[Tuple[int, int]]                # (offset, count)
+
+
+class _Compiler:
+    """将解析后的SQL编译为向量化执行计划"""
+
+    def __init__(self, select: Select):
+        self.select = select
+        source = select.source
+        self.aliases = {source.alias or source.name}
+
+    def column(self, node: Any) -> str:
+        if isinstance(node, Column) and (node.table is None or node.table in self.aliases):
+            name = node.name.lower()
+            if name in COLUMNS:
+                return name
+        raise _Unsupported()
+
+    @staticmethod
+    def number(node: Any) -> float:
+        if isinstance(node, Unary) and node.op == "-":
+            return -_Compiler.number(node.operand)
+        if not isinstance(node, Literal) or node.kind != "number":
+            raise _Unsupported()
+        return float(node.value)
+
+    @staticmethod
+    def string(node: Any) -> str:
+        # 字符串字段与数字比较时MySQL按浮点数比较，不在副本中处理
+        if not isinstance(node, Literal) or node.kind != "string":
+            raise _Unsupported()
+        return node.value
+
+    def comparison(self, op: str, name: str, other: Any) -> Condition:
+        if name in _INTEGER_COLUMNS:
+            value = self.number(other)
+            compare = _COMPARISONS[op]
+
+            def evaluate(replica: "ColumnarReplica") -> Truth:
+                nulls = replica.nulls(name)
+                return compare(replica.data(name), value) & ~nulls, nulls
+            return evaluate
+
+        # 字符串只支持按排序规则的等值与不等比较
+        if name in _TEMPORAL_COLUMNS or op not in ("=", "<>"):
+            raise _Unsupported()
+        value = _fold(self.string(other))
+        if op == "=":
+            return self.lookup(name, lambda v: _fold(v) == value)
+        return self.lookup(name, lambda v: _fold(v) != value)
+
+    @staticmethod
+    def lookup(name: str, predicate: Callable[[Any], bool], negated: bool = False) -> Condition:
+        """字典列条件：对取值字典求值后按编码查表"""
+        def evaluate(replica: "ColumnarReplica") -> Truth:
+            codes = replica.data(name)
+            truth = replica.dictionary(name).lookup(predicate)[codes]
+            nulls = codes < 0
+            if negated:
+                truth = ~truth & ~nulls
+            return truth, nulls
+        return evaluate
+
+    def condition(self, node: Any) -> Condition:
+        if isinstance(node, Binary) and node.op in ("AND", "OR"):
+            left, right = self.condition(node.left), self.condition(node.right)
+            if node.op == "AND":
+                def evaluate(replica: "ColumnarReplica") -> Truth:
+                    (lt, lu), (rt, ru) = left(replica), right(replica)
+                    false = (~lt & ~lu) | (~rt & ~ru)
+                    return lt & rt, (lu | ru) & ~false
+            else:
+                def evaluate(replica: "ColumnarReplica") -> Truth:
+                    (lt, lu), (rt, ru) = left(replica), right(replica)
+                    truth = lt | rt
+                    return truth, (lu | ru) & ~truth
+            return evaluate
+
+        if isinstance(node, Unary) and node.op == "NOT":
+            operand = self.condition(node.operand)
+
+            def evaluate(replica: "ColumnarReplica") -> Truth:
+                truth, unknown = operand(replica)
+                return ~truth & ~unknown, unknown
+            return evaluate
+
+        if isinstance(node, Binary) and node.op in _COMPARISONS:
+            left, right, op = node.left, node.right, node.op
+            if isinstance(right, Column) and not isinstance(left, Column):
+                left, right, op = right, left, _FLIPPED.get(op, op)
+            name = self.column(left)
+            # 与NULL比较的结果恒为UNKNOWN，交由MySQL处理
+            return self.comparison(op, name, right)
+
+        if isinstance(node, InList):
+            name = self.column(node.expr)
+            if name in _INTEGER_COLUMNS:
+                values = np.array([self.number(item) for item in node.items])
+                negated = node.negated
+
+                def evaluate(replica: "ColumnarReplica") -> Truth:
+                    nulls = replica.nulls(name)
+                    found = np.isin(replica.data(name), values)
+                    return (~found if negated else found) & ~nulls, nulls
+                return evaluate
+            if name in _TEMPORAL_COLUMNS:
+                raise _Unsupported()
+            values = frozenset(_fold(self.string(item)) for item in node.items)
+            return self.lookup(name, lambda v: _fold(v) in values, node.negated)
+
+        if isinstance(node, Between):
+            name = self.column(node.expr)
+            if name not in _INTEGER_COLUMNS:
+                raise _Unsupported()
+            low, high = self.number(node.low), self.number(node.high)
+            negated = node.negated
+
+            def evaluate(replica: "ColumnarReplica") -> Truth:
+                nulls = replica.nulls(name)
+                data = replica.data(name)
+                inside = (data >= low) & (data <= high)
+                return (~inside if negated else inside) & ~nulls, nulls
+            return evaluate
+
+        if isinstance(node, IsTest) and node.value == "NULL":
+            name = self.column(node.expr)
+            negated = node.negated
+
+            def evaluate(replica: "ColumnarReplica") -> Truth:
+                nulls = replica.nulls(name)
+                return (~nulls if negated else nulls), np.zeros_like(nulls)
+            return evaluate
+
+        if isinstance(node, Like) and node.op == "LIKE":
+            name = self.column(node.expr)
+            if name in _INTEGER_COLUMNS or name in _TEMPORAL_COLUMNS:
+                raise _Unsupported()
+            escape = "\\" if node.escape is None else self.string(node.escape)
+            if len(escape) != 1:
+                raise _Unsupported()
+            pattern = _like_regex(self.string(node.pattern), escape)
+            return self.lookup(name, lambda v: pattern.fullmatch(v) is not None, node.negated)
+
+        raise _Unsupported()
+
+    def output(self, expr: Any) -> _Output:
+        if isinstance(expr, Function) and expr.name == "COUNT":
+            if expr.star and not expr.distinct:
+                return _Output("count")
+            if len(expr.args) != 1:
+                raise _Unsupported()
+            arg = expr.args[0]
+            if isinstance(arg, Literal) and arg.kind == "number" and not expr.distinct:
+                return _Output("count")
+            return _Output("count_distinct" if expr.distinct else "count_column", self.column(arg))
+        return _Output("column", self.column(expr))
+
+    def resolve(self, expr: Any, alias_map: Dict[str, Any], items: List[Any]) -> Any:
+        """解析GROUP BY/ORDER BY中的别名与列序号"""
+        if isinstance(expr, Literal) and expr.kind == "number":
+            position = int(float(expr.value))
+            if not 1 <= position <= len(items):
+                raise _Unsupported()
+            return items[position - 1]
+        if not isinstance(expr, Column) or expr.table is not None:
+            return expr
+        name = expr.name.lower()
+        if name not in alias_map:
+            return expr
+        target = alias_map[name]
+        # 别名与字段同名却指向其他表达式时，解析规则依赖MySQL版本，不由副本回答
+        if name in COLUMNS and not (isinstance(target, Column) and target.name.lower() == name):
+            raise _Unsupported()
+        return target
+
+    def compile(self) -> ReplicaQuery:
+        select = self.select
+        if select.having is not None or select.rollup or select.joins:
+            raise _Unsupported()
+
+        items: List[Any] = []
+        columns: List[str] = []
+        for item in select.items:
+            if isinstance(item.expr, Star):
+                if item.expr.table is not None and item.expr.table not in self.aliases:
+                    raise _Unsupported()
+                items.extend(Column(None, name) for name in COLUMNS)
+                columns.extend(COLUMNS)
+                continue
+            items.append(item.expr)
+            if item.alias:
+                columns.append(item.alias)
+            else:
+                columns.append(item.expr.name if isinstance(item.expr, Column) else render(item.expr))
+
+        alias_map = {item.alias.lower(): item.expr for item in select.items if item.alias}
+        outputs = tuple(self.output(expr) for expr in items)
+        group_by = tuple(self.column(self.resolve(expr, alias_map, items)) for expr in select.group_by)
+        aggregate = any(output.kind != "column" for output in outputs)
+
+        if select.distinct:
+            if aggregate or group_by:
+                raise _Unsupported()
+            group_by = tuple(dict.fromkeys(output.column for output in outputs))
+        grouped = aggregate or bool(group_by)
+        # 非聚合列必须出现在GROUP BY中(ONLY_FULL_GROUP_BY)
+        if grouped and any(output.kind == "column" and output.column not in group_by for output in outputs):
+            raise _Unsupported()
+
+        where = self.condition(select.where) if select.where is not None else None
+
+        order_by = []
+        order_positions: Optional[List[int]] = []
+        rendered_items = [render(expr) for expr in items]
+        for order in select.order_by:
+            expr = self.resolve(order.expr, alias_map, items)
+            rendered = render(expr)
+            if order_positions is not None and rendered in rendered_items:
+                order_positions.append(rendered_items.index(rendered))
+            else:
+                order_positions = None
+            key = self.output(expr)
+            if grouped and key.kind == "column" and key.column not in group_by:
+                raise _Unsupported()
+            if not grouped and key.kind != "column":
+                raise _Unsupported()
+            order_by.append((key, order.descending))
+
+        limit = None
+        if select.limit is not None:
+            if not isinstance(select.limit.count, int) or not isinstance(select.limit.offset, int):
+                raise _Unsupported()
+            limit = (select.limit.offset, select.limit.count)
+
+        return ReplicaQuery(
+            where=where,
+            outputs=outputs,
+            columns=tuple(columns),
+            grouped=grouped,
+            group_by=group_by,
+            order_by=tuple(order_by),
+            order_positions=tuple(order_positions) if order_positions is not None else None,
+            limit=limit
+        )
+
+
+def compile_query(parsed: ParsedSQL) -> Optional[ReplicaQuery]:
+    """
+    判定查询能否由列式副本回答并编译执行计划
+
+    支持：单表pipeline_info上的字段投影与 COUNT(*)/COUNT(字段)/COUNT(DISTINCT 字段)，
+    WHERE为等值、不等、IN、BETWEEN、LIKE、IS NULL与整数字段范围条件经AND/OR/NOT的组合，
+    GROUP BY、DISTINCT、ORDER BY与LIMIT
+
+    Args:
+        parsed: 解析结果
+
+    Returns:
+        Optional[ReplicaQuery]: 不支持时返回None
+    """
+    select = parsed.ast
+    if (
+        np is None
+        or parsed.has_placeholders
+        or not isinstance(select, Select)
+        or not isinstance(select.source, TableRef)
+        or select.source.name.lower() != "pipeline_info"
+    ):
+        return None
+    try:
+        return _Compiler(select).compile()
+    except (_Unsupported, ValueError):
+        return None
+
+
+def _same_result(query: ReplicaQuery, expected: List[Tuple[Any, ...]], actual: List[Tuple[Any, ...]]) -> bool:
+    """比对副本与MySQL的结果：行的多重集合一致，且排序键序列一致(排序键相同的行顺序不作要求)"""
+    expected = [tuple(row) for row in expected]
+    actual = [tuple(row) for row in actual]
+    if Counter(expected) != Counter(actual):
+        return False
+    if not query.order_by:
+        return True
+    if query.order_positions is None:
+        return expected == actual
+    key = lambda row: tuple(row[position] for position in query.order_positions)
+    return [key(row) for row in expected] == [key(row) for row in actual]
+
+
+class ColumnarReplica(TableMirror):
+    """
+    pipeline_info的内存列式副本
+
+    行按id顺序存放于定长扩容的列数组中，id -> 行位置记录在整数数组中；
+    新增与更新的行按id/updated_at水位增量写入，检测到删除时全量重建
+    """
+
+    label = "列式副本"
+
+    def __init__(self, db_service: DatabaseService):
+        """
+        初始化列式副本
+
+        Args:
+            db_service: 数据库服务
+        """
+        super().__init__(db_service)
+        self._plans = LRUCache(maxsize=config.SQL_PARSE_CACHE_SIZE)
+        self._verified = LRUCache(maxsize=config.SQL_PARSE_CACHE_SIZE)
+        self.disabled_reason = None if np is not None else "未安装numpy"
+        self.stats.update({"answered": 0, "unsupported": 0, "stale": 0, "verified": 0, "mismatches": 0})
+        self._reset()
+
+    @property
+    def enabled(self) -> bool:
+        if not config.REPLICA_ENABLED:
+            return False
+        if np is None:
+            logger.warning("未安装numpy，列式副本不可用")
+            return False
+        return True
+
+    @property
+    def refresh_interval(self) -> float:
+        return config.REPLICA_REFRESH_INTERVAL
+
+    # 存储 ---------------------------------------------------------------
+
+    def _reset(self) -> None:
+        super()._reset()
+        self._size = 0
+        self._capacity = 0
+        self._columns: Dict[str, Any] = {}
+        self._nulls: Dict[str, Any] = {}
+        self._dictionaries: Dict[str, _Dictionary] = {
+            name: _Dictionary() for name in COLUMNS if name not in _INTEGER_COLUMNS
+        }
+        self._alive = None
+        self._id_positions = None if np is None else np.full(1024, -1, dtype=np.int64)
+        if np is not None:
+            self._reserve(0)
+
+    def _reserve(self, size: int) -> None:
+        """按倍增扩容列数组"""
+        if self._columns and size <= self._capacity:
+            return
+        capacity = max(1024, self._capacity)
+        while capacity < size:
+            capacity *= 2
+
+        def grow(array: Any, dtype: Any, fill: Any) -> Any:
+            grown = np.full(capacity, fill, dtype=dtype)
+            if array is not None:
+                grown[:len(array)] = array
+            return grown
+
+        for name in COLUMNS:
+            if name in _INTEGER_COLUMNS:
+                self._columns[name] = grow(self._columns.get(name), np.int64, 0)
+                self._nulls[name] = grow(self._nulls.get(name), bool, True)
+            else:
+                self._columns[name] = grow(self._columns.get(name), np.int32, -1)
+        self._alive = grow(self._alive, bool, False)
+        self._capacity = capacity
+
+    def data(self, name: str) -> Any:
+        return self._columns[name][:self._size]
+
+    def nulls(self, name: str) -> Any:
+        if name in _INTEGER_COLUMNS:
+            return self._nulls[name][:self._size]
+        return self._columns[name][:self._size] < 0
+
+    def dictionary(self, name: str) -> _Dictionary:
+        return self._dictionaries[name]
+
+    def _apply(self, rows: List[Tuple[Any, ...]]) -> None:
+        """写入一批行，已存在的行原位覆盖，新行追加到末尾"""
+        count = len(rows)
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+        needed = int(ids.max()) + 1
+        if len(self._id_positions) < needed:
+            grown = np.full(max(needed, 2 * len(self._id_positions)), -1, dtype=np.int64)
+            grown[:len(self._id_positions)] = self._id_positions
+            self._id_positions = grown
+
+        positions = self._id_positions[ids]
+        new = positions < 0
+        added = int(new.sum())
+        if self._size + added > config.REPLICA_MAX_ROWS:
+            raise OverflowError(f"行数超过REPLICA_MAX_ROWS({config.REPLICA_MAX_ROWS})")
+        self._reserve(self._size + added)
+        positions[new] = np.arange(self._size, self._size + added)
+        self._id_positions[ids[new]] = positions[new]
+        self._size += added
+        self.row_count += added
+
+        for offset, name in enumerate(COLUMNS):
+            values = [row[offset] for row in rows]
+            if name in _INTEGER_COLUMNS:
+                self._columns[name][positions] = np.fromiter(
+                    (0 if value is None else value for value in values), dtype=np.int64, count=count
+                )
+                self._nulls[name][positions] = np.fromiter(
+                    (value is None for value in values), dtype=bool, count=count
+                )
+            else:
+                encode = self._dictionaries[name].encode
+                self._columns[name][positions] = np.fromiter(
+                    (encode(value) for value in values), dtype=np.int32, count=count
+                )
+        self._alive[positions] = True
+
+    # 维护 ---------------------------------------------------------------
+
+    def _select_sql(self, where: str) -> str:
+        return f"SELECT {', '.join(COLUMNS)} FROM pipeline_info{where} ORDER BY id"
+
+    def _on_rebuilt(self) -> None:
+        self._plans.clear()
+        self._verified.clear()
+
+    def rebuild(self) -> None:
+        """全量重建副本"""
+        if np is not None:
+            super().rebuild()
+
+    # 查询 ---------------------------------------------------------------
+
+    def plan(self, sql: str) -> Optional[ReplicaQuery]:
+        """按SQL文本(指纹)缓存编译结果"""
+        cached = self._plans.get(sql)
+        if cached is None:
+            try:
+                cached = compile_query(parse_sql(sql)) or False
+            except SQLValidationError:
+                cached = False
+            self._plans.set(sql, cached)
+        return cached or None
+
+    def _values(self, name: str, positions: Any) -> List[Any]:
+        """按行位置取出字段的Python取值"""
+        data = self._columns[name][positions]
+        if name in _INTEGER_COLUMNS:
+            nulls = self._nulls[name][positions]
+            return [None if null else value for value, null in zip(data.tolist(), nulls.tolist())]
+        values = self._dictionaries[name].values
+        return [values[code] if code >= 0 else None for code in data.tolist()]
+
+    def _sort_key(self, name: str, positions: Any, descending: bool) -> List[Any]:
+        """字段排序键(NULL在升序时最前)，降序时取反"""
+        if name in _INTEGER_COLUMNS:
+            keys = [np.where(self._nulls[name][positions], 0, 1), self._columns[name][positions]]
+        else:
+            keys = [self._dictionaries[name].rank()[self._columns[name][positions]]]
+        return [-key for key in keys] if descending else keys
+
+    def _group_key(self, name: str, positions: Any) -> Any:
+        """字段的分组键：排序规则相等的取值键相同，NULL自成一组"""
+        if name in _INTEGER_COLUMNS:
+            data = self._columns[name][positions]
+            return np.where(self._nulls[name][positions], np.iinfo(np.int64).min, data)
+        return self._dictionaries[name].canonical()[self._columns[name][positions]]
+
+    def _select_rows(self, query: ReplicaQuery) -> Any:
+        """按WHERE条件过滤，返回满足条件的行位置"""
+        alive = self._alive[:self._size]
+        if query.where is None:
+            return np.flatnonzero(alive)
+        truth, _ = query.where(self)
+        return np.flatnonzero(truth & alive)
+
+    def _limit(self, query: ReplicaQuery, length: int) -> slice:
+        if query.limit is None:
+            return slice(0, length)
+        offset, count = query.limit
+        return slice(offset, offset + count)
+
+    def _evaluate_rows(self, query: ReplicaQuery) -> List[Tuple[Any, ...]]:
+        """明细查询：过滤、排序(同序时按id)、截取后物化"""
+        positions = self._select_rows(query)
+        if query.order_by:
+            keys = [positions]
+            for key, descending in reversed(query.order_by):
+                keys.extend(reversed(self._sort_key(key.column, positions, descending)))
+            positions = positions[np.lexsort(keys)]
+        positions = positions[self._limit(query, len(positions))]
+        columns = [self._values(output.column, positions) for output in query.outputs]
+        return list(zip(*columns)) if columns else []
+
+    def _aggregate(self, output: _Output, positions: Any, inverse: Any, groups: int, first: Any) -> Any:
+        """计算每个分组的输出值(字段取分组内首行的值)"""
+        if output.kind == "count":
+            return np.bincount(inverse, minlength=groups)
+        if output.kind == "column":
+            return positions[first]
+        present = ~self.nulls(output.column)[positions]
+        if output.kind == "count_column":
+            return np.bincount(inverse[present], minlength=groups)
+        _, codes = np.unique(self._group_key(output.column, positions)[present], return_inverse=True)
+        cardinality = int(codes.max(initial=0)) + 1
+        pairs = np.unique(inverse[present].astype(np.int64) * cardinality + codes.reshape(-1))
+        return np.bincount(pairs // cardinality, minlength=groups)
+
+    def _evaluate_groups(self, query: ReplicaQuery) -> List[Tuple[Any, ...]]:
+        """聚合查询：按分组键组合编码分组后以bincount计数"""
+        positions = self._select_rows(query)
+        if query.group_by:
+            combined = np.zeros(len(positions), dtype=np.int64)
+            for name in query.group_by:
+                _, codes = np.unique(self._group_key(name, positions), return_inverse=True)
+                cardinality = int(codes.max(initial=0)) + 1
+                # 每并入一列后重新压缩编码，避免组合编码溢出
+                _, combined = np.unique(combined * cardinality + codes.reshape(-1), return_inverse=True)
+                combined = combined.reshape(-1)
+            _, first, inverse = np.unique(combined, return_index=True, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            groups = len(first)
+        else:
+            # 无GROUP BY的聚合总返回一行
+            inverse = np.zeros(len(positions), dtype=np.int64)
+            first = np.zeros(1, dtype=np.int64)
+            groups = 1
+
+        values: Dict[_Output, Any] = {}
+        for output in list(query.outputs) + [key for key, _ in query.order_by]:
+            if output not in values:
+                values[output] = self._aggregate(output, positions, inverse, groups, first)
+
+        order = np.arange(groups)
+        if query.order_by:
+            keys = [order]
+            for key, descending in reversed(query.order_by):
+                if key.kind == "column":
+                    keys.extend(reversed(self._sort_key(key.column, values[key], descending)))
+                else:
+                    keys.append(-values[key] if descending else values[key])
+            order = order[np.lexsort(keys)]
+        order = order[self._limit(query, groups)]
+
+        columns = []
+        for output in query.outputs:
+            selected = values[output][order]
+            columns.append(self._values(output.column, selected) if output.kind == "column" else selected.tolist())
+        return list(zip(*columns)) if columns else []
+
+    def answer(self, sql: str) -> Optional[Tuple[List[str], List[Tuple[Any, ...]], float]]:
+        """
+        尝试由列式副本执行查询
+
+        副本版本与当前数据版本一致时才回答，否则交由MySQL执行并等待后台同步
+
+        Args:
+            sql: SQL语句
+
+        Returns:
+            Optional[Tuple[List[str], List[Tuple[Any, ...]], float]]: 列名、元组行与耗时，无法回答时返回None
+        """
+        if not self.is_ready:
+            return None
+        query = self.plan(sql)
+        if query is None:
+            self.stats["unsupported"] += 1
+            return None
+        if self.db_service.get_data_version() != self.version:
+            self.stats["stale"] += 1
+            return None
+
+        # 同步进行中时不等待，交由MySQL执行
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            start_time = time.time()
+            if query.grouped:
+                rows = self._evaluate_groups(query)
+            else:
+                rows = self._evaluate_rows(query)
+        finally:
+            self._lock.release()
+        execution_time = time.time() - start_time
+        logger.debug(f"列式副本执行查询，返回 {len(rows)} 条记录，耗时 {execution_time:.4f} 秒")
+        return list(query.columns), rows, execution_time
+
+    async def _verify(
+        self,
+        sql: str,
+        answered: Tuple[List[str], List[Tuple[Any, ...]], float]
+    ) -> Tuple[List[str], List[Tuple[Any, ...]], float]:
+        """在MySQL中执行同一查询并比对；结果不一致的SQL此后回退到MySQL"""
+        version = self.version
+        expected = await self.db_service.execute_query_columnar_async(sql)
+        # 比对期间数据发生变化时结果不可比
+        if self.version != version or self.db_service.get_data_version() != version:
+            return expected
+        query = self.plan(sql)
+        if query is not None and list(expected[0]) == answered[0] and _same_result(query, expected[1], answered[1]):
+            self._verified.set(sql, True)
+            self.stats["verified"] += 1
+        else:
+            self._plans.set(sql, False)
+            self.stats["mismatches"] += 1
+            logger.warning(f"列式副本结果与MySQL不一致，此后该查询回退到MySQL: {sql}")
+        return expected
+
+    async def _verify_quietly(self, sql: str, answered: Tuple[List[str], List[Tuple[Any, ...]], float]) -> None:
+        try:
+            await self._verify(sql, answered)
+        except Exception as e:
+            logger.warning(f"列式副本抽样复核失败: {e}")
+
+    async def execute_async(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None
+    ) -> Optional[Tuple[List[str], List[Tuple[Any, ...]], float]]:
+        """
+        异步尝试由列式副本执行查询（带参数的查询不由副本执行）
+
+        尚未复核过的SQL先与MySQL结果比对并返回MySQL的结果；
+        已复核的SQL由副本回答，并按REPLICA_VERIFY_SAMPLE_RATE比例在后台抽样复核
+
+        Returns:
+            Optional[Tuple[List[str], List[Tuple[Any, ...]], float]]: 列名、元组行与耗时，无法回答时返回None
+        """
+        if params or not self.is_ready or self.plan(sql) is None:
+            return None
+        answered = await self.db_service.run_in_executor(self.answer, sql)
+        if answered is None:
+            return None
+        if not self._verified.get(sql):
+            return await self._verify(sql, answered)
+        self.stats["answered"] += 1
+        if random.random() < config.REPLICA_VERIFY_SAMPLE_RATE:
+            asyncio.get_running_loop().create_task(self._verify_quietly(sql, answered))
+        return answered
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取副本状态"""
+        return {
+            "enabled": config.REPLICA_ENABLED,
+            "ready": self.is_ready,
+            "disabled_reason": self.disabled_reason,
+            "rows": self.row_count,
+            "capacity": self._capacity,
+            "bytes": sum(array.nbytes for array in self._columns.values())
+            + sum(array.nbytes for array in self._nulls.values()),
+            "dictionaries": {name: len(dictionary.values) for name, dictionary in self._dictionaries.items()},
+            "max_id": self.max_id,
+            "max_updated_at": str(self.max_updated_at) if self.max_updated_at is not None else None,
+            "plans": self._plans.get_stats(),
+            "stats": dict(self.stats)
+        }
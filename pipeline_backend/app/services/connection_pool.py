@@ -0,0 +1,278 @@
+"""
+数据库连接池模块
+为DatabaseService提供可复用的pymysql连接，避免每次查询重复握手
+"""
+
+import queue
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+import pymysql
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """等待空闲连接超时"""
+
+
+class _PooledConnection:
+    """连接池中的连接记录"""
+
+    __slots__ = ("connection", "created_at", "last_used_at")
+
+    def __init__(self, connection: pymysql.connections.Connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+
+
+class ConnectionPool:
+    """
+    线程安全的pymysql连接池
+
+    - pool_size: 常驻连接数，归还后保留在池中
+    - max_overflow: 池满时允许额外创建的临时连接数，归还后直接关闭
+    - timeout: 连接全部被占用时的最长等待时间(秒)
+    - recycle: 连接最长存活时间(秒)，超过后在检出时重建
+    - pre_ping: 检出时检查连接存活（空闲时间超过ping_interval才会真正ping）
+    """
+
+    def __init__(
+        self,
+        connection_config: Dict[str, Any],
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        timeout: float = 30.0,
+        recycle: int = 3600,
+        pre_ping: bool = True,
+        ping_interval: float = 5.0
+    ):
+        self.connection_config = connection_config
+        self.pool_size = max(1, pool_size)
+        self.max_overflow = max(0, max_overflow)
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.ping_interval = ping_interval
+
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._checked_out: Dict[int, _PooledConnection] = {}
+        self._total = 0
+        self._closed = False
+
+        self._stats = {
+            "checkouts": 0,
+            "checkins": 0,
+            "created": 0,
+            "closed": 0,
+            "recycled": 0,
+            "ping_failures": 0,
+            "invalidated": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0
+        }
+
+    @property
+    def max_connections(self) -> int:
+        """连接池允许的最大连接数"""
+        return self.pool_size + self.max_overflow
+
+    def _create(self) -> _PooledConnection:
+        """创建新的物理连接（调用方需已预留名额）"""
+        try:
+            connection = pymysql.connect(**self.connection_config)
+        except Exception:
+            with self._lock:
+                self._total -= 1
+            raise
+        with self._lock:
+            self._stats["created"] += 1
+        logger.debug("数据库连接池创建新连接")
+        return _PooledConnection(connection)
+
+    def _close(self, record: _PooledConnection) -> None:
+        """关闭物理连接并释放名额"""
+        try:
+            if record.connection.open:
+                record.connection.close()
+        except Exception as e:
+            logger.debug(f"关闭数据库连接异常: {e}")
+        with self._lock:
+            self._total -= 1
+            self._stats["closed"] += 1
+
+    def _reserve(self) -> bool:
+        """尝试为新连接预留名额"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("数据库连接池已关闭")
+            if self._total < self.max_connections:
+                self._total += 1
+                return True
+            return False
+
+    def _is_usable(self, record: _PooledConnection) -> bool:
+        """检查空闲连接是否可以直接复用"""
+        now = time.monotonic()
+        if self.recycle and now - record.created_at > self.recycle:
+            with self._lock:
+                self._stats["recycled"] += 1
+            return False
+
+        if not record.connection.open:
+            return False
+
+        if self.pre_ping and now - record.last_used_at > self.ping_interval:
+            try:
+                record.connection.ping(reconnect=False)
+            except Exception as e:
+                logger.warning(f"数据库连接存活检查失败: {e}")
+                with self._lock:
+                    self._stats["ping_failures"] += 1
+                return False
+
+        return True
+
+    def acquire(self) -> pymysql.connections.Connection:
+        """
+        从连接池检出一个连接
+
+        Returns:
+            pymysql.connections.Connection: 可用的数据库连接
+
+        Raises:
+            PoolTimeoutError: 等待超时
+        """
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        wait_start = 0.0
+
+        while True:
+            try:
+                record = self._idle.get_nowait()
+            except queue.Empty:
+                record = None
+
+            if record is None:
+                if self._reserve():
+                    record = self._create()
+                else:
+                    # 连接已全部被占用，等待其他请求归还
+                    if not waited:
+                        waited = True
+                        wait_start = time.monotonic()
+                        with self._lock:
+                            self._stats["waits"] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        with self._lock:
+                            self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"获取数据库连接超时({self.timeout}秒)，"
+                            f"当前连接数 {self._total}/{self.max_connections}"
+                        )
+                    try:
+                        # 分片等待：损坏连接被关闭时不会入队，需要重新尝试预留名额
+                        record = self._idle.get(timeout=min(remaining, 0.1))
+                    except queue.Empty:
+                        continue
+                    if not self._is_usable(record):
+                        self._close(record)
+                        continue
+            elif not self._is_usable(record):
+                self._close(record)
+                continue
+
+            with self._lock:
+                self._checked_out[id(record.connection)] = record
+                self._stats["checkouts"] += 1
+                if waited:
+                    self._stats["wait_time_total"] += time.monotonic() - wait_start
+            return record.connection
+
+    def release(self, connection: pymysql.connections.Connection, invalidate: bool = False) -> None:
+        """
+        归还连接到连接池
+
+        Args:
+            connection: 之前检出的连接
+            invalidate: 连接已损坏时为True，直接关闭而不放回池中
+        """
+        with self._lock:
+            record = self._checked_out.pop(id(connection), None)
+            self._stats["checkins"] += 1
+            if invalidate:
+                self._stats["invalidated"] += 1
+        if record is None:
+            logger.warning("归还了不属于连接池的数据库连接")
+            return
+
+        keep = (
+            not invalidate
+            and not self._closed
+            and connection.open
+            and self._idle.qsize() < self.pool_size
+        )
+        if keep:
+            record.last_used_at = time.monotonic()
+            self._idle.put(record)
+        else:
+            self._close(record)
+
+    def warm_up(self, count: Optional[int] = None) -> int:
+        """
+        预先建立连接，避免首批请求承担握手开销
+
+        Args:
+            count: 预热连接数，默认为pool_size
+
+        Returns:
+            int: 成功建立的连接数
+        """
+        target = min(count or self.pool_size, self.pool_size)
+        created = 0
+        while self._idle.qsize() < target and self._reserve():
+            try:
+                self._idle.put(self._create())
+                created += 1
+            except Exception as e:
+                logger.error(f"数据库连接池预热失败: {e}")
+                break
+        logger.info(f"数据库连接池预热完成，新建 {created} 个连接")
+        return created
+
+    def dispose(self) -> None:
+        """关闭池中所有空闲连接并拒绝后续检出"""
+        self._closed = True
+        while True:
+            try:
+                record = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close(record)
+        logger.info("数据库连接池已关闭")
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        获取连接池状态与计数指标
+
+        Returns:
+            Dict[str, Any]: 连接池指标
+        """
+        with self._lock:
+            status = dict(self._stats)
+            status.update({
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "size": self._total,
+                "in_use": len(self._checked_out),
+                "idle": self._idle.qsize()
+            })
+        status["wait_time_total"] = round(status["wait_time_total"], 6)
+        return status
@@ -3,11 +3,22 @@
 提供数据库连接、查询执行和统计功能
 """
 
+import asyncio
+import functools
+import re
+import sys
+import threading
 import pymysql
 import time
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
 from contextlib import contextmanager
+from .cache import LRUCache
+from .connection_pool import ConnectionPool
+from .sql_fingerprint import sql_fingerprint
+from .sql_parser import ParsedSQL, SQLValidationError, validate_sql
+from .workload import WorkloadRecorder
 from ..models.schemas import DatabaseStats
 from config import config
 
@@ -15,6 +26,109 @@ from config import config
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+def estimate_result_size(results: List[Any]) -> int:
+    """
+    估算查询结果占用的内存字节数（列名字符串在行之间共享，不重复计入）
+    
+    Args:
+        results: 查询结果（字典行或元组行）
+        
+    Returns:
+        int: 估算字节数
+    """
+    size = sys.getsizeof(results)
+    for row in results:
+        size += sys.getsizeof(row)
+        for value in (row.values() if isinstance(row, dict) else row):
+            size += sys.getsizeof(value)
+    return size
+
+
+# 服务端因执行时间上限(MySQL 3024 / MariaDB 1969)或KILL QUERY(1317)中断查询的错误码
+_QUERY_INTERRUPTED_CODES = {3024, 1969, 1317}
+# 客户端读取超时表现为查询过程中连接断开
+_LOST_CONNECTION_CODE = 2013
+# 需要读取整张表(或整个索引)的访问类型
+_FULL_SCAN_ACCESS_TYPES = {"ALL", "index"}
+_SELECT_KEYWORD = re.compile(r"^\s*select\b", re.I)
+
+
+class QueryGuardError(Exception):
+    """查询被执行保护拒绝或终止（可直接展示给用户的错误）"""
+    
+    def __init__(self, message: str, plan: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.message = message
+        self.plan = plan
+
+
+class QueryCostError(QueryGuardError):
+    """查询预估代价超出预算"""
+
+
+class QueryTimeoutError(QueryGuardError):
+    """查询超过执行时间上限被终止"""
+
+
+def summarize_plan(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    汇总EXPLAIN输出
+    
+    同一SELECT(id相同)内的各表按嵌套循环连接估算，扫描行数相乘；
+    不同SELECT(子查询、派生表、UNION)之间相加
+    
+    Args:
+        rows: EXPLAIN结果行
+        
+    Returns:
+        Dict[str, Any]: estimated_rows(预计扫描行数)、full_scan(是否存在大表全扫描)与各表访问方式
+    """
+    access = []
+    per_select: Dict[Any, int] = {}
+    full_scan = False
+    for row in rows:
+        row_count = int(row.get("rows") or 0)
+        access_type = row.get("type")
+        access.append({
+            "table": row.get("table"),
+            "type": access_type,
+            "key": row.get("key"),
+            "rows": row_count,
+            "extra": row.get("Extra")
+        })
+        if access_type is None:
+            continue
+        select_id = row.get("id")
+        per_select[select_id] = per_select.get(select_id, 1) * max(row_count, 1)
+        if access_type in _FULL_SCAN_ACCESS_TYPES and row_count >= config.QUERY_FULL_SCAN_ROWS:
+            full_scan = True
+    return {
+        "estimated_rows": sum(per_select.values()),
+        "full_scan": full_scan,
+        "access": access
+    }
+
+
+def with_time_limit(sql: str, max_execution_time: int) -> str:
+    """
+    为SELECT语句添加MAX_EXECUTION_TIME优化器提示
+    
+    Args:
+        sql: SQL语句
+        max_execution_time: 服务端执行时间上限(毫秒)，0表示不限制
+        
+    Returns:
+        str: 带提示的SQL
+    """
+    if max_execution_time <= 0:
+        return sql
+    return _SELECT_KEYWORD.sub(
+        f"SELECT /*+ MAX_EXECUTION_TIME({int(max_execution_time)}) */", sql, count=1
+    )
+
 
 class DatabaseService:
     """数据库服务类"""
@@ -31,22 +145,104 @@ class DatabaseService:
             "cursorclass": pymysql.cursors.DictCursor,
             "autocommit": True
         }
+        if config.DB_READ_TIMEOUT > 0:
+            self.connection_config["read_timeout"] = config.DB_READ_TIMEOUT
+        
+        # 连接池（惰性建连，启动时通过warm_up预热）
+        self.pool = ConnectionPool(
+            self.connection_config,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_POOL_MAX_OVERFLOW,
+            timeout=config.DB_POOL_TIMEOUT,
+            recycle=config.DB_POOL_RECYCLE,
+            pre_ping=config.DB_POOL_PRE_PING,
+            ping_interval=config.DB_POOL_PING_INTERVAL
+        )
+        
+        # 查询结果缓存：按SQL指纹缓存，并与数据版本绑定
+        self.result_cache = LRUCache(
+            maxsize=config.RESULT_CACHE_MAX_ENTRIES,
+            max_bytes=config.RESULT_CACHE_MAX_BYTES,
+            sizeof=lambda entry: estimate_result_size(entry[2])
+        ) if config.RESULT_CACHE_ENABLED else None
+        self._data_version: Optional[Tuple[Any, ...]] = None
+        self._data_version_checked_at = 0.0
+        self._data_version_lock = threading.Lock()
+        
+        # 查询负载记录：供负载汇总与索引建议使用
+        self.workload = WorkloadRecorder()
+        
+        # 执行计划缓存：按SQL指纹缓存EXPLAIN汇总，供执行前的代价检查复用
+        self.plan_cache = LRUCache(
+            maxsize=config.QUERY_PLAN_CACHE_SIZE,
+            ttl=config.QUERY_PLAN_CACHE_TTL
+        )
+        
+        # 有界线程池：异步接口在此执行阻塞的pymysql调用，避免阻塞事件循环
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, config.DB_EXECUTOR_WORKERS),
+            thread_name_prefix="db-worker"
+        )
         
     @contextmanager
     def get_connection(self):
-        """获取数据库连接上下文管理器"""
+        """从连接池获取数据库连接上下文管理器"""
         connection = None
+        invalidate = False
         try:
-            connection = pymysql.connect(**self.connection_config)
-            logger.info("数据库连接成功")
+            connection = self.pool.acquire()
             yield connection
         except pymysql.Error as e:
-            logger.error(f"数据库连接失败: {e}")
+            # 客户端错误码(2000-2999)表示连接已断开，连接不可再复用
+            error_code = e.args[0] if e.args and isinstance(e.args[0], int) else 0
+            if isinstance(e, pymysql.InterfaceError) or 2000 <= error_code < 3000:
+                invalidate = True
+                logger.error(f"数据库连接失败: {e}")
+            else:
+                logger.error(f"数据库操作失败: {e}")
             raise
         finally:
-            if connection and connection.open:
-                connection.close()
-                logger.debug("数据库连接已关闭")
+            if connection is not None:
+                self.pool.release(connection, invalidate=invalidate)
+    
+    def warm_up(self) -> int:
+        """
+        预热连接池
+        
+        Returns:
+            int: 新建的连接数
+        """
+        return self.pool.warm_up()
+    
+    def close(self) -> None:
+        """关闭连接池、数据库线程池与负载日志"""
+        self.executor.shutdown(wait=False)
+        self.pool.dispose()
+        self.workload.close()
+    
+    async def run_in_executor(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        在数据库线程池中执行阻塞函数
+        
+        Args:
+            func: 阻塞函数
+            
+        Returns:
+            函数返回值
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+    
+    def get_pool_status(self) -> Dict[str, Any]:
+        """
+        获取连接池状态
+        
+        Returns:
+            Dict[str, Any]: 连接池指标
+        """
+        return self.pool.get_status()
     
     def test_connection(self) -> bool:
         """测试数据库连接"""
@@ -60,36 +256,417 @@ class DatabaseService:
             logger.error(f"数据库连接测试失败: {e}")
             return False
     
-    def execute_query(self, sql: str) -> Tuple[List[Dict[str, Any]], float]:
+    async def iterate_in_executor(self, iterator: Iterator[T]) -> AsyncIterator[T]:
         """
-        执行SQL查询
+        在数据库线程池中逐个拉取阻塞迭代器的元素
+        
+        迭代结束或调用方提前退出时关闭迭代器，释放其持有的游标与连接
+        
+        Args:
+            iterator: 阻塞的同步迭代器（通常为生成器）
+            
+        Yields:
+            迭代器中的元素
+        """
+        sentinel = object()
+        try:
+            while True:
+                item = await self.run_in_executor(next, iterator, sentinel)
+                if item is sentinel:
+                    break
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                await self.run_in_executor(close)
+    
+    async def test_connection_async(self) -> bool:
+        """异步测试数据库连接"""
+        return await self.run_in_executor(self.test_connection)
+    
+    def get_data_version(self, force: bool = False) -> Optional[Tuple[Any, ...]]:
+        """
+        获取pipeline_info的数据版本
+        
+        以 (COUNT(*), MAX(id), MAX(updated_at)) 作为廉价的版本探测，
+        在DATA_VERSION_CHECK_INTERVAL秒内复用上次结果
+        
+        Args:
+            force: 忽略探测间隔立即重新探测
+            
+        Returns:
+            Optional[Tuple[Any, ...]]: 数据版本，探测失败时返回None
+        """
+        with self._data_version_lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self._data_version is not None
+                and now - self._data_version_checked_at < config.DATA_VERSION_CHECK_INTERVAL
+            ):
+                return self._data_version
+            
+            try:
+                with self.get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT COUNT(*) AS row_count, MAX(id) AS max_id, "
+                            "MAX(updated_at) AS max_updated_at FROM pipeline_info"
+                        )
+                        row = cursor.fetchone()
+            except Exception as e:
+                logger.warning(f"数据版本探测失败: {e}")
+                self._data_version = None
+                return None
+            
+            version = (row["row_count"], row["max_id"], row["max_updated_at"])
+            if self._data_version is not None and version != self._data_version:
+                logger.info("检测到数据变更，清空查询结果缓存")
+                if self.result_cache is not None:
+                    self.result_cache.clear()
+            self._data_version = version
+            self._data_version_checked_at = now
+            return version
+    
+    def explain(self, sql: str, params: Optional[Tuple[Any, ...]] = None) -> Optional[Dict[str, Any]]:
+        """
+        获取查询的执行计划汇总（按SQL指纹缓存）
         
         Args:
             sql: SQL查询语句
+            params: SQL参数
             
         Returns:
-            Tuple[List[Dict[str, Any]], float]: 查询结果和执行时间
+            Optional[Dict[str, Any]]: 执行计划汇总，EXPLAIN失败时返回None
+        """
+        key = sql_fingerprint(sql)
+        plan = self.plan_cache.get(key)
+        if plan is not None:
+            return plan
+        
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                    cursor.execute("EXPLAIN " + sql, params)
+                    rows = cursor.fetchall()
+        except pymysql.Error as e:
+            logger.warning(f"获取执行计划失败，跳过代价检查: {e}")
+            return None
+        
+        plan = summarize_plan(list(rows))
+        self.plan_cache.set(key, plan)
+        return plan
+    
+    @staticmethod
+    def _time_limit(plan: Optional[Dict[str, Any]], streaming: bool) -> int:
+        """按执行计划确定服务端执行时间上限(毫秒)"""
+        if streaming:
+            return config.STREAM_MAX_EXECUTION_TIME
+        if plan is not None and plan["full_scan"] and config.QUERY_FULL_SCAN_MAX_EXECUTION_TIME > 0:
+            if config.QUERY_MAX_EXECUTION_TIME <= 0:
+                return config.QUERY_FULL_SCAN_MAX_EXECUTION_TIME
+            return min(config.QUERY_MAX_EXECUTION_TIME, config.QUERY_FULL_SCAN_MAX_EXECUTION_TIME)
+        return config.QUERY_MAX_EXECUTION_TIME
+    
+    def _plan_summary(self, plan: Optional[Dict[str, Any]], streaming: bool) -> Dict[str, Any]:
+        summary = dict(plan) if plan is not None else {"estimated_rows": None, "full_scan": None, "access": []}
+        summary["max_execution_time_ms"] = self._time_limit(plan, streaming)
+        return summary
+    
+    def check_cost(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None,
+        streaming: bool = False
+    ) -> Dict[str, Any]:
+        """
+        执行前的代价检查
+        
+        预计扫描行数超过QUERY_MAX_EXAMINED_ROWS时拒绝执行；
+        预计全表扫描的普通查询收紧执行时间上限
+        
+        Args:
+            sql: SQL查询语句
+            params: SQL参数
+            streaming: 是否为流式查询/导出（使用STREAM_MAX_EXECUTION_TIME）
+            
+        Returns:
+            Dict[str, Any]: 执行计划汇总，含本次执行使用的max_execution_time_ms
+            
+        Raises:
+            QueryCostError: 预估代价超出预算
+        """
+        plan = self.explain(sql, params) if config.QUERY_COST_GUARD_ENABLED else None
+        summary = self._plan_summary(plan, streaming)
+        if plan is not None and plan["estimated_rows"] > config.QUERY_MAX_EXAMINED_ROWS:
+            logger.warning(f"查询预计扫描 {plan['estimated_rows']} 行，超过预算，拒绝执行: {sql}")
+            raise QueryCostError(
+                f"查询预计扫描约 {plan['estimated_rows']} 行，超过上限 {config.QUERY_MAX_EXAMINED_ROWS} 行，"
+                "请增加筛选条件后重试",
+                summary
+            )
+        return summary
+    
+    async def check_cost_async(self, sql: str, streaming: bool = False) -> Dict[str, Any]:
+        """异步执行代价检查"""
+        return await self.run_in_executor(self.check_cost, sql, None, streaming)
+    
+    def get_plan_summary(self, sql: str, streaming: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        读取已缓存的执行计划汇总（不执行EXPLAIN）
+        
+        Args:
+            sql: SQL查询语句
+            streaming: 是否为流式查询/导出
+            
+        Returns:
+            Optional[Dict[str, Any]]: 执行计划汇总，未缓存时返回None
+        """
+        plan = self.plan_cache.get(sql_fingerprint(sql))
+        return self._plan_summary(plan, streaming) if plan is not None else None
+    
+    def _guard_error(self, error: pymysql.Error, plan: Dict[str, Any]) -> Optional[QueryGuardError]:
+        """将执行超时类的数据库错误转换为可展示的错误"""
+        code = error.args[0] if error.args and isinstance(error.args[0], int) else 0
+        if code in _QUERY_INTERRUPTED_CODES:
+            limit = plan.get("max_execution_time_ms") or 0
+            return QueryTimeoutError(
+                f"查询执行超过 {limit / 1000:g} 秒已被终止，请缩小查询范围或增加筛选条件" if limit
+                else "查询已被数据库终止，请缩小查询范围或增加筛选条件",
+                plan
+            )
+        if code == _LOST_CONNECTION_CODE:
+            return QueryTimeoutError(
+                f"等待数据库返回结果超过 {config.DB_READ_TIMEOUT:g} 秒或连接中断，请缩小查询范围后重试",
+                plan
+            )
+        return None
+    
+    def _execute(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]],
+        use_cache: bool,
+        columnar: bool
+    ) -> Tuple[Optional[List[str]], List[Any], float]:
+        """
+        执行SQL查询并维护结果缓存
+        
+        Args:
+            sql: SQL查询语句
+            params: SQL参数
+            use_cache: 是否使用查询结果缓存
+            columnar: 为True时使用元组游标，返回列名与元组行
+            
+        Returns:
+            Tuple[Optional[List[str]], List[Any], float]: 列名(仅元组模式)、结果行和执行时间
         """
         start_time = time.time()
         
+        cache_key = None
+        data_version = None
+        if use_cache and self.result_cache is not None:
+            data_version = self.get_data_version()
+            if data_version is not None:
+                cache_key = (sql_fingerprint(sql), params, columnar)
+                cached = self.result_cache.get(cache_key)
+                if cached is not None and cached[0] == data_version:
+                    execution_time = time.time() - start_time
+                    logger.debug(f"查询结果缓存命中，返回 {len(cached[2])} 条记录")
+                    return cached[1], cached[2], execution_time
+        
+        plan = self.check_cost(sql, params)
+        
         try:
             with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    logger.info(f"执行SQL: {sql}")
-                    cursor.execute(sql)
-                    results = cursor.fetchall()
+                cursor_class = pymysql.cursors.Cursor if columnar else None
+                with conn.cursor(cursor_class) as cursor:
+                    logger.debug(f"执行SQL: {sql}")
+                    cursor.execute(with_time_limit(sql, plan["max_execution_time_ms"]), params)
+                    results = list(cursor.fetchall())
+                    columns = (
+                        [column[0] for column in cursor.description or []]
+                        if columnar else None
+                    )
                     
                     execution_time = time.time() - start_time
-                    logger.info(f"查询完成，返回 {len(results)} 条记录，耗时 {execution_time:.3f} 秒")
+                    logger.debug(f"查询完成，返回 {len(results)} 条记录，耗时 {execution_time:.3f} 秒")
+                    self.workload.record(sql, params, execution_time, len(results))
                     
-                    return results, execution_time
+                    if cache_key is not None:
+                        # 结果与执行前的数据版本绑定，版本变化后不会再被命中
+                        self.result_cache.set(cache_key, (data_version, columns, results))
+                    
+                    return columns, results, execution_time
                     
         except pymysql.Error as e:
-            execution_time = time.time() - start_time
             logger.error(f"SQL执行失败: {e}")
             logger.error(f"SQL语句: {sql}")
+            # 超时被终止的执行往往正是最慢的查询，同样计入负载统计与慢查询日志
+            self.workload.record(sql, params, time.time() - start_time, 0, error=str(e))
+            guard_error = self._guard_error(e, plan)
+            if guard_error is not None:
+                raise guard_error
             raise Exception(f"数据库查询失败: {str(e)}")
     
+    def execute_query(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None,
+        use_cache: bool = True
+    ) -> Tuple[List[Dict[str, Any]], float]:
+        """
+        执行SQL查询
+        
+        Args:
+            sql: SQL查询语句
+            params: SQL参数
+            use_cache: 是否使用查询结果缓存
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], float]: 查询结果和执行时间
+        """
+        _, results, execution_time = self._execute(sql, params, use_cache, columnar=False)
+        return results, execution_time
+    
+    def execute_query_columnar(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None,
+        use_cache: bool = True
+    ) -> Tuple[List[str], List[Tuple[Any, ...]], float]:
+        """
+        以元组游标执行SQL查询，不为每行构建字典
+        
+        Args:
+            sql: SQL查询语句
+            params: SQL参数
+            use_cache: 是否使用查询结果缓存
+            
+        Returns:
+            Tuple[List[str], List[Tuple[Any, ...]], float]: 列名、元组行和执行时间
+        """
+        return self._execute(sql, params, use_cache, columnar=True)
+    
+    def stream_query(self, sql: str, batch_size: int = 500, with_types: bool = False) -> Iterator[Any]:
+        """
+        使用无缓冲的服务端游标(SSCursor)分批读取查询结果
+        
+        第一个元素为列名列表，之后每个元素为一批行元组；内存占用只与批大小有关
+        
+        Args:
+            sql: SQL查询语句
+            batch_size: 每批行数
+            with_types: 为True时第一个元素为 (列名, pymysql字段类型码) 列表
+            
+        Yields:
+            列名列表，随后为 List[tuple] 批次
+        """
+        connection = self.pool.acquire()
+        cursor = None
+        completed = False
+        try:
+            start_time = time.time()
+            row_count = 0
+            cursor = connection.cursor(pymysql.cursors.SSCursor)
+            logger.debug(f"流式执行SQL: {sql}")
+            cursor.execute(with_time_limit(sql, config.STREAM_MAX_EXECUTION_TIME))
+            description = cursor.description or []
+            if with_types:
+                yield [(column[0], column[1]) for column in description]
+            else:
+                yield [column[0] for column in description]
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                row_count += len(rows)
+                yield rows
+            completed = True
+            self.workload.record(sql, None, time.time() - start_time, row_count)
+        except pymysql.Error as e:
+            logger.error(f"流式SQL执行失败: {e}")
+            logger.error(f"SQL语句: {sql}")
+            self.workload.record(sql, None, time.time() - start_time, row_count, error=str(e))
+            guard_error = self._guard_error(e, {"max_execution_time_ms": config.STREAM_MAX_EXECUTION_TIME})
+            if guard_error is not None:
+                raise guard_error
+            raise Exception(f"数据库查询失败: {str(e)}")
+        finally:
+            if completed:
+                cursor.close()
+                self.pool.release(connection)
+            else:
+                # 未读完的结果集需要逐行排空才能复用连接，直接丢弃连接代价更低
+                self.pool.release(connection, invalidate=True)
+    
+    def get_result_cache_info(self) -> Dict[str, Any]:
+        """
+        获取查询结果缓存统计信息
+        
+        Returns:
+            Dict[str, Any]: 缓存统计与当前数据版本
+        """
+        if self.result_cache is None:
+            return {"enabled": False}
+        
+        version = self._data_version
+        return {
+            "enabled": True,
+            "stats": self.result_cache.get_stats(),
+            "data_version": {
+                "row_count": version[0],
+                "max_id": version[1],
+                "max_updated_at": str(version[2]) if version[2] is not None else None
+            } if version else None
+        }
+    
+    def purge_result_cache(self) -> int:
+        """
+        清空查询结果缓存
+        
+        Returns:
+            int: 清除的条目数
+        """
+        if self.result_cache is None:
+            return 0
+        return self.result_cache.clear()
+    
+    async def execute_query_async(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None
+    ) -> Tuple[List[Dict[str, Any]], float]:
+        """
+        异步执行SQL查询
+        
+        Args:
+            sql: SQL查询语句
+            params: SQL参数
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], float]: 查询结果和执行时间
+        """
+        return await self.run_in_executor(self.execute_query, sql, params)
+    
+    async def execute_query_columnar_async(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None
+    ) -> Tuple[List[str], List[Tuple[Any, ...]], float]:
+        """
+        异步以元组游标执行SQL查询
+        
+        Args:
+            sql: SQL查询语句
+            params: SQL参数
+            
+        Returns:
+            Tuple[List[str], List[Tuple[Any, ...]], float]: 列名、元组行和执行时间
+        """
+        return await self.run_in_executor(self.execute_query_columnar, sql, params)
+    
     def get_table_schema(self) -> List[Dict[str, Any]]:
         """
         获取表结构信息
@@ -118,74 +695,104 @@ class DatabaseService:
             logger.error(f"获取表结构失败: {e}")
             raise
     
+    async def get_table_schema_async(self) -> List[Dict[str, Any]]:
+        """异步获取表结构信息"""
+        return await self.run_in_executor(self.get_table_schema)
+    
     def get_database_stats(self) -> DatabaseStats:
         """
         获取数据库统计信息
         
+        所有统计项由一条UNION ALL组合查询一次往返得到，每个分支都能由现有索引覆盖：
+        (province, city) 分组同时得到总数、省份数与城市数
+        
         Returns:
             DatabaseStats: 数据库统计信息
         """
+        sql = """
+            SELECT 'region' AS dim, province AS k1, city AS k2, COUNT(*) AS count
+            FROM pipeline_info
+            GROUP BY province, city
+            UNION ALL
+            SELECT 'pipeline_type', pipeline_type, NULL, COUNT(*)
+            FROM pipeline_info
+            GROUP BY pipeline_type
+            UNION ALL
+            SELECT 'disaster_type', disaster_type, NULL, COUNT(*)
+            FROM pipeline_info
+            WHERE disaster_type IS NOT NULL
+            GROUP BY disaster_type
+            UNION ALL
+            SELECT 'build_year', CAST(build_year AS CHAR), NULL, COUNT(*)
+            FROM pipeline_info
+            WHERE build_year IS NOT NULL
+            GROUP BY build_year
+        """
+        
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    stats = {}
-                    
-                    # 总管道数量
-                    cursor.execute("SELECT COUNT(*) as total FROM pipeline_info")
-                    stats['total_pipelines'] = cursor.fetchone()['total']
-                    
-                    # 省份数量
-                    cursor.execute("SELECT COUNT(DISTINCT province) as count FROM pipeline_info")
-                    stats['provinces_count'] = cursor.fetchone()['count']
-                    
-                    # 城市数量
-                    cursor.execute("SELECT COUNT(DISTINCT city) as count FROM pipeline_info")
-                    stats['cities_count'] = cursor.fetchone()['count']
-                    
-                    # 管道类型统计
-                    cursor.execute("""
-                        SELECT pipeline_type, COUNT(*) as count 
-                        FROM pipeline_info 
-                        GROUP BY pipeline_type 
-                        ORDER BY count DESC
-                    """)
-                    stats['pipeline_types'] = {
-                        row['pipeline_type']: row['count'] 
-                        for row in cursor.fetchall()
-                    }
-                    
-                    # 灾害类型统计
-                    cursor.execute("""
-                        SELECT disaster_type, COUNT(*) as count 
-                        FROM pipeline_info 
-                        WHERE disaster_type IS NOT NULL
-                        GROUP BY disaster_type 
-                        ORDER BY count DESC
-                    """)
-                    stats['disaster_types'] = {
-                        row['disaster_type']: row['count'] 
-                        for row in cursor.fetchall()
-                    }
-                    
-                    # 年份分布统计
-                    cursor.execute("""
-                        SELECT build_year, COUNT(*) as count 
-                        FROM pipeline_info 
-                        WHERE build_year IS NOT NULL
-                        GROUP BY build_year 
-                        ORDER BY build_year DESC
-                        LIMIT 10
-                    """)
-                    stats['yearly_distribution'] = {
-                        str(row['build_year']): row['count'] 
-                        for row in cursor.fetchall()
-                    }
-                    
-                    return DatabaseStats(**stats)
-                    
+                    cursor.execute(sql)
+                    rows = cursor.fetchall()
         except Exception as e:
             logger.error(f"获取数据库统计信息失败: {e}")
             raise
+        
+        total = 0
+        provinces = set()
+        cities = set()
+        pipeline_types: Dict[str, int] = {}
+        disaster_types: Dict[str, int] = {}
+        years: Dict[int, int] = {}
+        
+        for row in rows:
+            dim, key, count = row['dim'], row['k1'], int(row['count'])
+            if dim == 'region':
+                total += count
+                provinces.add(key)
+                cities.add(row['k2'])
+            elif dim == 'pipeline_type':
+                pipeline_types[key] = count
+            elif dim == 'disaster_type':
+                disaster_types[key] = count
+            elif dim == 'build_year':
+                years[int(key)] = count
+        
+        def by_count(counts: Dict[str, int]) -> Dict[str, int]:
+            return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+        
+        return DatabaseStats(
+            total_pipelines=total,
+            provinces_count=len(provinces),
+            cities_count=len(cities),
+            pipeline_types=by_count(pipeline_types),
+            disaster_types=by_count(disaster_types),
+            # 最近10个建成年份
+            yearly_distribution={
+                str(year): years[year] for year in sorted(years, reverse=True)[:10]
+            }
+        )
+    
+    async def get_database_stats_async(self) -> DatabaseStats:
+        """异步获取数据库统计信息"""
+        return await self.run_in_executor(self.get_database_stats)
+    
+    def check_sql(self, sql: str) -> ParsedSQL:
+        """
+        解析SQL并按表结构白名单校验
+        
+        只允许单条SELECT语句，表、字段与函数均需在白名单内
+        
+        Args:
+            sql: SQL语句
+            
+        Returns:
+            ParsedSQL: 解析结果（含规范化SQL、聚合与分组信息）
+            
+        Raises:
+            SQLValidationError: SQL无法解析或不符合安全要求
+        """
+        return validate_sql(sql)
     
     def validate_sql(self, sql: str) -> bool:
         """
@@ -197,27 +804,44 @@ class DatabaseService:
         Returns:
             bool: 是否安全
         """
-        # 转换为小写进行检查
-        sql_lower = sql.lower().strip()
-        
-        # 检查是否包含危险操作
-        dangerous_keywords = [
-            'drop', 'delete', 'update', 'insert', 'create', 'alter', 
-            'truncate', 'grant', 'revoke', 'exec', 'execute'
-        ]
-        
-        for keyword in dangerous_keywords:
-            if keyword in sql_lower:
-                logger.warning(f"SQL包含危险关键字: {keyword}")
-                return False
-        
-        # 检查是否是SELECT语句
-        if not sql_lower.startswith('select'):
-            logger.warning("只允许SELECT查询")
+        try:
+            self.check_sql(sql)
+        except SQLValidationError as e:
+            logger.warning(f"SQL未通过安全验证: {e}")
             return False
-        
         return True
     
+    @staticmethod
+    def format_value(value: Any) -> Any:
+        """
+        格式化单个字段值
+        
+        Args:
+            value: 原始值
+            
+        Returns:
+            Any: 日期时间转为字符串，None转为空字符串
+        """
+        # 处理日期时间类型
+        if hasattr(value, 'strftime'):
+            return value.strftime('%Y-%m-%d %H:%M:%S')
+        # 处理None值
+        if value is None:
+            return ""
+        return value
+    
+    def format_row(self, row: Tuple[Any, ...]) -> List[Any]:
+        """
+        格式化元组形式的单行结果
+        
+        Args:
+            row: 行元组
+            
+        Returns:
+            List[Any]: 格式化后的字段值列表
+        """
+        return [self.format_value(value) for value in row]
+    
     def format_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         格式化查询结果
@@ -228,20 +852,8 @@ class DatabaseService:
         Returns:
             List[Dict[str, Any]]: 格式化后的结果
         """
-        formatted_results = []
-        
-        for row in results:
-            formatted_row = {}
-            for key, value in row.items():
-                # 处理日期时间类型
-                if hasattr(value, 'strftime'):
-                    formatted_row[key] = value.strftime('%Y-%m-%d %H:%M:%S')
-                # 处理None值
-                elif value is None:
-                    formatted_row[key] = ""
-                else:
-                    formatted_row[key] = value
-            
-            formatted_results.append(formatted_row)
-        
-        return formatted_results 
\ No newline at end of file
+        format_value = self.format_value
+        return [
+            {key: format_value(value) for key, value in row.items()}
+            for row in results
+        ]
\ No newline at end of file
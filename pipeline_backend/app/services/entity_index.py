@@ -0,0 +1,432 @@
+"""
+实体词典索引模块
+以pipeline_info中各实体字段的真实取值(及常见别称)构建Aho-Corasick自动机，
+单次线性扫描即可识别问题中的实体，并将SQL中的字面量改写为库中的规范取值
+"""
+
+import re
+import threading
+import time
+import unicodedata
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from pymysql.converters import escape_string
+from .database_service import DatabaseService
+from .question_normalizer import PROVINCE_SUFFIXES
+from config import config
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 参与索引的字段（同一别称对应多个字段时，靠前的字段优先）
+ENTITY_COLUMNS = [
+    "province", "city", "pipeline_type", "disaster_type",
+    "geological_feature", "laying_method"
+]
+
+_PROVINCE_FULL_NAME = re.compile(
+    r"^(.+?)(?:壮族自治区|回族自治区|维吾尔自治区|自治区|特别行政区|省|市)$"
+)
+_CITY_SUFFIX = re.compile(r"^(.{2,}?)市$")
+_PIPELINE_SUFFIX = re.compile(r"^(.{2,}?)(?:管道|管线)$")
+
+# SQL中实体字段与字符串字面量的比较
+_STRING_LITERAL = r"'(?:[^'\\]|\\.|'')*'"
+_COLUMN_REF = r"(?<![\w.`])(?:`?\w+`?\.)?`?(" + "|".join(ENTITY_COLUMNS) + r")`?"
+_COMPARISON = re.compile(
+    _COLUMN_REF + r"\s*(=|!=|<>|\bnot\s+like\b|\blike\b)\s*(" + _STRING_LITERAL + ")",
+    re.I
+)
+_IN_LIST = re.compile(
+    _COLUMN_REF + r"\s+((?:not\s+)?in)\s*\(((?:\s*" + _STRING_LITERAL + r"\s*,?)+)\)",
+    re.I
+)
+_LITERAL = re.compile(_STRING_LITERAL)
+
+
+@dataclass
+class EntityMatch:
+    """问题中识别出的实体"""
+    start: int
+    end: int
+    text: str
+    column: str
+    value: str
+
+
+def _fold(text: str) -> str:
+    """NFKC规范化并转小写（保持长度不变以便定位原文区间）"""
+    folded = unicodedata.normalize("NFKC", text).lower()
+    return folded if len(folded) == len(text) else text.lower()
+
+
+def _unquote(literal: str) -> str:
+    """去掉SQL字符串字面量的引号与转义"""
+    body = literal[1:-1]
+    return re.sub(r"\\(.)|''", lambda m: m.group(1) or "'", body)
+
+
+def _quote(value: str) -> str:
+    return "'" + escape_string(value) + "'"
+
+
+class _Automaton:
+    """Aho-Corasick多模式匹配自动机"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._length: List[int] = [0]   # 以该节点结尾的最长模式长度，0表示无
+        self._output: List[int] = [0]   # 沿失败链最近的带模式节点
+
+        for pattern in patterns:
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._length.append(0)
+                    self._output.append(0)
+                node = next_node
+            self._length[node] = len(pattern)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = (
+                    self._fail[child] if self._length[self._fail[child]] else self._output[self._fail[child]]
+                )
+                queue.append(child)
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int]]:
+        """线性扫描文本，产出所有命中的(起点, 终点)"""
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+
+            hit = node if self._length[node] else self._output[node]
+            while hit:
+                yield index + 1 - self._length[hit], index + 1
+                hit = self._output[hit]
+
+
+def _empty_values() -> Dict[str, Set[str]]:
+    return {column: set() for column in ENTITY_COLUMNS}
+
+
+def _empty_canonical() -> Dict[str, Dict[str, str]]:
+    return {column: {} for column in ENTITY_COLUMNS}
+
+
+@dataclass
+class _Vocabulary:
+    """
+    索引内容：各字段取值、别称候选、规范取值映射与自动机
+
+    刷新时在新对象上构建，完成后整体替换；读取方持有的旧对象始终自洽
+    """
+    values: Dict[str, Set[str]] = field(default_factory=_empty_values)
+    aliases: Dict[str, List[Tuple[str, str]]] = field(default_factory=dict)
+    canonical: Dict[str, Dict[str, str]] = field(default_factory=_empty_canonical)
+    automaton: Optional[_Automaton] = None
+
+    def copy(self) -> "_Vocabulary":
+        """复制取值与别称，供增量加载在副本上追加"""
+        return _Vocabulary(
+            values={column: set(values) for column, values in self.values.items()},
+            aliases={alias: list(candidates) for alias, candidates in self.aliases.items()},
+            canonical={column: dict(mapping) for column, mapping in self.canonical.items()}
+        )
+
+    def add_values(self, column: str, values: Iterable[Any]) -> int:
+        """加入新取值，返回新增数量"""
+        added = 0
+        for raw in values:
+            if raw is None or raw == "":
+                continue
+            value = str(raw)
+            if value in self.values[column]:
+                continue
+            self.values[column].add(value)
+            added += 1
+            for alias in EntityIndex.aliases_for(column, value):
+                self.canonical[column].setdefault(alias, value)
+                self.aliases.setdefault(alias, []).append((column, value))
+        return added
+
+    def build(self) -> None:
+        """构建自动机"""
+        # 按字段优先级排序，使同一别称的首个候选来自优先字段
+        priority = {column: index for index, column in enumerate(ENTITY_COLUMNS)}
+        for candidates in self.aliases.values():
+            candidates.sort(key=lambda item: priority[item[0]])
+        self.automaton = _Automaton(self.aliases)
+
+
+class EntityIndex:
+    """实体词典索引类"""
+
+    def __init__(self, db_service: DatabaseService, refresh_interval: float = 300.0):
+        """
+        初始化实体词典索引
+
+        Args:
+            db_service: 数据库服务
+            refresh_interval: 全量重建间隔(秒)，期间仅按新增行增量加载
+        """
+        self.db_service = db_service
+        self.refresh_interval = refresh_interval
+        self._vocabulary = _Vocabulary()
+        self._version: Optional[Tuple[Any, ...]] = None
+        self._max_id = 0
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"full_loads": 0, "incremental_loads": 0, "sql_rewrites": 0}
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._vocabulary.automaton is not None
+
+    @property
+    def refresh_due(self) -> bool:
+        """索引尚未加载或距上次检查已超过数据版本探测间隔"""
+        return (
+            not self.is_loaded
+            or time.monotonic() - self._checked_at >= config.DATA_VERSION_CHECK_INTERVAL
+        )
+
+    @staticmethod
+    def aliases_for(column: str, value: str) -> List[str]:
+        """
+        生成取值的常见写法（规范取值本身、简称与全称）
+
+        Args:
+            column: 字段名
+            value: 库中的规范取值
+
+        Returns:
+            List[str]: 别称列表（已小写）
+        """
+        aliases = [value]
+        if column == "province":
+            match = _PROVINCE_FULL_NAME.match(value)
+            base = match.group(1) if match and match.group(1) in PROVINCE_SUFFIXES else value
+            aliases.append(base)
+            if base in PROVINCE_SUFFIXES:
+                aliases.append(base + PROVINCE_SUFFIXES[base])
+                if PROVINCE_SUFFIXES[base].endswith("自治区") and PROVINCE_SUFFIXES[base] != "自治区":
+                    aliases.append(base + "自治区")
+        elif column == "city":
+            match = _CITY_SUFFIX.match(value)
+            if match:
+                aliases.append(match.group(1))
+            elif not value.endswith(("区", "县")):
+                aliases.append(value + "市")
+        elif column == "pipeline_type":
+            match = _PIPELINE_SUFFIX.match(value)
+            if match:
+                aliases.append(match.group(1))
+        return list(dict.fromkeys(_fold(alias) for alias in aliases))
+
+    def _load(self, vocabulary: _Vocabulary, min_id: int) -> Tuple[int, int]:
+        """
+        将 id > min_id 的行中出现的取值加入vocabulary
+
+        Returns:
+            Tuple[int, int]: 新增取值数量与本次扫描的id上界
+        """
+        added = 0
+        with self.db_service.get_connection() as conn:
+            with conn.cursor() as cursor:
+                # 先确定上界，扫描期间新插入的行留给下一次增量加载
+                cursor.execute("SELECT MAX(id) AS max_id FROM pipeline_info")
+                max_id = cursor.fetchone()["max_id"] or 0
+                for column in ENTITY_COLUMNS:
+                    cursor.execute(
+                        f"SELECT DISTINCT {column} AS value FROM pipeline_info "
+                        f"WHERE id > %s AND id <= %s AND {column} IS NOT NULL AND {column} <> ''",
+                        (min_id, max_id)
+                    )
+                    added += vocabulary.add_values(column, (row["value"] for row in cursor.fetchall()))
+        return added, max_id
+
+    def refresh(self, full: bool = False) -> bool:
+        """
+        按数据版本刷新索引
+
+        仅有新增行时只加载新增行中的取值；其余数据变化或超过全量重建间隔时全量重建
+
+        Args:
+            full: 强制全量重建
+
+        Returns:
+            bool: 索引内容是否发生变化
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            version = self.db_service.get_data_version()
+            if (
+                not full
+                and self.is_loaded
+                and (version is None or version == self._version)
+                and time.monotonic() - self._loaded_at < self.refresh_interval
+            ):
+                return False
+
+            appended_only = (
+                not full
+                and self.is_loaded
+                and version is not None
+                and self._version is not None
+                and version[0] >= self._version[0]
+                and (version[1] or 0) > self._max_id
+                and time.monotonic() - self._loaded_at < self.refresh_interval
+            )
+
+            # 在新的词表上加载与构建，完成后整体替换，查询期间始终使用自洽的旧词表
+            if appended_only:
+                vocabulary = self._vocabulary.copy()
+                added, max_id = self._load(vocabulary, self._max_id)
+                self.stats["incremental_loads"] += 1
+                if added:
+                    vocabulary.build()
+                    self._vocabulary = vocabulary
+                    logger.info(f"实体索引增量加载 {added} 个新取值")
+                self._max_id = max(self._max_id, max_id)
+            else:
+                vocabulary = _Vocabulary()
+                added, max_id = self._load(vocabulary, 0)
+                vocabulary.build()
+                self._vocabulary = vocabulary
+                self._max_id = max_id
+                self._loaded_at = time.monotonic()
+                self.stats["full_loads"] += 1
+                logger.info(f"实体索引已重建，共 {added} 个取值、{len(vocabulary.aliases)} 个词条")
+
+            self._version = version
+            return bool(added) or not appended_only
+
+    def find(self, text: str) -> List[EntityMatch]:
+        """
+        单次扫描识别文本中的实体（最左最长、互不重叠）
+
+        Args:
+            text: 问题文本
+
+        Returns:
+            List[EntityMatch]: 按出现位置排序的实体
+        """
+        vocabulary = self._vocabulary
+        automaton = vocabulary.automaton
+        if automaton is None or not text:
+            return []
+
+        folded = _fold(text)
+        longest: Dict[int, int] = {}
+        for start, end in automaton.iter_matches(folded):
+            if end > longest.get(start, -1):
+                longest[start] = end
+
+        matches: List[EntityMatch] = []
+        position = 0
+        for start in sorted(longest):
+            if start < position:
+                continue
+            end = longest[start]
+            column, value = vocabulary.aliases[folded[start:end]][0]
+            matches.append(EntityMatch(start, end, text[start:end], column, value))
+            position = end
+        return matches
+
+    def canonicalize(self, column: str, literal: str) -> Optional[str]:
+        """
+        将字段取值的任意写法映射为库中的规范取值
+
+        Args:
+            column: 字段名
+            literal: 取值写法
+
+        Returns:
+            Optional[str]: 规范取值，未知写法返回None
+        """
+        aliases = self._vocabulary.canonical.get(column.lower())
+        if not aliases:
+            return None
+        return aliases.get(_fold(literal.strip()))
+
+    def _rewrite_literal(self, column: str, operator: str, literal: str, rewrites: List[Dict[str, str]]) -> str:
+        value = _unquote(literal)
+        if "like" in operator.lower():
+            inner = value.strip("%")
+            canonical = self.canonicalize(column, inner)
+            # 仅当规范取值比写法更短(如 '%广东省%' -> '%广东%')时改写，避免收窄匹配范围
+            if canonical is None or canonical == inner or canonical not in inner:
+                return literal
+            new_value = value.replace(inner, canonical)
+        else:
+            canonical = self.canonicalize(column, value)
+            if canonical is None or canonical == value:
+                return literal
+            new_value = canonical
+
+        rewrites.append({"column": column, "from": value, "to": new_value})
+        return _quote(new_value)
+
+    def canonicalize_sql(self, sql: str) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        将SQL中实体字段的字符串字面量改写为规范取值
+
+        如 province = '广东省' -> province = '广东'，pipeline_type IN ('燃气') -> IN ('燃气管道')
+
+        Args:
+            sql: 待改写SQL
+
+        Returns:
+            Tuple[str, List[Dict[str, str]]]: 改写后的SQL与改写记录
+        """
+        if not self.is_loaded:
+            return sql, []
+
+        rewrites: List[Dict[str, str]] = []
+
+        def comparison(match: "re.Match") -> str:
+            literal = self._rewrite_literal(match.group(1), match.group(2), match.group(3), rewrites)
+            return match.group(0)[:match.start(3) - match.start(0)] + literal
+
+        def in_list(match: "re.Match") -> str:
+            column = match.group(1)
+            literals = _LITERAL.sub(
+                lambda item: self._rewrite_literal(column, "=", item.group(0), rewrites),
+                match.group(3)
+            )
+            return match.group(0)[:match.start(3) - match.start(0)] + literals + ")"
+
+        rewritten = _IN_LIST.sub(in_list, _COMPARISON.sub(comparison, sql))
+        if rewrites:
+            self.stats["sql_rewrites"] += 1
+            logger.info(f"SQL实体取值已规范化: {rewrites}")
+        return rewritten, rewrites
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取索引状态"""
+        return {
+            "loaded": self.is_loaded,
+            "values": {column: len(values) for column, values in self._vocabulary.values.items()},
+            "aliases": len(self._vocabulary.aliases),
+            "max_id": self._max_id,
+            **self.stats
+        }
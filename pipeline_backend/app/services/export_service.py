@@ -0,0 +1,208 @@
+"""
+数据导出服务模块
+将查询结果按批从服务端游标读取并转换为CSV、Arrow IPC流或Parquet，内存占用与批大小相关
+"""
+
+import csv
+import io
+import logging
+from typing import Any, AsyncIterator, Iterator, List, Tuple
+from pymysql.constants import FIELD_TYPE
+from .database_service import DatabaseService
+from config import config
+
+# 可选依赖：Arrow/Parquet导出需要pyarrow
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - 可选依赖
+    pa = None
+    pq = None
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet")
+}
+
+# 低基数字符串列使用字典编码
+DICTIONARY_COLUMNS = {
+    "province", "city", "street", "road", "disaster_type",
+    "geological_feature", "pipeline_type", "laying_method"
+}
+
+_INTEGER_TYPES = {
+    FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG,
+    FIELD_TYPE.INT24, FIELD_TYPE.LONGLONG, FIELD_TYPE.YEAR
+}
+_FLOAT_TYPES = {
+    FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE, FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL
+}
+_TIMESTAMP_TYPES = {FIELD_TYPE.TIMESTAMP, FIELD_TYPE.DATETIME}
+
+
+class _ChunkSink(io.RawIOBase):
+    """收集写入数据的内存缓冲区，每批写完后由调用方取走"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ExportService:
+    """数据导出服务类"""
+
+    def __init__(self, db_service: DatabaseService):
+        """
+        初始化导出服务
+
+        Args:
+            db_service: 数据库服务
+        """
+        self.db_service = db_service
+
+    @staticmethod
+    def is_format_available(fmt: str) -> bool:
+        """检查导出格式所需的依赖是否可用"""
+        if fmt == "csv":
+            return True
+        return pa is not None
+
+    @staticmethod
+    def _arrow_type(name: str, type_code: int) -> "pa.DataType":
+        """将MySQL字段类型映射为Arrow类型"""
+        if type_code in _INTEGER_TYPES:
+            return pa.int64()
+        if type_code in _FLOAT_TYPES:
+            return pa.float64()
+        if type_code in _TIMESTAMP_TYPES:
+            return pa.timestamp("s")
+        if type_code == FIELD_TYPE.DATE:
+            return pa.date32()
+        if name in DICTIONARY_COLUMNS:
+            return pa.dictionary(pa.int32(), pa.string())
+        return pa.string()
+
+    @staticmethod
+    def _to_record_batch(schema: "pa.Schema", rows: List[Tuple[Any, ...]]) -> "pa.RecordBatch":
+        """将一批行元组按列转换为带类型的RecordBatch"""
+        columns = list(zip(*rows))
+        arrays = []
+        for field, values in zip(schema, columns):
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            elif pa.types.is_floating(field.type):
+                arrays.append(pa.array(
+                    [float(value) if value is not None else None for value in values],
+                    type=field.type
+                ))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def _iter_csv(self, batches: Iterator[Any]) -> Iterator[bytes]:
+        """生成CSV数据块"""
+        columns = next(batches)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+
+        for rows in batches:
+            writer.writerows(
+                ["" if value is None else value for value in row] for row in rows
+            )
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    def _iter_arrow(self, batches: Iterator[Any], fmt: str) -> Iterator[bytes]:
+        """生成Arrow IPC流或Parquet数据块"""
+        described = next(batches)
+        schema = pa.schema([
+            pa.field(name, self._arrow_type(name, type_code)) for name, type_code in described
+        ])
+
+        sink = _ChunkSink()
+        if fmt == "parquet":
+            writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+        else:
+            writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+
+        try:
+            for rows in batches:
+                record_batch = self._to_record_batch(schema, rows)
+                if fmt == "parquet":
+                    writer.write_table(pa.Table.from_batches([record_batch]))
+                else:
+                    writer.write_batch(record_batch)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        finally:
+            writer.close()
+
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+
+    def iter_export(self, sql: str, fmt: str) -> Iterator[bytes]:
+        """
+        按指定格式导出查询结果（阻塞生成器）
+
+        Args:
+            sql: 已验证的SQL
+            fmt: 导出格式 csv | arrow | parquet
+
+        Yields:
+            bytes: 编码后的数据块
+        """
+        batches = self.db_service.stream_query(
+            sql, config.EXPORT_BATCH_SIZE, with_types=(fmt != "csv")
+        )
+        try:
+            if fmt == "csv":
+                yield from self._iter_csv(batches)
+            else:
+                yield from self._iter_arrow(batches, fmt)
+        finally:
+            batches.close()
+
+    async def export_async(self, sql: str, fmt: str) -> AsyncIterator[bytes]:
+        """
+        异步导出查询结果，编码与数据库读取均在数据库线程池中执行
+
+        Args:
+            sql: 已验证的SQL
+            fmt: 导出格式 csv | arrow | parquet
+
+        Yields:
+            bytes: 编码后的数据块
+        """
+        logger.info(f"开始导出({fmt}): {sql}")
+        async for chunk in self.db_service.iterate_in_executor(self.iter_export(sql, fmt)):
+            yield chunk
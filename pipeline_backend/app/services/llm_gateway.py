@@ -0,0 +1,439 @@
+"""
+大模型调用治理模块
+为所有大模型调用提供截止时间、全局与按模型的并发上限、带抖动的重试、
+超过p95延迟时的对冲请求以及熔断器；底层客户端可注入，便于对接本地模拟服务
+"""
+
+import asyncio
+import random
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+from dashscope import AioGeneration
+from config import config
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 可重试的状态码：超时、限流与服务端错误
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMUnavailableError(Exception):
+    """大模型服务不可用（熔断、超过截止时间或重试耗尽）"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """熔断器处于打开状态，调用被快速拒绝"""
+
+
+class DashScopeClient:
+    """阿里云百炼客户端（默认实现）"""
+
+    async def call(self, **params: Any) -> Any:
+        return await AioGeneration.call(**params)
+
+
+class LatencyTracker:
+    """记录最近成功调用的延迟并计算分位数"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """返回分位数，样本不足时返回None"""
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败达到阈值后打开，打开期间快速拒绝调用；经过重置时间后进入半开状态，
+    只放行一个探测请求，探测成功则关闭，失败则重新打开
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def admit(self) -> Tuple[bool, bool]:
+        """
+        判断是否放行本次调用
+
+        Returns:
+            Tuple[bool, bool]: 是否放行，以及本次调用是否为半开状态下的探测请求
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True, False
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False, False
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False, False
+            self._probing = True
+            return True, True
+
+    def allow(self) -> bool:
+        """判断是否放行本次调用"""
+        return self.admit()[0]
+
+    def release_probe(self) -> None:
+        """探测请求未产生结果(如被取消)时释放探测名额，允许下一个请求继续探测"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("大模型服务恢复，熔断器关闭")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"大模型服务连续失败 {self._failures} 次，熔断器打开")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def get_status(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self._failures}
+
+
+class LLMGateway:
+    """大模型调用治理网关"""
+
+    def __init__(self, client: Optional[Any] = None):
+        """
+        初始化调用网关
+
+        Args:
+            client: 提供 async call(**params) 的客户端，默认为阿里云百炼
+        """
+        self.client = client or DashScopeClient()
+        self.timeout = config.LLM_TIMEOUT
+        self.max_retries = config.LLM_MAX_RETRIES
+        self.retry_backoff = config.LLM_RETRY_BACKOFF
+        self.hedge_enabled = config.LLM_HEDGE_ENABLED
+        self.breaker = CircuitBreaker(
+            config.LLM_BREAKER_FAILURE_THRESHOLD, config.LLM_BREAKER_RESET_TIMEOUT
+        )
+        self.latency = LatencyTracker()
+
+        # asyncio信号量与事件循环绑定，事件循环变化时(如同步入口的asyncio.run)重新创建
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._global_limit: Optional[asyncio.Semaphore] = None
+        self._model_limits: Dict[str, asyncio.Semaphore] = {}
+
+        self.stats = {
+            "calls": 0, "attempts": 0, "successes": 0, "failures": 0, "retries": 0,
+            "timeouts": 0, "hedges": 0, "hedge_wins": 0, "rejected": 0,
+            "streams": 0, "early_stops": 0, "input_tokens": 0, "output_tokens": 0
+        }
+
+    def _limits(self, model: str) -> List[asyncio.Semaphore]:
+        """获取全局与按模型的并发信号量"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global_limit = asyncio.Semaphore(config.LLM_MAX_CONCURRENCY)
+            self._model_limits = {}
+        if model not in self._model_limits:
+            self._model_limits[model] = asyncio.Semaphore(config.LLM_MODEL_CONCURRENCY)
+        return [self._global_limit, self._model_limits[model]]
+
+    async def _acquire(self, model: str, deadline: float) -> List[asyncio.Semaphore]:
+        """在截止时间内依次获取全局与按模型的并发额度"""
+        acquired: List[asyncio.Semaphore] = []
+        try:
+            for limit in self._limits(model):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                await asyncio.wait_for(limit.acquire(), remaining)
+                acquired.append(limit)
+        except BaseException:
+            for limit in acquired:
+                limit.release()
+            raise
+        return acquired
+
+    async def _attempt(self, params: Dict[str, Any], deadline: float) -> Any:
+        """在并发上限内执行一次调用"""
+        acquired = await self._acquire(params.get("model", ""), deadline)
+        try:
+            self.stats["attempts"] += 1
+            started = time.monotonic()
+            response = await asyncio.wait_for(
+                self.client.call(**params), max(deadline - time.monotonic(), 0.001)
+            )
+            if getattr(response, "status_code", None) == 200:
+                self.latency.record(time.monotonic() - started)
+            return response
+        finally:
+            for limit in acquired:
+                limit.release()
+
+    async def _stream_attempt(
+        self,
+        params: Dict[str, Any],
+        deadline: float,
+        on_delta: Callable[[str], bool]
+    ) -> Any:
+        """
+        在并发上限内执行一次流式调用
+
+        每收到一段增量文本调用 on_delta，其返回True时关闭流、不再接收后续输出；
+        客户端不支持流式(直接返回完整响应)时将完整文本作为一段增量处理
+        """
+        acquired = await self._acquire(params.get("model", ""), deadline)
+        try:
+            self.stats["attempts"] += 1
+            started = time.monotonic()
+            stream = await asyncio.wait_for(
+                self.client.call(**params, stream=True, incremental_output=True),
+                max(deadline - time.monotonic(), 0.001)
+            )
+            if not hasattr(stream, "__aiter__"):
+                if getattr(stream, "status_code", None) == 200:
+                    self.latency.record(time.monotonic() - started)
+                    on_delta(stream.output.text or "")
+                return stream
+
+            self.stats["streams"] += 1
+            iterator = stream.__aiter__()
+            last = None
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        response = await asyncio.wait_for(iterator.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        break
+                    last = response
+                    if getattr(response, "status_code", None) != 200:
+                        return response
+                    if on_delta(response.output.text or ""):
+                        # 已得到完整结果，提前结束生成
+                        self.stats["early_stops"] += 1
+                        break
+            finally:
+                aclose = getattr(iterator, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+
+            if last is not None:
+                self.latency.record(time.monotonic() - started)
+            return last
+        finally:
+            for limit in acquired:
+                limit.release()
+
+    def _can_hedge(self, model: str) -> bool:
+        """仍有空闲并发额度时才发送对冲请求，避免挤占其他调用"""
+        return not any(limit.locked() for limit in self._limits(model))
+
+    async def _hedged_attempt(self, params: Dict[str, Any], deadline: float) -> Any:
+        """
+        执行一次(可能对冲的)调用
+
+        首个请求超过近期p95延迟仍未返回时，再发送一个相同请求，取先成功者并取消另一个
+        """
+        primary = asyncio.ensure_future(self._attempt(params, deadline))
+        p95 = self.latency.percentile(0.95) if len(self.latency) >= config.LLM_HEDGE_MIN_SAMPLES else None
+        if not self.hedge_enabled or p95 is None or time.monotonic() + p95 >= deadline:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=p95)
+        if done or not self._can_hedge(params.get("model", "")):
+            return await primary
+
+        self.stats["hedges"] += 1
+        hedge = asyncio.ensure_future(self._attempt(params, deadline))
+        pending: Set[asyncio.Future] = {primary, hedge}
+        result: Any = None
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    result = task.result()
+                    if getattr(result, "status_code", None) == 200:
+                        if task is hedge:
+                            self.stats["hedge_wins"] += 1
+                        return result
+            if result is not None:
+                return result
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(
+        self,
+        params: Dict[str, Any],
+        timeout: Optional[float] = None,
+        on_delta: Optional[Callable[[str], bool]] = None
+    ) -> Any:
+        """
+        在治理策略下调用大模型
+
+        非重试类的错误响应(如参数错误)直接返回给调用方处理。
+        指定 on_delta 时使用流式增量输出(不做对冲)，已输出部分内容后失败不再重试
+
+        Args:
+            params: 大模型调用参数
+            timeout: 本次调用的截止时间(秒)，包含重试与对冲，默认为LLM_TIMEOUT
+            on_delta: 流式增量文本回调，返回True表示结果已完整、停止生成
+
+        Returns:
+            Any: 大模型响应
+
+        Raises:
+            CircuitOpenError: 熔断器打开
+            LLMUnavailableError: 超过截止时间或重试耗尽
+        """
+        self.stats["calls"] += 1
+        allowed, probe = self.breaker.admit()
+        if not allowed:
+            self.stats["rejected"] += 1
+            raise CircuitOpenError("大模型服务暂时不可用（熔断中）")
+
+        try:
+            return await self._call(params, timeout, on_delta)
+        finally:
+            # 探测请求被取消(CancelledError)或未记录成败即退出时，熔断器不能一直停在探测中
+            if probe:
+                self.breaker.release_probe()
+
+    async def _call(
+        self,
+        params: Dict[str, Any],
+        timeout: Optional[float],
+        on_delta: Optional[Callable[[str], bool]]
+    ) -> Any:
+        """带重试的调用主体"""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        last_error = "未知错误"
+        delivered = False
+
+        def track(delta: str) -> bool:
+            nonlocal delivered
+            delivered = True
+            return on_delta(delta)
+
+        for attempt in range(self.max_retries + 1):
+            if delivered:
+                break
+            if attempt:
+                self.stats["retries"] += 1
+                # 指数退避 + 完全抖动，且不超过截止时间
+                backoff = random.uniform(0, self.retry_backoff * 2 ** (attempt - 1))
+                if time.monotonic() + backoff >= deadline:
+                    break
+                await asyncio.sleep(backoff)
+
+            try:
+                if on_delta is None:
+                    response = await self._hedged_attempt(params, deadline)
+                else:
+                    response = await self._stream_attempt(params, deadline, track)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                self.breaker.record_failure()
+                last_error = "调用超时"
+                continue
+            except Exception as e:
+                self.breaker.record_failure()
+                last_error = str(e)
+                continue
+
+            status_code = getattr(response, "status_code", None)
+            if status_code in RETRYABLE_STATUS_CODES:
+                self.breaker.record_failure()
+                last_error = f"{status_code} {getattr(response, 'message', '')}"
+                logger.warning(f"大模型调用失败({last_error})，第 {attempt + 1} 次尝试")
+                continue
+
+            self.breaker.record_success()
+            self.stats["successes"] += 1
+            self._record_usage(response)
+            return response
+
+        self.stats["failures"] += 1
+        raise LLMUnavailableError(f"大模型调用失败: {last_error}")
+
+    def _record_usage(self, response: Any) -> None:
+        """累计响应中的token用量"""
+        usage = getattr(response, "usage", None)
+        if not usage:
+            return
+        for key in ("input_tokens", "output_tokens"):
+            value = usage.get(key) if isinstance(usage, dict) else getattr(usage, key, None)
+            if isinstance(value, int):
+                self.stats[key] += value
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        获取调用治理状态
+
+        Returns:
+            Dict[str, Any]: 熔断器状态、延迟分位数与调用统计
+        """
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        return {
+            "breaker": self.breaker.get_status(),
+            "latency": {
+                "samples": len(self.latency),
+                "p50": round(p50, 3) if p50 is not None else None,
+                "p95": round(p95, 3) if p95 is not None else None
+            },
+            **self.stats
+        }
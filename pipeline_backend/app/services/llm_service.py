@@ -3,11 +3,17 @@
 集成阿里云百炼大模型，提供自然语言到SQL的转换功能
 """
 
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Optional, Dict, Any
+import re
+from typing import Optional, Dict, Any, List
 import dashscope
-from dashscope import Generation
+from .cache import LRUCache
+from .llm_gateway import LLMGateway, LLMUnavailableError
+from .question_normalizer import normalize_question
+from .sql_parser import SQLValidationError, parse_sql
 from config import config
 
 # 配置日志
@@ -15,11 +21,97 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# 语句起点：行首或代码块标记之后的SELECT（说明文字中的 "select" 不算），且后面已收到分隔字符
+_SELECT_START = re.compile(r"(?:^|```(?:sql)?)[ \t]*\n?[ \t]*(select)(?=[\s(*])", re.I | re.M)
+
+
+class SQLStreamExtractor:
+    """
+    流式SQL提取器
+    
+    逐段接收大模型输出，在括号与引号平衡的前提下遇到结束分号或代码块结束标记时
+    判定SELECT语句已完整，此后的输出(解释说明等)无需再等待
+    """
+    
+    def __init__(self):
+        self.text = ""
+        self.sql: Optional[str] = None
+        self._start: Optional[int] = None
+        self._position = 0
+        self._quote: Optional[str] = None
+        self._escaped = False
+        self._depth = 0
+    
+    def feed(self, delta: str) -> bool:
+        """
+        追加一段输出
+        
+        Args:
+            delta: 增量文本
+            
+        Returns:
+            bool: SQL语句是否已完整
+        """
+        if self.sql is not None:
+            return True
+        self.text += delta
+        
+        if self._start is None:
+            match = _SELECT_START.search(self.text)
+            if not match:
+                return False
+            self._start = self._position = match.start(1)
+        
+        text = self.text
+        index = self._position
+        while index < len(text):
+            char = text[index]
+            if self._quote:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == self._quote:
+                    # 连续两个引号表示转义，需等待下一个字符才能判断
+                    if index + 1 >= len(text):
+                        break
+                    if text[index + 1] == self._quote:
+                        index += 2
+                        continue
+                    self._quote = None
+            elif char == "`" and self._depth == 0 and text.startswith("```", index):
+                return self._finish(index)
+            elif char == "`" and len(text) - index < 3 and "```".startswith(text[index:]):
+                # 可能是尚未接收完整的代码块结束标记
+                break
+            elif char in "'\"`":
+                self._quote = char
+            elif char == "(":
+                self._depth += 1
+            elif char == ")":
+                self._depth = max(self._depth - 1, 0)
+            elif char == ";" and self._depth == 0:
+                return self._finish(index)
+            index += 1
+        
+        self._position = index
+        return False
+    
+    def _finish(self, end: int) -> bool:
+        self.sql = self.text[self._start:end].strip()
+        return True
+
+
 class LLMService:
     """大语言模型服务类"""
     
-    def __init__(self):
-        """初始化LLM服务"""
+    def __init__(self, client: Optional[Any] = None):
+        """
+        初始化LLM服务
+        
+        Args:
+            client: 大模型客户端(提供 async call(**params))，默认为阿里云百炼；可注入本地模拟服务
+        """
         self.api_key = config.DASHSCOPE_API_KEY
         if not self.api_key:
             raise ValueError("DASHSCOPE_API_KEY 未配置")
@@ -35,6 +127,15 @@ class LLMService:
         # 数据库表结构信息（用于生成更准确的SQL）
         self.schema_info = self._build_schema_info()
         
+        # 问题->SQL缓存，键包含模型名与提示词指纹，提示词或表结构变化后旧条目自动失效
+        self.prompt_fingerprint = hashlib.sha256(
+            self._build_prompt("").encode("utf-8")
+        ).hexdigest()[:16]
+        self.sql_cache = LRUCache(maxsize=config.SQL_CACHE_SIZE, ttl=config.SQL_CACHE_TTL)
+        
+        # 所有大模型调用经由治理网关（截止时间、并发上限、重试、对冲与熔断）
+        self.gateway = LLMGateway(client)
+        
         logger.info("LLM服务初始化完成")
     
     def _build_schema_info(self) -> str:
@@ -77,37 +178,150 @@ class LLMService:
 """
         return schema_info
     
+    def question_key(self, question: str) -> str:
+        """构建问题键（模型、提示词指纹与归一化问题），用作缓存与合并请求的键"""
+        return f"{self.model_name}:{self.prompt_fingerprint}:{normalize_question(question)}"
+    
+    def get_cached_sql(self, question: str) -> Optional[str]:
+        """
+        查询问题对应的已验证SQL缓存
+        
+        Args:
+            question: 用户问题
+            
+        Returns:
+            Optional[str]: 命中时返回SQL，否则返回None
+        """
+        sql = self.sql_cache.get(self.question_key(question))
+        if sql is not None:
+            logger.info(f"SQL缓存命中: {question}")
+        return sql
+    
+    def cache_sql(self, question: str, sql: str) -> None:
+        """
+        缓存已通过安全验证的SQL
+        
+        Args:
+            question: 用户问题
+            sql: 已验证的SQL语句
+        """
+        self.sql_cache.set(self.question_key(question), sql)
+    
+    def get_sql_cache_info(self, limit: int = 100) -> Dict[str, Any]:
+        """
+        获取SQL缓存统计与条目
+        
+        Args:
+            limit: 最多返回的条目数
+            
+        Returns:
+            Dict[str, Any]: 缓存信息
+        """
+        prefix = f"{self.model_name}:{self.prompt_fingerprint}:"
+        entries: List[Dict[str, Any]] = []
+        for entry in self.sql_cache.entries(limit):
+            key = entry.pop("key")
+            entry["question"] = key[len(prefix):] if key.startswith(prefix) else key
+            entry["sql"] = entry.pop("value")
+            entries.append(entry)
+        
+        return {
+            "model": self.model_name,
+            "prompt_fingerprint": self.prompt_fingerprint,
+            "stats": self.sql_cache.get_stats(),
+            "entries": entries
+        }
+    
+    def purge_sql_cache(self, question: Optional[str] = None) -> int:
+        """
+        清除SQL缓存
+        
+        Args:
+            question: 指定问题时只清除该问题，否则清空全部
+            
+        Returns:
+            int: 清除的条目数
+        """
+        if question:
+            return int(self.sql_cache.delete(self.question_key(question)))
+        return self.sql_cache.clear()
+    
+    def _sql_generation_params(self, question: str) -> Dict[str, Any]:
+        """构建SQL生成的大模型调用参数"""
+        return {
+            "model": self.model_name,
+            "prompt": self._build_prompt(question),
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "top_p": 0.8
+        }
+    
+    def _handle_sql_response(self, response: Any, text: Optional[str] = None) -> Optional[str]:
+        """处理SQL生成的大模型响应（流式调用时text为已拼接的输出）"""
+        if response.status_code == 200:
+            # 提取SQL语句
+            sql = self._extract_sql_from_response(response.output.text if text is None else text)
+            logger.info(f"成功生成SQL: {sql}")
+            return sql
+        
+        logger.error(f"大模型调用失败: {response.status_code}, {response.message}")
+        return None
+    
     def generate_sql_from_question(self, question: str) -> Optional[str]:
         """
-        根据自然语言问题生成SQL查询语句
+        根据自然语言问题生成SQL查询语句（同步入口，供脚本等非异步环境使用）
         
         Args:
             question: 用户的自然语言问题
             
         Returns:
             Optional[str]: 生成的SQL语句，失败时返回None
+            
+        Raises:
+            LLMUnavailableError: 大模型服务不可用
         """
-        try:
-            # 构建提示词
-            prompt = self._build_prompt(question)
+        return asyncio.run(self.generate_sql_from_question_async(question))
+    
+    async def generate_sql_from_question_async(self, question: str) -> Optional[str]:
+        """
+        根据自然语言问题异步生成SQL查询语句，等待大模型期间不阻塞事件循环
+        
+        启用LLM_STREAMING时使用流式增量输出，检测到完整的SELECT语句后即取消剩余生成
+        
+        Args:
+            question: 用户的自然语言问题
+            
+        Returns:
+            Optional[str]: 生成的SQL语句，失败时返回None
             
-            # 调用大模型
-            response = Generation.call(
-                model=self.model_name,
-                prompt=prompt,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                top_p=0.8
-            )
+        Raises:
+            LLMUnavailableError: 大模型服务不可用（熔断、超时或重试耗尽），调用方可降级处理
+        """
+        try:
+            params = self._sql_generation_params(question)
+            if not config.LLM_STREAMING:
+                response = await self.gateway.call(params)
+                return self._handle_sql_response(response)
             
-            if response.status_code == 200:
-                # 提取SQL语句
-                sql = self._extract_sql_from_response(response.output.text)
-                logger.info(f"成功生成SQL: {sql}")
-                return sql
-            else:
-                logger.error(f"大模型调用失败: {response.status_code}, {response.message}")
+            # 流式增量输出：SELECT语句完整后立即停止生成，不再等待后续解释文字
+            extractor = SQLStreamExtractor()
+            response = await self.gateway.call(params, on_delta=extractor.feed)
+            if response is None:
                 return None
+            if extractor.sql is not None and response.status_code == 200:
+                try:
+                    parse_sql(extractor.sql)
+                except SQLValidationError as e:
+                    # 提取结果无法解析时退回整段输出的常规提取
+                    logger.warning(f"流式提取的SQL无法解析({e})，改用完整输出提取")
+                else:
+                    logger.info(f"成功生成SQL(流式提前结束): {extractor.sql}")
+                    return extractor.sql
+            return self._handle_sql_response(response, extractor.text)
+        
+        except LLMUnavailableError as e:
+            logger.error(f"生成SQL失败: {e}")
+            raise
                 
         except Exception as e:
             logger.error(f"生成SQL失败: {e}")
@@ -184,16 +398,8 @@ SQL语句:
         
         return sql
     
-    def analyze_question_intent(self, question: str) -> Dict[str, Any]:
-        """
-        分析用户问题的意图
-        
-        Args:
-            question: 用户问题
-            
-        Returns:
-            Dict[str, Any]: 意图分析结果
-        """
+    def _intent_params(self, question: str) -> Dict[str, Any]:
+        """构建意图分析的大模型调用参数"""
         intent_prompt = f"""
 分析以下用户问题的查询意图，返回JSON格式的分析结果：
 
@@ -208,49 +414,70 @@ SQL语句:
     "confidence": "置信度(0-1)"
 }}
 """
+        return {
+            "model": self.model_name,
+            "prompt": intent_prompt,
+            "max_tokens": 512,
+            "temperature": 0.1
+        }
+    
+    def _handle_intent_response(self, response: Any) -> Dict[str, Any]:
+        """处理意图分析的大模型响应"""
+        if response.status_code == 200:
+            # 尝试解析JSON
+            try:
+                intent_info = json.loads(response.output.text)
+                return intent_info
+            except json.JSONDecodeError:
+                logger.warning("意图分析结果不是有效的JSON格式")
+                return {"intent_type": "未知", "confidence": 0.0}
+        else:
+            logger.error(f"意图分析失败: {response.message}")
+            return {"intent_type": "未知", "confidence": 0.0}
+    
+    def analyze_question_intent(self, question: str) -> Dict[str, Any]:
+        """
+        分析用户问题的意图（同步入口）
         
-        try:
-            response = Generation.call(
-                model=self.model_name,
-                prompt=intent_prompt,
-                max_tokens=512,
-                temperature=0.1
-            )
+        Args:
+            question: 用户问题
             
-            if response.status_code == 200:
-                # 尝试解析JSON
-                try:
-                    intent_info = json.loads(response.output.text)
-                    return intent_info
-                except json.JSONDecodeError:
-                    logger.warning("意图分析结果不是有效的JSON格式")
-                    return {"intent_type": "未知", "confidence": 0.0}
-            else:
-                logger.error(f"意图分析失败: {response.message}")
-                return {"intent_type": "未知", "confidence": 0.0}
+        Returns:
+            Dict[str, Any]: 意图分析结果
+        """
+        return asyncio.run(self.analyze_question_intent_async(question))
+    
+    async def analyze_question_intent_async(self, question: str) -> Dict[str, Any]:
+        """
+        异步分析用户问题的意图
+        
+        Args:
+            question: 用户问题
+            
+        Returns:
+            Dict[str, Any]: 意图分析结果
+        """
+        try:
+            response = await self.gateway.call(self._intent_params(question))
+            return self._handle_intent_response(response)
                 
         except Exception as e:
             logger.error(f"意图分析异常: {e}")
             return {"intent_type": "未知", "confidence": 0.0}
     
-    def optimize_sql(self, sql: str) -> str:
+    def optimize_sql(self, sql: str, limit: int = 1000) -> str:
         """
         优化生成的SQL语句
         
+        在语法树上处理最外层LIMIT：未指定时注入，超过limit时收紧；
+        不带GROUP BY的纯聚合查询只返回一行、按低基数字段分组且分组数上限估计不超过limit的查询
+        结果规模有界，均保持不变
+        
         Args:
-            sql: 原始SQL语句
+            sql: 已通过安全验证的SQL语句
+            limit: 允许返回的最大行数
             
         Returns:
-            str: 优化后的SQL语句
+            str: 优化后的规范化SQL语句
         """
-        # 基本的SQL优化规则
-        optimized_sql = sql.strip()
-        
-        # 添加LIMIT限制（防止返回过多数据）
-        if "LIMIT" not in optimized_sql.upper() and "COUNT" not in optimized_sql.upper():
-            optimized_sql += " LIMIT 1000"
-        
-        # 确保字段名正确
-        # 这里可以添加更多的优化逻辑
-        
-        return optimized_sql 
\ No newline at end of file
+        return parse_sql(sql).with_limit(limit)
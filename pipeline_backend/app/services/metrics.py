@@ -0,0 +1,232 @@
+"""
+指标模块
+提供直方图与计数器，以及按Prometheus文本格式(0.0.4)输出的指标注册表；
+请求内的各阶段耗时由StageTimings记录并写入阶段直方图，
+缓存、连接池与大模型等已有统计在抓取时由采集函数读取
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 秒级延迟的默认分桶
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 查询处理阶段（按执行顺序）
+QUERY_STAGES = ("normalize", "generate_sql", "validate", "optimize", "execute", "format", "serialize")
+
+Labels = Tuple[Tuple[str, str], ...]
+# 采集函数返回的指标族：(名称, 类型, 说明, [(标签, 取值)])
+MetricFamily = Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, Any]) -> Labels:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"标签应为 {labelnames}，实际为 {tuple(labels)}")
+    return tuple((name, str(labels[name])) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in labels]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """单调递增的计数器"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values)
+        return lines
+
+
+class Histogram:
+    """累积分桶直方图"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各桶计数..., +Inf桶计数, 总和]
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, values in series:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), values[:-1]):
+                cumulative += count
+                labels = key + (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(labels)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(values[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Any) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """注册抓取时调用的采集函数"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        按Prometheus文本格式输出全部指标
+
+        Returns:
+            str: 指标文本
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    label_items = tuple((key, str(item)) for key, item in labels.items())
+                    lines.append(f"{name}{_format_labels(label_items)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "pipeline_query_stage_seconds", "查询各处理阶段耗时(秒)", ("stage",)
+)
+QUERY_SECONDS = registry.histogram(
+    "pipeline_query_seconds", "查询总耗时(秒)", ("format", "source", "status")
+)
+ROWS_RETURNED = registry.counter(
+    "pipeline_query_rows_returned_total", "查询返回的行数", ("format",)
+)
+
+
+class StageTimings:
+    """
+    单个请求的阶段耗时
+
+    每个阶段结束时写入阶段直方图；同名阶段多次出现时累加
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """记录with块的耗时（块内抛出异常时同样记录）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def to_dict(self) -> Dict[str, float]:
+        """各阶段耗时(毫秒)，按处理顺序排列"""
+        order = {stage: index for index, stage in enumerate(QUERY_STAGES)}
+        return {
+            stage: round(seconds * 1000, 3)
+            for stage, seconds in sorted(self.stages.items(), key=lambda item: order.get(item[0], len(order)))
+        }
+
+    def server_timing(self) -> str:
+        """Server-Timing响应头"""
+        return ", ".join(f"{stage};dur={duration}" for stage, duration in self.to_dict().items())
+
+
+def observe_query(
+    format: str,
+    source: Optional[str],
+    status: str,
+    seconds: float,
+    rows: int = 0
+) -> None:
+    """记录一次查询的总耗时与返回行数"""
+    QUERY_SECONDS.observe(seconds, format=format, source=source or "none", status=status)
+    if rows:
+        ROWS_RETURNED.inc(rows, format=format)
@@ -0,0 +1,173 @@
+"""
+分页模块
+基于主键id的键集分页(keyset pagination)：续页令牌携带已生成的SQL与最后一行id，
+续页查询使用 id > ? 谓词而不是OFFSET，且无需再次调用大模型
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+from dataclasses import replace
+from typing import List, Optional, Tuple
+from config import config
+from .sql_parser import SCHEMA, Column, Select, SQLValidationError, Star, TableRef, parse_sql, render
+
+# 未配置密钥时使用进程级随机密钥（多进程部署需配置PAGINATION_SECRET）
+_SECRET = (config.PAGINATION_SECRET or secrets.token_hex(32)).encode("utf-8")
+
+
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_SECRET, payload.encode("ascii"), hashlib.sha256).digest()[:16])
+
+
+def encode_cursor(sql: str, last_id: int, page_size: int) -> str:
+    """
+    生成续页令牌
+
+    Args:
+        sql: 分页基础SQL（已验证、未加LIMIT）
+        last_id: 当前页最后一行的id
+        page_size: 每页行数
+
+    Returns:
+        str: 带签名的不透明令牌
+    """
+    payload = _b64encode(
+        json.dumps({"s": sql, "i": last_id, "n": page_size}, ensure_ascii=False).encode("utf-8")
+    )
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_cursor(token: str) -> Tuple[str, int, int]:
+    """
+    解析并校验续页令牌
+
+    Args:
+        token: 续页令牌
+
+    Returns:
+        Tuple[str, int, int]: 基础SQL、最后一行id、每页行数
+
+    Raises:
+        ValueError: 令牌格式错误或签名不匹配
+    """
+    try:
+        payload, signature = token.split(".", 1)
+    except ValueError:
+        raise ValueError("无效的分页令牌")
+
+    if not hmac.compare_digest(signature, _sign(payload)):
+        raise ValueError("分页令牌校验失败")
+
+    try:
+        data = json.loads(_b64decode(payload))
+        return str(data["s"]), int(data["i"]), int(data["n"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("无效的分页令牌")
+
+
+def _output_names(select: Select, source: TableRef) -> Optional[List[Tuple[str, bool]]]:
+    """返回各输出列的列名(小写)及其是否为表的id列，含无法确定列名的项时返回None"""
+    names = {source.name, source.alias} - {None}
+    outputs: List[Tuple[str, bool]] = []
+    for item in select.items:
+        expr = item.expr
+        if isinstance(expr, Star):
+            if expr.table is not None and expr.table not in names:
+                return None
+            outputs.extend((column, column == "id") for column in sorted(SCHEMA[source.name.lower()]))
+        elif isinstance(expr, Column):
+            if expr.table is not None and expr.table not in names:
+                return None
+            is_id = expr.name.lower() == "id"
+            outputs.append(((item.alias or expr.name).lower(), is_id))
+        else:
+            outputs.append(((item.alias or render(expr)).lower(), False))
+    return outputs
+
+
+def pageable_base_sql(sql: str) -> Optional[str]:
+    """
+    判断SQL能否按id键集分页，并返回去掉 ORDER BY id 后的基础SQL
+
+    在语法树上判断：须为pipeline_info单表SELECT，不含聚合、分组、去重、LIMIT，
+    ORDER BY 为空或仅按id升序，且输出列中恰有一个名为id的列并取自表的id
+    （基础SQL作为派生表时列名不能重复）
+
+    Args:
+        sql: 已验证的SQL
+
+    Returns:
+        Optional[str]: 基础SQL，不可分页时返回None
+    """
+    try:
+        parsed = parse_sql(sql)
+    except SQLValidationError:
+        return None
+    select = parsed.ast
+    if (
+        not isinstance(select, Select)
+        or not isinstance(select.source, TableRef)
+        or select.source.name.lower() not in SCHEMA
+        or select.joins
+        or parsed.aggregate
+        or parsed.has_placeholders
+        or select.group_by
+        or select.having is not None
+        or select.distinct
+        or select.limit is not None
+    ):
+        return None
+
+    names = {select.source.name, select.source.alias} - {None}
+    if select.order_by:
+        if len(select.order_by) > 1:
+            return None
+        order = select.order_by[0]
+        if (
+            order.descending
+            or not isinstance(order.expr, Column)
+            or order.expr.name.lower() != "id"
+            or order.expr.table is not None and order.expr.table not in names
+        ):
+            return None
+
+    outputs = _output_names(select, select.source)
+    if outputs is None:
+        return None
+    columns = [name for name, _ in outputs]
+    if len(set(columns)) != len(columns) or ("id", True) not in outputs:
+        return None
+
+    return render(replace(select, order_by=()))
+
+
+def build_page_sql(base_sql: str, has_cursor: bool) -> str:
+    """
+    构建键集分页SQL（参数依次为last_id(有续页令牌时)与LIMIT行数）
+
+    基础SQL作为派生表，MySQL会将其合并并使用主键范围扫描
+
+    Args:
+        base_sql: 分页基础SQL
+        has_cursor: 是否带有 id > ? 谓词
+
+    Returns:
+        str: 参数化的分页SQL
+    """
+    predicate = " WHERE _page.id > %s" if has_cursor else ""
+    # 基础SQL中的%（如LIKE '%xx%'）需转义，避免与参数占位符冲突
+    escaped = base_sql.replace("%", "%%")
+    return f"SELECT * FROM ({escaped}) AS _page{predicate} ORDER BY _page.id LIMIT %s"
@@ -0,0 +1,172 @@
+"""
+性能剖析模块
+提供采样剖析器(定时读取各线程调用栈，输出火焰图工具可直接使用的折叠栈文本)
+与包裹单次调用的确定性剖析(cProfile)；两者只在显式调用时工作，未使用时没有额外开销
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 同一时间只允许一个剖析器运行：cProfile不能嵌套，采样结果互相干扰也没有意义
+_active = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """已有剖析正在进行"""
+
+
+_path_cache: Dict[str, str] = {}
+
+
+def _short_path(filename: str) -> str:
+    """去掉sys.path前缀，缩短栈帧中的文件路径"""
+    short = _path_cache.get(filename)
+    if short is None:
+        short = filename
+        for prefix in sorted((path for path in sys.path if path), key=len, reverse=True):
+            prefix = os.path.join(os.path.abspath(prefix), "")
+            if filename.startswith(prefix):
+                short = filename[len(prefix):]
+                break
+        _path_cache[filename] = short
+    return short
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    采样剖析器
+
+    按固定间隔读取进程内所有线程(事件循环与数据库线程池)的调用栈并计数，
+    结果为折叠栈格式：每行 "根帧;...;叶帧 次数"，可直接交给 flamegraph.pl / speedscope
+    """
+
+    def __init__(self, interval: float = 0.005, include_threads: bool = True):
+        """
+        Args:
+            interval: 采样间隔(秒)
+            include_threads: 是否以线程名作为栈的根帧
+        """
+        self.interval = interval
+        self.include_threads = include_threads
+        self.samples = 0
+        self._stacks: Counter = Counter()
+
+    def _sample(self, own_ident: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()} if self.include_threads else {}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            labels: List[str] = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if self.include_threads:
+                labels.append(names.get(ident, f"thread-{ident}"))
+            self._stacks[";".join(reversed(labels))] += 1
+        self.samples += 1
+
+    def run(self, duration: float) -> str:
+        """
+        在当前线程中采样指定时长（阻塞，应在独立线程中调用）
+
+        Args:
+            duration: 采样时长(秒)
+
+        Returns:
+            str: 折叠栈文本
+
+        Raises:
+            ProfilerBusyError: 已有剖析正在进行
+        """
+        if not _active.acquire(blocking=False):
+            raise ProfilerBusyError("已有剖析正在进行")
+        try:
+            own_ident = threading.get_ident()
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                self._sample(own_ident)
+                time.sleep(self.interval)
+        finally:
+            _active.release()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        """按次数降序输出折叠栈文本"""
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+
+def top_functions(profile: cProfile.Profile, limit: int = 30) -> List[Dict[str, Any]]:
+    """
+    按累计耗时汇总cProfile结果
+
+    Args:
+        profile: 已停止的剖析器
+        limit: 返回的函数数
+
+    Returns:
+        List[Dict[str, Any]]: 函数、调用次数、自身耗时与累计耗时(秒)
+    """
+    stats = pstats.Stats(profile)
+    rows: List[Tuple[float, Dict[str, Any]]] = []
+    for (filename, lineno, name), (_, calls, self_time, cumulative, _) in stats.stats.items():
+        location = name if filename == "~" else f"{name} ({_short_path(filename)}:{lineno})"
+        rows.append((cumulative, {
+            "function": location,
+            "calls": calls,
+            "self_time": round(self_time, 6),
+            "cumulative_time": round(cumulative, 6)
+        }))
+    rows.sort(key=lambda row: row[0], reverse=True)
+    return [row for _, row in rows[:limit]]
+
+
+class CallProfile:
+    """确定性剖析的结果容器，剖析结束后填充top"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.top: Optional[List[Dict[str, Any]]] = None
+
+
+@contextmanager
+def profile_call(limit: int = 30) -> Iterator[CallProfile]:
+    """
+    以cProfile剖析with块
+
+    cProfile按线程工作：包裹协程时记录的是块执行期间事件循环线程上的全部调用，
+    并发处理的其他请求也会计入；数据库线程池中的调用只体现为等待
+
+    Args:
+        limit: 返回的函数数
+
+    Yields:
+        CallProfile: 块结束后 top 为按累计耗时排序的函数列表
+
+    Raises:
+        ProfilerBusyError: 已有剖析正在进行
+    """
+    if not _active.acquire(blocking=False):
+        raise ProfilerBusyError("已有剖析正在进行")
+    result = CallProfile(limit)
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+        try:
+            yield result
+        finally:
+            profile.disable()
+        result.top = top_functions(profile, limit)
+    finally:
+        _active.release()
@@ -0,0 +1,73 @@
+"""
+问题归一化模块
+将措辞略有差异的同义问题归一为相同的文本，用作缓存键
+"""
+
+import re
+import unicodedata
+
+# 省级行政区简称与全称后缀
+PROVINCE_SUFFIXES = {
+    "北京": "市", "天津": "市", "上海": "市", "重庆": "市",
+    "河北": "省", "山西": "省", "辽宁": "省", "吉林": "省", "黑龙江": "省",
+    "江苏": "省", "浙江": "省", "安徽": "省", "福建": "省", "江西": "省",
+    "山东": "省", "河南": "省", "湖北": "省", "湖南": "省", "广东": "省",
+    "海南": "省", "四川": "省", "贵州": "省", "云南": "省", "陕西": "省",
+    "甘肃": "省", "青海": "省", "台湾": "省",
+    "内蒙古": "自治区", "广西": "壮族自治区", "西藏": "自治区",
+    "宁夏": "回族自治区", "新疆": "维吾尔自治区",
+    "香港": "特别行政区", "澳门": "特别行政区"
+}
+
+_PROVINCE_PATTERN = re.compile(
+    "(" + "|".join(sorted(PROVINCE_SUFFIXES, key=len, reverse=True)) + ")"
+    "(?:壮族自治区|回族自治区|维吾尔自治区|自治区|特别行政区|省|市)"
+)
+
+# 数字区间中的连接符统一为"-"
+_RANGE_PATTERN = re.compile(r"(\d)\s*(?:[-~—–]+|至|到)\s*(\d)")
+
+# 数字之间的小数点、千分位与顿号属于数值本身("1.5"与"15"不同)，不随标点移除
+_DIGIT_SEPARATOR = re.compile(r"(?<=\d)[.,、](?=\d)")
+
+# 句首的礼貌用语/查询动词不影响语义
+_LEADING_FILLERS = re.compile(
+    r"^(?:请问|请帮我|请|帮我|麻烦|我想知道|我想查询|我想查|查询一下|查一下|查询|查看|查找)+"
+)
+
+
+def _is_dropped(char: str) -> bool:
+    """标点、空白与控制字符在归一化时被移除（数字区间的"-"已提前处理）"""
+    if char == "-":
+        return False
+    category = unicodedata.category(char)
+    return category[0] in ("P", "Z", "C") or char.isspace()
+
+
+def normalize_question(question: str) -> str:
+    """
+    归一化用户问题
+
+    1. NFKC规范化（全角转半角）并转为小写
+    2. 数字区间连接符统一为"-"
+    3. 去除空白与标点（数字之间的 . , 、 保留）
+    4. 省份全称统一为简称（"广东省" -> "广东"）
+    5. 去除句首的礼貌用语与"的"
+
+    Args:
+        question: 用户原始问题
+
+    Returns:
+        str: 归一化后的问题
+    """
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = _RANGE_PATTERN.sub(r"\1-\2", text)
+    kept = {match.start() for match in _DIGIT_SEPARATOR.finditer(text)}
+    text = "".join(
+        char for index, char in enumerate(text)
+        if index in kept or not _is_dropped(char)
+    )
+    text = _PROVINCE_PATTERN.sub(r"\1", text)
+    text = _LEADING_FILLERS.sub("", text)
+    text = text.replace("的", "")
+    return text
@@ -0,0 +1,77 @@
+"""
+请求合并模块
+相同键的并发调用共享同一次执行(single-flight)，所有等待者获得同一结果
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """单飞请求合并类（需在同一事件循环中使用）"""
+
+    def __init__(self, name: str):
+        """
+        初始化请求合并器
+
+        Args:
+            name: 名称，用于日志与统计
+        """
+        self.name = name
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行调用；相同键已有调用在进行中时等待其结果而不再重复执行
+
+        执行本身在独立任务中进行，某个等待者被取消不会影响其他等待者
+
+        Args:
+            key: 合并键
+            func: 无参异步函数
+
+        Returns:
+            T: 调用结果（异常同样传递给所有等待者）
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+            logger.info(f"[{self.name}] 合并进行中的相同请求")
+            return await asyncio.shield(task)
+
+        self.calls += 1
+        task = asyncio.ensure_future(func())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: "asyncio.Future[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有等待者均已取消时避免"异常未被获取"的警告
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取合并统计
+
+        Returns:
+            Dict[str, Any]: 实际执行次数、被合并(节省)的调用次数与进行中的键数
+        """
+        total = self.calls + self.shared
+        return {
+            "calls": self.calls,
+            "saved": self.shared,
+            "saved_ratio": round(self.shared / total, 4) if total else 0.0,
+            "in_flight": len(self._inflight)
+        }
@@ -0,0 +1,136 @@
+"""
+SQL指纹模块
+对SQL文本做归一化并生成稳定的指纹，用于结果缓存等场景；
+去除字面量的查询摘要用于按查询形态汇总负载
+"""
+
+import hashlib
+import re
+from typing import List, Optional, Tuple
+from config import config
+from .cache import LRUCache
+from .sql_parser import SQLValidationError, Token, quote_identifier, tokenize
+
+# 字符串字面量（支持反斜杠转义与''转义）与反引号标识符
+_QUOTED = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|`[^`]*`", re.S)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    归一化SQL文本：折叠字面量以外的空白并去除末尾分号
+
+    字面量与大小写保持不变，因为它们决定了查询结果与结果列名
+
+    Args:
+        sql: SQL语句
+
+    Returns:
+        str: 归一化后的SQL
+    """
+    parts = []
+    position = 0
+    for match in _QUOTED.finditer(sql):
+        parts.append(_WHITESPACE.sub(" ", sql[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_WHITESPACE.sub(" ", sql[position:]))
+
+    normalized = "".join(parts).strip()
+    while normalized.endswith(";"):
+        normalized = normalized[:-1].rstrip()
+    return normalized
+
+
+def sql_fingerprint(sql: str) -> str:
+    """
+    计算SQL指纹
+
+    Args:
+        sql: SQL语句
+
+    Returns:
+        str: 归一化SQL的SHA-1摘要
+    """
+    return hashlib.sha1(normalize_sql(sql).encode("utf-8")).hexdigest()
+
+
+# 摘要中紧贴前一个/后一个词元输出的符号
+_NO_SPACE_BEFORE = frozenset({",", ")", "."})
+_NO_SPACE_AFTER = frozenset({"(", "."})
+
+_digest_cache = LRUCache(maxsize=config.SQL_PARSE_CACHE_SIZE)
+
+
+_VALUE_KINDS = ("number", "string", "param")
+
+
+def _value_list_end(tokens: List[Token], start: int) -> Optional[int]:
+    """start处开始为 值, 值, ... ) 形式时返回右括号的下标，否则返回None"""
+    index = start
+    while index + 1 < len(tokens) and tokens[index].kind in _VALUE_KINDS:
+        separator = tokens[index + 1]
+        if separator.value == ")":
+            return index + 1
+        if separator.value != ",":
+            return None
+        index += 2
+    return None
+
+
+def _digest_text(sql: str) -> str:
+    try:
+        tokens = tokenize(sql)
+    except SQLValidationError:
+        # 无法词法分析时退化为折叠空白与大小写
+        return _QUOTED.sub("?", normalize_sql(sql)).lower()
+
+    words: List[str] = []
+    tokens = tokens[:-1]
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        index += 1
+        if token.kind in _VALUE_KINDS:
+            # IN 的纯值列表(如 IN (1, 2, 3))无论长短都折叠为一个占位；函数参数、LIMIT等其他位置的值逐个保留
+            if words[-2:] == ["IN", "("]:
+                end = _value_list_end(tokens, index - 1)
+                if end is not None:
+                    words.append("?+")
+                    index = end
+                    continue
+            words.append("?")
+        elif token.kind == "ident":
+            words.append(quote_identifier(token.value.lower()))
+        elif token.value != ";":
+            words.append(token.value.upper() if token.kind == "keyword" else token.value)
+
+    parts: List[str] = []
+    previous = ""
+    for word in words:
+        # 函数调用的括号紧贴函数名
+        function_call = word == "(" and previous[:1].islower()
+        if parts and word not in _NO_SPACE_BEFORE and previous not in _NO_SPACE_AFTER and not function_call:
+            parts.append(" ")
+        parts.append(word)
+        previous = word
+    return "".join(parts)
+
+
+def query_digest(sql: str) -> Tuple[str, str]:
+    """
+    计算查询摘要：字面量与参数替换为 ?，IN 的值列表折叠为 ?+，关键字大写、标识符小写，
+    空白与注释被去除；只有字面量不同的查询得到相同摘要
+
+    Args:
+        sql: SQL语句
+
+    Returns:
+        Tuple[str, str]: 摘要ID(16位十六进制)与摘要文本
+    """
+    cached = _digest_cache.get(sql)
+    if cached is None:
+        text = _digest_text(sql)
+        cached = (hashlib.sha1(text.encode("utf-8")).hexdigest()[:16], text)
+        _digest_cache.set(sql, cached)
+    return cached
@@ -3,18 +3,47 @@ SQL生成器模块
 整合LLM服务和数据库服务，提供完整的查询处理流程
 """
 
+import asyncio
+import json
 import time
 import logging
-from typing import Dict, Any, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from .llm_service import LLMService
-from .database_service import DatabaseService
+from .database_service import DatabaseService, QueryGuardError
+from .stats_service import StatsService
+from .export_service import ExportService
+from .entity_index import EntityIndex
+from .aggregate_cube import AggregateCube
+from .columnar_replica import ColumnarReplica
+from .template_engine import TemplateEngine, TemplateMatch
+from .llm_gateway import LLMUnavailableError
+from .single_flight import SingleFlight
+from .sql_fingerprint import sql_fingerprint
+from .sql_parser import SQLValidationError, get_parse_cache_stats
+from .metrics import MetricFamily, StageTimings, observe_query
+from .pagination import build_page_sql, decode_cursor, encode_cursor, pageable_base_sql
 from ..models.schemas import QueryRequest, QueryResponse
+from config import config
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class QueryError(Exception):
+    """查询处理失败（可直接展示给用户的错误）"""
+    
+    def __init__(self, message: str, sql: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.sql = sql
+
+
+def _ndjson(frame: Dict[str, Any]) -> bytes:
+    """将帧编码为一行JSON"""
+    return (json.dumps(frame, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
 class SQLGenerator:
     """SQL生成器类"""
     
@@ -23,6 +52,15 @@ class SQLGenerator:
         try:
             self.llm_service = LLMService()
             self.db_service = DatabaseService()
+            self.stats_service = StatsService(self.db_service)
+            self.export_service = ExportService(self.db_service)
+            self.entity_index = EntityIndex(self.db_service, config.ENTITY_INDEX_REFRESH_INTERVAL)
+            self.template_engine = TemplateEngine(self.entity_index)
+            self.cube = AggregateCube(self.db_service)
+            self.replica = ColumnarReplica(self.db_service)
+            # 相同问题的大模型调用、相同SQL的数据库执行在并发时合并为一次
+            self.llm_flight = SingleFlight("llm")
+            self.query_flight = SingleFlight("query")
             logger.info("SQL生成器初始化完成")
         except Exception as e:
             logger.error(f"SQL生成器初始化失败: {e}")
@@ -30,7 +68,7 @@ class SQLGenerator:
     
     def process_query(self, query_request: QueryRequest) -> QueryResponse:
         """
-        处理用户查询请求
+        处理用户查询请求（同步入口，供脚本等非异步环境使用）
         
         Args:
             query_request: 查询请求对象
@@ -38,38 +76,298 @@ class SQLGenerator:
         Returns:
             QueryResponse: 查询响应对象
         """
-        start_time = time.time()
-        question = query_request.question.strip()
+        return asyncio.run(self.process_query_async(query_request))
+    
+    async def refresh_entity_index(self) -> None:
+        """按数据版本刷新实体词典索引（在数据库线程池中执行，失败时沿用旧索引）"""
+        if not self.entity_index.refresh_due:
+            return
+        try:
+            await self.db_service.run_in_executor(self.entity_index.refresh)
+        except Exception as e:
+            logger.warning(f"实体索引刷新失败: {e}")
+    
+    def match_template(self, question: str) -> Optional[TemplateMatch]:
+        """
+        尝试用规则模板识别问题
+        
+        Args:
+            question: 用户问题
+            
+        Returns:
+            Optional[TemplateMatch]: 模板匹配结果(含置信度)，未启用或未识别时返回None
+        """
+        if not config.TEMPLATE_ENGINE_ENABLED:
+            return None
+        return self.template_engine.match(question)
+    
+    async def _generate_sql_with_llm(self, question: str) -> Optional[str]:
+        """调用大模型生成SQL，并将实体字段的字面量改写为规范取值"""
+        sql = await self.llm_service.generate_sql_from_question_async(question)
+        if sql:
+            sql, _ = self.entity_index.canonicalize_sql(sql)
+        return sql
+    
+    async def execute_shared(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None
+    ) -> Tuple[List[Dict[str, Any]], float]:
+        """
+        执行查询，并发的相同SQL(按指纹与参数)共享一次数据库执行
+        
+        返回的结果列表可能被多个请求共享，调用方不得原地修改
+        
+        Args:
+            sql: SQL查询语句
+            params: SQL参数
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], float]: 查询结果和执行时间
+        """
+        return await self.query_flight.do(
+            ("rows", sql_fingerprint(sql), params),
+            lambda: self._execute_rows(sql, params)
+        )
+    
+    async def _execute_rows(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]]
+    ) -> Tuple[List[Dict[str, Any]], float]:
+        """依次尝试聚合立方体与列式副本，否则在MySQL中执行"""
+        answered = await self.cube.answer_async(sql, params) or await self.replica.execute_async(sql, params)
+        if answered is not None:
+            columns, rows, execution_time = answered
+            return [dict(zip(columns, row)) for row in rows], execution_time
+        return await self.db_service.execute_query_async(sql, params)
+    
+    async def execute_columnar_shared(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None
+    ) -> Tuple[List[str], List[Tuple[Any, ...]], float]:
+        """
+        以元组游标执行查询，并发的相同SQL共享一次数据库执行
+        
+        Args:
+            sql: SQL查询语句
+            params: SQL参数
+            
+        Returns:
+            Tuple[List[str], List[Tuple[Any, ...]], float]: 列名、元组行和执行时间
+        """
+        return await self.query_flight.do(
+            ("columnar", sql_fingerprint(sql), params),
+            lambda: self._execute_columnar(sql, params)
+        )
+    
+    async def _execute_columnar(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]]
+    ) -> Tuple[List[str], List[Tuple[Any, ...]], float]:
+        """依次尝试聚合立方体与列式副本，否则以元组游标在MySQL中执行"""
+        answered = await self.cube.answer_async(sql, params) or await self.replica.execute_async(sql, params)
+        if answered is not None:
+            return answered
+        return await self.db_service.execute_query_columnar_async(sql, params)
+    
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """
+        获取请求合并统计
+        
+        Returns:
+            Dict[str, Any]: 大模型调用与数据库执行各自节省的次数
+        """
+        return {
+            "llm": self.llm_flight.get_stats(),
+            "query": self.query_flight.get_stats()
+        }
+    
+    def collect_metrics(self) -> List[MetricFamily]:
+        """
+        采集缓存、连接池与大模型调用的已有统计，供 /metrics 抓取时调用
+        
+        Returns:
+            List[MetricFamily]: 指标族列表
+        """
+        # 未启用的缓存(如 RESULT_CACHE_ENABLED=false 时的结果缓存)为None，不输出
+        caches = {
+            name: cache.get_stats()
+            for name, cache in (
+                ("sql", self.llm_service.sql_cache),
+                ("result", self.db_service.result_cache),
+                ("plan", self.db_service.plan_cache)
+            )
+            if cache is not None
+        }
+        caches["parse"] = get_parse_cache_stats()
+        pool = self.db_service.get_pool_status()
+        gateway = self.llm_service.gateway.get_status()
+        
+        def per_cache(key: str) -> List[Tuple[Dict[str, Any], float]]:
+            return [({"cache": name}, stats[key]) for name, stats in caches.items()]
+        
+        families: List[MetricFamily] = [
+            ("pipeline_cache_hits_total", "counter", "缓存命中次数", per_cache("hits")),
+            ("pipeline_cache_misses_total", "counter", "缓存未命中次数", per_cache("misses")),
+            ("pipeline_cache_evictions_total", "counter", "缓存淘汰次数", per_cache("evictions")),
+            ("pipeline_cache_entries", "gauge", "缓存条目数", per_cache("size"))
+        ]
+        for key in ("pool_size", "size", "in_use", "idle"):
+            families.append((f"pipeline_db_pool_{key}", "gauge", f"数据库连接池 {key}", [({}, pool[key])]))
+        for key in ("checkouts", "waits", "timeouts", "wait_time_total"):
+            name = "pipeline_db_pool_wait_seconds_total" if key == "wait_time_total" else f"pipeline_db_pool_{key}_total"
+            families.append((name, "counter", f"数据库连接池 {key}", [({}, pool.get(key))]))
+        for key in ("calls", "successes", "failures", "retries", "timeouts", "rejected", "input_tokens", "output_tokens"):
+            families.append((f"pipeline_llm_{key}_total", "counter", f"大模型调用 {key}", [({}, gateway[key])]))
+        families.append((
+            "pipeline_llm_breaker_open", "gauge", "大模型熔断器是否打开",
+            [({}, 1 if gateway["breaker"].get("state") == "open" else 0)]
+        ))
+        return families
+    
+    async def prepare_sql(
+        self,
+        question: str,
+        timings: Optional[StageTimings] = None
+    ) -> Tuple[str, str]:
+        """
+        生成并验证问题对应的SQL（未经optimize_sql处理）
         
-        logger.info(f"开始处理查询: {question}")
+        依次尝试问题缓存、规则模板与大模型；大模型生成的SQL中实体字段的字面量
+        会按实体索引改写为库中的规范取值（如 '广东省' -> '广东'）。
+        大模型不可用(熔断、超时)时降级使用置信度较低的模板结果
         
+        Args:
+            question: 用户问题
+            timings: 记录 normalize(问题归一化与缓存查找)、generate_sql、validate 阶段耗时
+            
+        Returns:
+            Tuple[str, str]: 已通过安全验证的规范化SQL与来源(cache | template | template_fallback | llm)
+            
+        Raises:
+            QueryError: 无法生成SQL或SQL不符合安全要求
+        """
+        timings = timings or StageTimings()
+        await self.refresh_entity_index()
+        
+        # 优先使用问题缓存，其次规则模板，最后调用大模型
+        source = "cache"
+        with timings.stage("normalize"):
+            sql = self.llm_service.get_cached_sql(question)
+        if sql is None:
+            with timings.stage("generate_sql"):
+                match = self.match_template(question)
+                if match is not None and match.confidence >= config.TEMPLATE_MIN_CONFIDENCE:
+                    logger.info(f"模板命中({match.intent}, 置信度 {match.confidence:.2f}): {match.template} {match.params}")
+                    source, sql = "template", match.sql
+                else:
+                    if match is not None:
+                        logger.info(f"模板置信度不足({match.confidence:.2f})，交由大模型处理")
+                    source = "llm"
+                    try:
+                        sql = await self.llm_flight.do(
+                            self.llm_service.question_key(question),
+                            lambda: self._generate_sql_with_llm(question)
+                        )
+                    except LLMUnavailableError as e:
+                        if match is None or match.confidence < config.TEMPLATE_FALLBACK_MIN_CONFIDENCE:
+                            raise QueryError(f"{e}，请稍后重试")
+                        logger.warning(f"大模型不可用，降级使用模板结果(置信度 {match.confidence:.2f})")
+                        source, sql = "template_fallback", match.sql
+        if not sql:
+            raise QueryError("无法理解您的问题，请换一种表达方式")
+        
+        # 验证SQL安全性，后续缓存与执行统一使用规范化SQL
         try:
-            # 1. 生成SQL语句
-            sql = self.llm_service.generate_sql_from_question(question)
-            if not sql:
-                return QueryResponse(
-                    status="error",
-                    message="无法理解您的问题，请换一种表达方式",
-                    execution_time=time.time() - start_time
-                )
+            with timings.stage("validate"):
+                sql = self.db_service.check_sql(sql).normalized_sql
+        except SQLValidationError as e:
+            logger.warning(f"生成的SQL未通过安全验证: {e}")
+            raise QueryError(f"生成的查询不符合安全要求: {e}", sql=sql)
+        
+        if source == "llm":
+            self.llm_service.cache_sql(question, sql)
+        
+        return sql, source
+    
+    async def process_query_async(
+        self,
+        query_request: QueryRequest,
+        timings: Optional[StageTimings] = None,
+        include_timings: bool = False
+    ) -> QueryResponse:
+        """
+        异步处理用户查询请求
+        
+        大模型调用走异步客户端，数据库操作在有界线程池中执行，
+        单个慢请求不会阻塞事件循环中的其他请求
+        
+        Args:
+            query_request: 查询请求对象
+            timings: 阶段耗时记录，调用方需继续记录序列化等阶段时传入
+            include_timings: 是否在响应中附带各阶段耗时(毫秒)
             
-            # 2. 验证SQL安全性
-            if not self.db_service.validate_sql(sql):
-                return QueryResponse(
-                    status="error",
-                    message="生成的查询不符合安全要求",
-                    sql=sql,
-                    execution_time=time.time() - start_time
+        Returns:
+            QueryResponse: 查询响应对象
+        """
+        timings = timings or StageTimings()
+        response = await self._process_query_async(query_request, timings)
+        observe_query(
+            "json", response.source, response.status,
+            response.execution_time or 0.0, response.count or 0
+        )
+        if include_timings:
+            response.timings = timings.to_dict()
+        return response
+    
+    async def _process_query_async(
+        self,
+        query_request: QueryRequest,
+        timings: StageTimings
+    ) -> QueryResponse:
+        """process_query_async 的处理主体"""
+        start_time = time.time()
+        
+        try:
+            # 续页请求：直接使用令牌中的SQL，不再调用大模型
+            if query_request.cursor:
+                base_sql, last_id, page_size = decode_cursor(query_request.cursor)
+                if not self.db_service.validate_sql(base_sql):
+                    raise QueryError("分页令牌中的查询不符合安全要求")
+                return await self._fetch_page(
+                    base_sql, last_id, query_request.page_size or page_size, start_time, timings
                 )
             
+            question = query_request.question.strip()
+            logger.info(f"开始处理查询: {question}")
+            
+            # 1-2. 生成SQL语句并验证安全性
+            sql, source = await self.prepare_sql(question, timings)
+            
+            # 分页请求：可按id键集分页的明细查询返回首页与续页令牌
+            if query_request.page_size:
+                base_sql = pageable_base_sql(sql)
+                if base_sql is not None:
+                    response = await self._fetch_page(
+                        base_sql, None, query_request.page_size, start_time, timings
+                    )
+                    response.source = source
+                    return response
+            
             # 3. 优化SQL语句
-            optimized_sql = self.llm_service.optimize_sql(sql)
+            with timings.stage("optimize"):
+                optimized_sql = self.llm_service.optimize_sql(sql)
             
             # 4. 执行查询
-            results, query_execution_time = self.db_service.execute_query(optimized_sql)
+            with timings.stage("execute"):
+                results, query_execution_time = await self.execute_shared(optimized_sql)
             
             # 5. 格式化结果
-            formatted_results = self.db_service.format_results(results)
+            with timings.stage("format"):
+                formatted_results = self.db_service.format_results(results)
             
             total_time = time.time() - start_time
             
@@ -81,7 +379,32 @@ class SQLGenerator:
                 data=formatted_results,
                 sql=optimized_sql,
                 count=len(formatted_results),
-                execution_time=total_time
+                execution_time=total_time,
+                source=source,
+                plan=self.db_service.get_plan_summary(optimized_sql)
+            )
+            
+        except ValueError as e:
+            return QueryResponse(
+                status="error",
+                message=str(e),
+                execution_time=time.time() - start_time
+            )
+            
+        except QueryGuardError as e:
+            return QueryResponse(
+                status="error",
+                message=e.message,
+                execution_time=time.time() - start_time,
+                plan=e.plan
+            )
+            
+        except QueryError as e:
+            return QueryResponse(
+                status="error",
+                message=e.message,
+                sql=e.sql,
+                execution_time=time.time() - start_time
             )
             
         except Exception as e:
@@ -94,6 +417,304 @@ class SQLGenerator:
                 execution_time=error_time
             )
     
+    async def process_query_columnar_async(
+        self,
+        query_request: QueryRequest,
+        orient: str = "rows",
+        timings: Optional[StageTimings] = None,
+        include_timings: bool = False
+    ) -> Dict[str, Any]:
+        """
+        异步处理查询并以列式结构返回结果
+        
+        结果由元组游标读取，不构建逐行字典；列名只出现一次
+        
+        Args:
+            query_request: 查询请求对象
+            orient: rows 返回行数组，columns 返回按列组织的向量
+            timings: 阶段耗时记录，调用方需继续记录序列化等阶段时传入
+            include_timings: 是否在响应中附带各阶段耗时(毫秒)
+            
+        Returns:
+            Dict[str, Any]: 包含 columns 与 rows/data 的响应字典
+        """
+        timings = timings or StageTimings()
+        response = await self._process_query_columnar_async(query_request, orient, timings)
+        observe_query(
+            "columnar", response.get("source"), response["status"],
+            response.get("execution_time") or 0.0, response.get("count") or 0
+        )
+        if include_timings:
+            response["timings"] = timings.to_dict()
+        return response
+    
+    async def _process_query_columnar_async(
+        self,
+        query_request: QueryRequest,
+        orient: str,
+        timings: StageTimings
+    ) -> Dict[str, Any]:
+        """process_query_columnar_async 的处理主体"""
+        start_time = time.time()
+        question = query_request.question.strip()
+        
+        logger.info(f"开始处理列式查询: {question}")
+        
+        try:
+            sql, source = await self.prepare_sql(question, timings)
+            with timings.stage("optimize"):
+                optimized_sql = self.llm_service.optimize_sql(sql)
+            with timings.stage("execute"):
+                columns, rows, _ = await self.execute_columnar_shared(optimized_sql)
+            
+            with timings.stage("format"):
+                format_row = self.db_service.format_row
+                formatted_rows = [format_row(row) for row in rows]
+                if orient == "columns":
+                    vectors = list(zip(*formatted_rows)) if formatted_rows else [()] * len(columns)
+                    body: Dict[str, Any] = {
+                        "data": {column: list(vector) for column, vector in zip(columns, vectors)}
+                    }
+                else:
+                    body = {"rows": formatted_rows}
+            
+            response: Dict[str, Any] = {
+                "status": "success",
+                "message": "查询成功",
+                "columns": columns,
+                "sql": optimized_sql,
+                "count": len(formatted_rows),
+                "source": source,
+                "plan": self.db_service.get_plan_summary(optimized_sql),
+                **body
+            }
+            
+            total_time = time.time() - start_time
+            response["execution_time"] = total_time
+            logger.info(f"列式查询处理完成，返回 {len(formatted_rows)} 条结果，总耗时 {total_time:.3f} 秒")
+            return response
+            
+        except QueryError as e:
+            return {
+                "status": "error",
+                "message": e.message,
+                "sql": e.sql,
+                "execution_time": time.time() - start_time
+            }
+            
+        except QueryGuardError as e:
+            return {
+                "status": "error",
+                "message": e.message,
+                "plan": e.plan,
+                "execution_time": time.time() - start_time
+            }
+            
+        except Exception as e:
+            logger.error(f"列式查询处理失败: {e}")
+            return {
+                "status": "error",
+                "message": f"查询执行失败: {str(e)}",
+                "execution_time": time.time() - start_time
+            }
+    
+    async def _fetch_page(
+        self,
+        base_sql: str,
+        last_id: Optional[int],
+        page_size: int,
+        start_time: float,
+        timings: Optional[StageTimings] = None
+    ) -> QueryResponse:
+        """
+        按id键集分页读取一页结果
+        
+        Args:
+            base_sql: 分页基础SQL
+            last_id: 上一页最后一行id，首页为None
+            page_size: 每页行数
+            start_time: 请求开始时间
+            timings: 阶段耗时记录
+            
+        Returns:
+            QueryResponse: 当前页结果与续页令牌
+        """
+        timings = timings or StageTimings()
+        page_size = min(page_size, config.PAGE_SIZE_MAX)
+        page_sql = build_page_sql(base_sql, last_id is not None)
+        # 多取一行用于判断是否还有下一页
+        params = (last_id, page_size + 1) if last_id is not None else (page_size + 1,)
+        
+        with timings.stage("execute"):
+            results, _ = await self.execute_shared(page_sql, params)
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        next_cursor = (
+            encode_cursor(base_sql, results[-1]["id"], page_size)
+            if has_more and results else None
+        )
+        
+        with timings.stage("format"):
+            formatted_results = self.db_service.format_results(results)
+        total_time = time.time() - start_time
+        logger.info(f"分页查询完成，返回 {len(formatted_results)} 条结果，总耗时 {total_time:.3f} 秒")
+        
+        return QueryResponse(
+            status="success",
+            message="查询成功",
+            data=formatted_results,
+            sql=base_sql,
+            count=len(formatted_results),
+            execution_time=total_time,
+            next_cursor=next_cursor,
+            has_more=has_more,
+            plan=self.db_service.get_plan_summary(page_sql)
+        )
+    
+    async def stream_query_results(
+        self,
+        sql: str,
+        started_at: Optional[float] = None,
+        plan: Optional[Dict[str, Any]] = None,
+        source: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        以NDJSON帧流式输出查询结果
+        
+        依次输出 header 帧(sql, columns, plan)、若干 rows 帧、trailer 帧(count, timings)；
+        执行中出错时输出 error 帧
+        
+        Args:
+            sql: 已验证并优化的SQL
+            started_at: 请求开始时间，用于计算总耗时
+            plan: 执行前代价检查得到的执行计划汇总
+            source: SQL来源，用于查询耗时指标的标签
+            
+        Yields:
+            bytes: 一行JSON
+        """
+        start_time = started_at or time.time()
+        execute_start = time.time()
+        first_row_time = None
+        count = 0
+        
+        batches = self.db_service.stream_query(sql, config.STREAM_BATCH_SIZE)
+        try:
+            columns = await self.db_service.run_in_executor(next, batches)
+            yield _ndjson({"type": "header", "sql": sql, "columns": columns, "plan": plan})
+            
+            while True:
+                batch = await self.db_service.run_in_executor(next, batches, None)
+                if batch is None:
+                    break
+                if first_row_time is None:
+                    first_row_time = time.time() - execute_start
+                count += len(batch)
+                yield _ndjson({
+                    "type": "rows",
+                    "rows": [self.db_service.format_row(row) for row in batch]
+                })
+            
+            total_time = time.time() - start_time
+            logger.info(f"流式查询完成，返回 {count} 条结果，总耗时 {total_time:.3f} 秒")
+            observe_query("stream", source, "success", total_time, count)
+            yield _ndjson({
+                "type": "trailer",
+                "count": count,
+                "timings": {
+                    "prepare": round(execute_start - start_time, 6),
+                    "first_row": round(first_row_time, 6) if first_row_time is not None else None,
+                    "total": round(total_time, 6)
+                }
+            })
+            
+        except Exception as e:
+            logger.error(f"流式查询失败: {e}")
+            observe_query("stream", source, "error", time.time() - start_time, count)
+            yield _ndjson({"type": "error", "message": f"查询执行失败: {str(e)}", "count": count})
+            
+        finally:
+            # 客户端提前断开时关闭生成器，释放服务端游标与连接
+            await self.db_service.run_in_executor(batches.close)
+    
+    async def process_batch(
+        self,
+        questions: List[str],
+        concurrency: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        批量处理问题，按完成顺序以NDJSON帧流式输出
+        
+        归一化后相同的问题只处理一次；各问题并行处理(并行数受concurrency限制，
+        大模型调用与数据库执行另受各自的全局并发上限约束)，单个问题失败不影响其他问题。
+        依次输出 header 帧(total, unique)、每个问题一个 result 帧(带原始序号index)、
+        summary 帧(成功/失败数与总耗时)
+        
+        Args:
+            questions: 问题列表
+            concurrency: 并行数，默认为BATCH_CONCURRENCY
+            
+        Yields:
+            bytes: 一行JSON
+        """
+        start_time = time.time()
+        limit = asyncio.Semaphore(min(concurrency or config.BATCH_CONCURRENCY, config.BATCH_MAX_CONCURRENCY))
+        
+        # 按归一化问题去重，记录每个唯一问题对应的原始序号
+        groups: Dict[str, List[int]] = {}
+        for index, question in enumerate(questions):
+            groups.setdefault(self.llm_service.question_key(question), []).append(index)
+        
+        yield _ndjson({"type": "header", "total": len(questions), "unique": len(groups)})
+        
+        async def run(indexes: List[int]) -> Tuple[List[int], QueryResponse]:
+            question = questions[indexes[0]]
+            # 单项的任何异常都只产生该项的错误帧，不中断整个批次
+            try:
+                validation = self.validate_question(question)
+                if not validation["is_valid"]:
+                    return indexes, QueryResponse(
+                        status="error", message=f"问题验证失败: {', '.join(validation['errors'])}"
+                    )
+                async with limit:
+                    response = await self.process_query_async(QueryRequest(question=question))
+            except Exception as e:
+                logger.error(f"批量查询第 {indexes[0]} 项失败: {e}")
+                response = QueryResponse(status="error", message=f"查询执行失败: {str(e)}")
+            return indexes, response
+        
+        tasks = [asyncio.ensure_future(run(indexes)) for indexes in groups.values()]
+        succeeded = failed = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                indexes, response = await finished
+                result = response.model_dump(exclude_none=True)
+                for index in indexes:
+                    if response.status == "success":
+                        succeeded += 1
+                    else:
+                        failed += 1
+                    frame = {"type": "result", "index": index, "question": questions[index], **result}
+                    if index != indexes[0]:
+                        frame["duplicate_of"] = indexes[0]
+                    yield _ndjson(frame)
+            
+            total_time = time.time() - start_time
+            logger.info(f"批量查询完成，共 {len(questions)} 个问题({len(groups)} 个不同)，总耗时 {total_time:.3f} 秒")
+            yield _ndjson({
+                "type": "summary",
+                "total": len(questions),
+                "unique": len(groups),
+                "succeeded": succeeded,
+                "failed": failed,
+                "execution_time": round(total_time, 6)
+            })
+        
+        finally:
+            # 客户端提前断开时取消尚未完成的问题
+            for task in tasks:
+                task.cancel()
+    
     def get_suggestions(self, partial_question: str) -> list:
         """
         根据部分问题提供查询建议
@@ -149,7 +770,8 @@ class SQLGenerator:
         validation_result = {
             "is_valid": True,
             "errors": [],
-            "warnings": []
+            "warnings": [],
+            "entities": []
         }
         
         # 检查问题长度
@@ -176,7 +798,14 @@ class SQLGenerator:
             "省", "市", "灾害", "地质", "年份", "敷设", "统计", "查询"
         ]
         
-        has_pipeline_keyword = any(keyword in question for keyword in pipeline_keywords)
+        # 按实体索引识别问题中的省份、城市、管道类型等取值，并给出库中的规范写法
+        entities = self.entity_index.find(question)
+        validation_result["entities"] = [
+            {"text": entity.text, "column": entity.column, "value": entity.value}
+            for entity in entities
+        ]
+        
+        has_pipeline_keyword = bool(entities) or any(keyword in question for keyword in pipeline_keywords)
         if not has_pipeline_keyword:
             validation_result["warnings"].append("问题似乎与管道信息无关，建议包含相关关键词")
         
@@ -235,12 +864,12 @@ class SQLGenerator:
                     "message": "数据库连接失败"
                 }
             
-            # 获取统计信息
-            stats = self.db_service.get_database_stats()
+            # 获取统计快照（由后台任务刷新）
+            stats = self.stats_service.get_snapshot()
             
             return {
                 "status": "connected",
-                "stats": stats.dict(),
+                "stats": stats.model_dump(mode="json"),
                 "message": "数据库连接正常"
             }
             
@@ -249,4 +878,13 @@ class SQLGenerator:
             return {
                 "status": "error",
                 "message": f"获取数据库信息失败: {str(e)}"
-            } 
\ No newline at end of file
+            }
+    
+    async def get_database_info_async(self) -> Dict[str, Any]:
+        """
+        异步获取数据库基本信息
+        
+        Returns:
+            Dict[str, Any]: 数据库信息
+        """
+        return await self.db_service.run_in_executor(self.get_database_info)
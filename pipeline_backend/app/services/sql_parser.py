@@ -0,0 +1,1247 @@
+"""
+SQL解析模块
+对MySQL SELECT子集进行词法分析与语法分析，生成抽象语法树(AST)，
+在AST上按表结构白名单校验语句类型、表、字段与函数，识别聚合与分组，
+按结构注入或收紧LIMIT，并输出规范化SQL与指纹供缓存使用
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple, Union
+from pymysql.converters import escape_string
+from config import config
+from .cache import LRUCache
+
+# pipeline_info 表结构白名单
+SCHEMA: Dict[str, FrozenSet[str]] = {
+    "pipeline_info": frozenset({
+        "id", "province", "city", "street", "road", "location", "disaster_type",
+        "geological_feature", "pipeline_type", "build_year", "laying_method",
+        "created_at", "updated_at"
+    })
+}
+
+# 低基数字段的取值个数上限估计，用于估算GROUP BY的分组数
+# (省级行政区34个，城市含县级市约700个，建成年份1900年至今)
+GROUP_CARDINALITY: Dict[str, int] = {
+    "province": 34, "city": 700, "pipeline_type": 50, "disaster_type": 50,
+    "geological_feature": 50, "laying_method": 20, "build_year": 150
+}
+
+AGGREGATE_FUNCTIONS = frozenset({"COUNT", "SUM", "AVG", "MIN", "MAX", "GROUP_CONCAT"})
+
+# 允许调用的函数（不含SLEEP、BENCHMARK、LOAD_FILE、USER等）
+ALLOWED_FUNCTIONS = AGGREGATE_FUNCTIONS | frozenset({
+    "ABS", "CEIL", "CEILING", "FLOOR", "ROUND", "MOD", "GREATEST", "LEAST",
+    "CONCAT", "CONCAT_WS", "SUBSTRING", "SUBSTR", "LEFT", "RIGHT", "LENGTH", "CHAR_LENGTH",
+    "UPPER", "LOWER", "TRIM", "LTRIM", "RTRIM", "REPLACE", "LPAD", "RPAD", "LOCATE", "INSTR",
+    "IFNULL", "COALESCE", "NULLIF", "IF", "CAST",
+    "YEAR", "MONTH", "DAY", "DATE", "NOW", "CURDATE", "CURRENT_DATE", "CURRENT_TIMESTAMP",
+    "DATE_FORMAT", "DATEDIFF", "DATE_ADD", "DATE_SUB"
+})
+
+# 不带括号也是函数调用的关键字
+_NILADIC_FUNCTIONS = frozenset({"CURRENT_DATE", "CURRENT_TIMESTAMP"})
+
+KEYWORDS = frozenset({
+    "SELECT", "FROM", "WHERE", "GROUP", "BY", "HAVING", "ORDER", "LIMIT", "OFFSET",
+    "UNION", "ALL", "DISTINCT", "AS", "ON", "USING", "JOIN", "INNER", "LEFT", "RIGHT",
+    "OUTER", "CROSS", "AND", "OR", "NOT", "XOR", "IN", "BETWEEN", "LIKE", "REGEXP", "RLIKE",
+    "IS", "NULL", "TRUE", "FALSE", "CASE", "WHEN", "THEN", "ELSE", "END", "EXISTS",
+    "ASC", "DESC", "INTERVAL", "DIV", "MOD", "WITH", "ROLLUP", "ESCAPE", "INTO", "FOR",
+    "CURRENT_DATE", "CURRENT_TIMESTAMP", "STRAIGHT_JOIN", "NATURAL", "LOCK", "SHARE",
+    "UPDATE", "DELETE", "INSERT", "CREATE", "DROP", "ALTER", "TRUNCATE", "GRANT", "REVOKE",
+    "CALL", "EXECUTE", "SET", "SHOW", "DESCRIBE", "EXPLAIN", "REPLACE", "LOAD", "HANDLER"
+})
+
+# 函数名同时是关键字时仍按函数解析
+_FUNCTION_KEYWORDS = frozenset({"LEFT", "RIGHT", "REPLACE", "MOD", "IF", "INSERT"})
+
+_INTERVAL_UNITS = frozenset({
+    "MICROSECOND", "SECOND", "MINUTE", "HOUR", "DAY", "WEEK", "MONTH", "QUARTER", "YEAR"
+})
+
+_CAST_TYPES = frozenset({
+    "CHAR", "SIGNED", "UNSIGNED", "DECIMAL", "DATE", "DATETIME", "TIME", "BINARY", "DOUBLE", "FLOAT"
+})
+
+_SIMPLE_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+
+_TOKEN_PATTERN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--(?:\s[^\n]*)?(?:\n|$)|\#[^\n]*|/\*.*?\*/)
+  | (?P<number>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+  | (?P<quoted>`(?:[^`]|``)+`)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<param>%s)
+  | (?P<op><=>|<=|>=|<>|!=|&&|\|\||[=<>+\-*/%(),.;])
+""", re.X | re.S)
+
+_STRING_ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+
+
+class SQLValidationError(ValueError):
+    """SQL无法解析或不符合安全要求"""
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str       # number | string | ident | keyword | param | op | eof
+    value: str
+    position: int
+
+
+def _unescape_string(body: str, quote: str) -> str:
+    """解码MySQL字符串字面量内容"""
+    def unescape(match: "re.Match") -> str:
+        if match.group(0) == quote * 2:
+            return quote
+        char = match.group(1)
+        return _STRING_ESCAPES.get(char, char)
+    return re.sub(r"\\(.)|" + re.escape(quote * 2), unescape, body, flags=re.S)
+
+
+def tokenize(sql: str) -> List[Token]:
+    """
+    词法分析
+
+    注释被丢弃；MySQL可执行注释(/*! ... */)直接拒绝
+
+    Raises:
+        SQLValidationError: 存在无法识别的字符
+    """
+    tokens: List[Token] = []
+    position = 0
+    while position < len(sql):
+        match = _TOKEN_PATTERN.match(sql, position)
+        if not match:
+            raise SQLValidationError(f"无法识别的字符: {sql[position:position + 10]!r}")
+        kind = match.lastgroup
+        text = match.group(0)
+        if kind == "comment":
+            if text.startswith("/*!"):
+                raise SQLValidationError("不允许使用可执行注释")
+        elif kind == "string":
+            tokens.append(Token("string", _unescape_string(text[1:-1], text[0]), position))
+        elif kind == "quoted":
+            tokens.append(Token("ident", text[1:-1].replace("``", "`"), position))
+        elif kind == "word":
+            upper = text.upper()
+            tokens.append(Token("keyword" if upper in KEYWORDS else "ident",
+                                upper if upper in KEYWORDS else text, position))
+        elif kind != "ws":
+            tokens.append(Token(kind, text, position))
+        position = match.end()
+    tokens.append(Token("eof", "", position))
+    return tokens
+
+
+def quote_identifier(name: str) -> str:
+    """按需为标识符加反引号"""
+    if _SIMPLE_IDENTIFIER.match(name) and name.upper() not in KEYWORDS:
+        return name
+    return "`" + name.replace("`", "``") + "`"
+
+
+# ---------------------------------------------------------------------------
+# AST节点
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Literal:
+    kind: str   # number | string | null | boolean
+    value: str
+
+
+@dataclass(frozen=True)
+class Placeholder:
+    pass
+
+
+@dataclass(frozen=True)
+class Column:
+    table: Optional[str]
+    name: str
+
+
+@dataclass(frozen=True)
+class Star:
+    table: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Function:
+    name: str
+    args: Tuple[Any, ...] = ()
+    distinct: bool = False
+    star: bool = False
+    separator: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Cast:
+    expr: Any
+    type_name: str
+
+
+@dataclass(frozen=True)
+class Interval:
+    expr: Any
+    unit: str
+
+
+@dataclass(frozen=True)
+class Unary:
+    op: str
+    operand: Any
+
+
+@dataclass(frozen=True)
+class Binary:
+    op: str
+    left: Any
+    right: Any
+
+
+@dataclass(frozen=True)
+class Between:
+    expr: Any
+    low: Any
+    high: Any
+    negated: bool = False
+
+
+@dataclass(frozen=True)
+class InList:
+    expr: Any
+    items: Tuple[Any, ...]
+    negated: bool = False
+
+
+@dataclass(frozen=True)
+class InSubquery:
+    expr: Any
+    query: Any
+    negated: bool = False
+
+
+@dataclass(frozen=True)
+class Like:
+    expr: Any
+    pattern: Any
+    op: str = "LIKE"
+    negated: bool = False
+    escape: Optional[Any] = None
+
+
+@dataclass(frozen=True)
+class IsTest:
+    expr: Any
+    value: str      # NULL | TRUE | FALSE
+    negated: bool = False
+
+
+@dataclass(frozen=True)
+class Exists:
+    query: Any
+
+
+@dataclass(frozen=True)
+class Subquery:
+    query: Any
+
+
+@dataclass(frozen=True)
+class Case:
+    operand: Optional[Any]
+    whens: Tuple[Tuple[Any, Any], ...]
+    default: Optional[Any] = None
+
+
+@dataclass(frozen=True)
+class SelectItem:
+    expr: Any
+    alias: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class TableRef:
+    name: str
+    alias: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class DerivedTable:
+    query: Any
+    alias: str
+
+
+@dataclass(frozen=True)
+class Join:
+    kind: str
+    source: Any
+    condition: Optional[Any] = None
+    using: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class OrderItem:
+    expr: Any
+    descending: bool = False
+
+
+@dataclass(frozen=True)
+class Limit:
+    count: Union[int, Placeholder]
+    offset: Union[int, Placeholder] = 0
+
+
+@dataclass(frozen=True)
+class Select:
+    items: Tuple[SelectItem, ...]
+    source: Optional[Any] = None
+    joins: Tuple[Join, ...] = ()
+    where: Optional[Any] = None
+    group_by: Tuple[Any, ...] = ()
+    rollup: bool = False
+    having: Optional[Any] = None
+    order_by: Tuple[OrderItem, ...] = ()
+    limit: Optional[Limit] = None
+    distinct: bool = False
+
+
+@dataclass(frozen=True)
+class Union_:
+    selects: Tuple[Select, ...]
+    all_flags: Tuple[bool, ...]
+    order_by: Tuple[OrderItem, ...] = ()
+    limit: Optional[Limit] = None
+
+
+Query = Union[Select, Union_]
+
+
+# ---------------------------------------------------------------------------
+# 语法分析
+# ---------------------------------------------------------------------------
+
+class _Parser:
+    """递归下降语法分析器"""
+
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.index = 0
+
+    @property
+    def current(self) -> Token:
+        return self.tokens[self.index]
+
+    def peek(self, offset: int = 1) -> Token:
+        return self.tokens[min(self.index + offset, len(self.tokens) - 1)]
+
+    def advance(self) -> Token:
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def at(self, *values: str) -> bool:
+        token = self.current
+        return token.kind in ("keyword", "op") and token.value in values
+
+    def accept(self, *values: str) -> Optional[Token]:
+        if self.at(*values):
+            return self.advance()
+        return None
+
+    def expect(self, value: str) -> Token:
+        if not self.at(value):
+            self.error(f"期望 {value}")
+        return self.advance()
+
+    def error(self, message: str) -> None:
+        token = self.current
+        found = token.value or "语句结尾"
+        raise SQLValidationError(f"SQL语法错误: {message}，位置 {token.position} 处为 {found!r}")
+
+    def identifier(self) -> str:
+        token = self.current
+        if token.kind != "ident":
+            self.error("期望标识符")
+        self.advance()
+        return token.value
+
+    # 语句 ---------------------------------------------------------------
+
+    def statement(self) -> Query:
+        if not self.at("SELECT", "("):
+            keyword = self.current.value.upper() or "空语句"
+            raise SQLValidationError(f"只允许SELECT查询，实际为 {keyword}")
+        query = self.query()
+        self.accept(";")
+        if self.current.kind != "eof":
+            self.error("语句结尾存在多余内容")
+        return query
+
+    def query(self) -> Query:
+        selects = [self.select_core()]
+        all_flags: List[bool] = []
+        while self.accept("UNION"):
+            all_flags.append(bool(self.accept("ALL")))
+            if not all_flags[-1]:
+                self.accept("DISTINCT")
+            selects.append(self.select_core())
+
+        order_by = self.order_by()
+        limit = self.limit()
+        if len(selects) == 1:
+            select = selects[0]
+            if order_by and select.order_by or limit and select.limit:
+                self.error("重复的 ORDER BY 或 LIMIT")
+            return replace(
+                select,
+                order_by=order_by or select.order_by,
+                limit=limit or select.limit
+            )
+        return Union_(tuple(selects), tuple(all_flags), order_by, limit)
+
+    def select_core(self) -> Select:
+        if self.accept("("):
+            select = self.query()
+            self.expect(")")
+            if isinstance(select, Union_):
+                self.error("不支持嵌套的 UNION")
+            return select
+
+        self.expect("SELECT")
+        distinct = bool(self.accept("DISTINCT"))
+        if not distinct:
+            self.accept("ALL")
+
+        items = [self.select_item()]
+        while self.accept(","):
+            items.append(self.select_item())
+
+        source = None
+        joins: List[Join] = []
+        if self.accept("FROM"):
+            source = self.table_source()
+            while True:
+                if self.accept(","):
+                    joins.append(Join("CROSS JOIN", self.table_source()))
+                    continue
+                join = self.join()
+                if join is None:
+                    break
+                joins.append(join)
+
+        where = self.expression() if self.accept("WHERE") else None
+
+        group_by: List[Any] = []
+        rollup = False
+        if self.accept("GROUP"):
+            self.expect("BY")
+            group_by.append(self.expression())
+            while self.accept(","):
+                group_by.append(self.expression())
+            if self.accept("WITH"):
+                self.expect("ROLLUP")
+                rollup = True
+
+        having = self.expression() if self.accept("HAVING") else None
+
+        # 单个SELECT的ORDER BY/LIMIT由query()统一处理（UNION分支需加括号）
+        return Select(
+            items=tuple(items), source=source, joins=tuple(joins), where=where,
+            group_by=tuple(group_by), rollup=rollup, having=having, distinct=distinct
+        )
+
+    def select_item(self) -> SelectItem:
+        if self.accept("*"):
+            return SelectItem(Star())
+        if self.current.kind == "ident" and self.peek().value == "." and self.peek(2).value == "*":
+            table = self.identifier()
+            self.advance()
+            self.advance()
+            return SelectItem(Star(table))
+        expr = self.expression()
+        return SelectItem(expr, self.alias())
+
+    def alias(self) -> Optional[str]:
+        if self.accept("AS"):
+            token = self.current
+            if token.kind == "string":
+                self.advance()
+                return token.value
+            return self.identifier()
+        if self.current.kind == "ident":
+            return self.identifier()
+        return None
+
+    def table_source(self) -> Any:
+        if self.accept("("):
+            query = self.query()
+            self.expect(")")
+            alias = self.alias()
+            if alias is None:
+                self.error("派生表必须指定别名")
+            return DerivedTable(query, alias)
+
+        name = self.identifier()
+        if self.accept("."):
+            # 库名.表名：只允许当前库
+            raise SQLValidationError(f"不允许跨库访问表: {name}.{self.identifier()}")
+        return TableRef(name, self.alias())
+
+    def join(self) -> Optional[Join]:
+        if self.accept("JOIN"):
+            kind = "JOIN"
+        elif self.accept("INNER"):
+            self.expect("JOIN")
+            kind = "JOIN"
+        elif self.accept("CROSS"):
+            self.expect("JOIN")
+            kind = "CROSS JOIN"
+        elif self.at("LEFT", "RIGHT") and self.peek().value in ("JOIN", "OUTER"):
+            kind = self.advance().value + " JOIN"
+            self.accept("OUTER")
+            self.expect("JOIN")
+        else:
+            return None
+
+        source = self.table_source()
+        if self.accept("ON"):
+            return Join(kind, source, condition=self.expression())
+        if self.accept("USING"):
+            self.expect("(")
+            columns = [self.identifier()]
+            while self.accept(","):
+                columns.append(self.identifier())
+            self.expect(")")
+            return Join(kind, source, using=tuple(columns))
+        return Join(kind, source)
+
+    def order_by(self) -> Tuple[OrderItem, ...]:
+        if not self.accept("ORDER"):
+            return ()
+        self.expect("BY")
+        items = [self.order_item()]
+        while self.accept(","):
+            items.append(self.order_item())
+        return tuple(items)
+
+    def order_item(self) -> OrderItem:
+        expr = self.expression()
+        if self.accept("DESC"):
+            return OrderItem(expr, True)
+        self.accept("ASC")
+        return OrderItem(expr, False)
+
+    def limit(self) -> Optional[Limit]:
+        if not self.accept("LIMIT"):
+            return None
+        first = self.limit_value()
+        if self.accept(","):
+            return Limit(count=self.limit_value(), offset=first)
+        if self.accept("OFFSET"):
+            return Limit(count=first, offset=self.limit_value())
+        return Limit(count=first)
+
+    def limit_value(self) -> Union[int, Placeholder]:
+        if self.current.kind == "param":
+            self.advance()
+            return Placeholder()
+        return self.integer()
+
+    def integer(self) -> int:
+        token = self.current
+        if token.kind != "number" or not token.value.isdigit():
+            self.error("需要非负整数")
+        self.advance()
+        return int(token.value)
+
+    # 表达式 -------------------------------------------------------------
+
+    def expression(self) -> Any:
+        left = self.xor_expression()
+        while self.accept("OR", "||"):
+            left = Binary("OR", left, self.xor_expression())
+        return left
+
+    def xor_expression(self) -> Any:
+        left = self.and_expression()
+        while self.accept("XOR"):
+            left = Binary("XOR", left, self.and_expression())
+        return left
+
+    def and_expression(self) -> Any:
+        left = self.not_expression()
+        while self.accept("AND", "&&"):
+            left = Binary("AND", left, self.not_expression())
+        return left
+
+    def not_expression(self) -> Any:
+        if self.accept("NOT"):
+            return Unary("NOT", self.not_expression())
+        return self.predicate()
+
+    def predicate(self) -> Any:
+        expr = self.additive()
+        while True:
+            if self.at("=", "<>", "!=", "<", ">", "<=", ">=", "<=>"):
+                op = self.advance().value
+                expr = Binary("<>" if op == "!=" else op, expr, self.additive())
+                continue
+
+            if self.accept("IS"):
+                negated = bool(self.accept("NOT"))
+                if not self.at("NULL", "TRUE", "FALSE"):
+                    self.error("IS 之后需要 NULL/TRUE/FALSE")
+                return IsTest(expr, self.advance().value, negated)
+
+            negated = False
+            if self.at("NOT") and self.peek().value in ("IN", "BETWEEN", "LIKE", "REGEXP", "RLIKE"):
+                self.advance()
+                negated = True
+
+            if self.accept("IN"):
+                self.expect("(")
+                if self.at("SELECT"):
+                    query = self.query()
+                    self.expect(")")
+                    return InSubquery(expr, query, negated)
+                items = [self.expression()]
+                while self.accept(","):
+                    items.append(self.expression())
+                self.expect(")")
+                return InList(expr, tuple(items), negated)
+
+            if self.accept("BETWEEN"):
+                low = self.additive()
+                self.expect("AND")
+                return Between(expr, low, self.additive(), negated)
+
+            if self.at("LIKE", "REGEXP", "RLIKE"):
+                op = self.advance().value
+                pattern = self.additive()
+                escape = self.additive() if op == "LIKE" and self.accept("ESCAPE") else None
+                return Like(expr, pattern, "REGEXP" if op == "RLIKE" else op, negated, escape)
+
+            if negated:
+                self.error("NOT 之后缺少谓词")
+            return expr
+
+    def additive(self) -> Any:
+        left = self.multiplicative()
+        while self.at("+", "-"):
+            op = self.advance().value
+            left = Binary(op, left, self.multiplicative())
+        return left
+
+    def multiplicative(self) -> Any:
+        left = self.unary()
+        while self.at("*", "/", "%", "DIV", "MOD"):
+            op = self.advance().value
+            left = Binary("MOD" if op == "%" else op, left, self.unary())
+        return left
+
+    def unary(self) -> Any:
+        if self.at("-", "+"):
+            op = self.advance().value
+            operand = self.unary()
+            if op == "+":
+                return operand
+            if isinstance(operand, Literal) and operand.kind == "number" and not operand.value.startswith("-"):
+                return Literal("number", "-" + operand.value)
+            return Unary("-", operand)
+        return self.primary()
+
+    def primary(self) -> Any:
+        token = self.current
+
+        if token.kind == "number":
+            self.advance()
+            return Literal("number", token.value)
+        if token.kind == "string":
+            self.advance()
+            return Literal("string", token.value)
+        if token.kind == "param":
+            self.advance()
+            return Placeholder()
+
+        if token.kind == "keyword":
+            if token.value == "NULL":
+                self.advance()
+                return Literal("null", "NULL")
+            if token.value in ("TRUE", "FALSE"):
+                self.advance()
+                return Literal("boolean", token.value)
+            if token.value == "CASE":
+                return self.case()
+            if token.value == "EXISTS":
+                self.advance()
+                self.expect("(")
+                query = self.query()
+                self.expect(")")
+                return Exists(query)
+            if token.value == "INTERVAL":
+                self.advance()
+                expr = self.additive()
+                unit = self.current.value.upper()
+                if unit not in _INTERVAL_UNITS:
+                    self.error("无效的时间间隔单位")
+                self.advance()
+                return Interval(expr, unit)
+            if token.value in _NILADIC_FUNCTIONS:
+                self.advance()
+                if self.accept("("):
+                    self.expect(")")
+                return Function(token.value)
+            if token.value in _FUNCTION_KEYWORDS and self.peek().value == "(":
+                self.advance()
+                return self.function_call(token.value)
+
+        if self.accept("("):
+            if self.at("SELECT"):
+                query = self.query()
+                self.expect(")")
+                return Subquery(query)
+            expr = self.expression()
+            self.expect(")")
+            return expr
+
+        if token.kind == "ident":
+            self.advance()
+            if self.at("(") and token.position + len(token.value) == self.current.position:
+                return self.function_call(token.value.upper())
+            if self.accept("."):
+                return Column(token.value, self.identifier())
+            return Column(None, token.value)
+
+        self.error("期望表达式")
+
+    def function_call(self, name: str) -> Any:
+        self.expect("(")
+        if name == "CAST":
+            expr = self.expression()
+            self.expect("AS")
+            type_name = self.current.value.upper()
+            if type_name not in _CAST_TYPES:
+                self.error("不支持的CAST类型")
+            self.advance()
+            if self.accept("("):
+                size = [str(self.integer())]
+                while self.accept(","):
+                    size.append(str(self.integer()))
+                self.expect(")")
+                type_name += f"({','.join(size)})"
+            self.expect(")")
+            return Cast(expr, type_name)
+
+        if self.accept(")"):
+            return Function(name)
+        if self.accept("*"):
+            self.expect(")")
+            return Function(name, star=True)
+
+        distinct = bool(self.accept("DISTINCT"))
+        args = [self.expression()]
+        while self.accept(","):
+            args.append(self.expression())
+        separator = None
+        if name == "GROUP_CONCAT" and self.current.kind == "ident" and self.current.value.upper() == "SEPARATOR":
+            self.advance()
+            if self.current.kind != "string":
+                self.error("SEPARATOR 需要字符串")
+            separator = self.advance().value
+        self.expect(")")
+        return Function(name, tuple(args), distinct, separator=separator)
+
+    def case(self) -> Case:
+        self.expect("CASE")
+        operand = None if self.at("WHEN") else self.expression()
+        whens = []
+        while self.accept("WHEN"):
+            condition = self.expression()
+            self.expect("THEN")
+            whens.append((condition, self.expression()))
+        if not whens:
+            self.error("CASE 至少需要一个 WHEN")
+        default = self.expression() if self.accept("ELSE") else None
+        self.expect("END")
+        return Case(operand, tuple(whens), default)
+
+
+# ---------------------------------------------------------------------------
+# 规范化输出
+# ---------------------------------------------------------------------------
+
+_PRECEDENCE = {
+    "OR": 1, "XOR": 2, "AND": 3, "NOT": 4,
+    "=": 5, "<>": 5, "<": 5, ">": 5, "<=": 5, ">=": 5, "<=>": 5,
+    "+": 6, "-": 6, "*": 7, "/": 7, "DIV": 7, "MOD": 7
+}
+_PREDICATE_PRECEDENCE = 5
+_ATOM_PRECEDENCE = 9
+
+
+def _precedence(node: Any) -> int:
+    if isinstance(node, Binary):
+        return _PRECEDENCE[node.op]
+    if isinstance(node, Unary):
+        return _PRECEDENCE["NOT"] if node.op == "NOT" else 8
+    if isinstance(node, (Between, InList, InSubquery, Like, IsTest)):
+        return _PREDICATE_PRECEDENCE
+    return _ATOM_PRECEDENCE
+
+
+def _render_operand(node: Any, minimum: int) -> str:
+    text = render(node)
+    return f"({text})" if _precedence(node) < minimum else text
+
+
+def _render_list(nodes: Any) -> str:
+    return ", ".join(render(node) for node in nodes)
+
+
+def _render_order(items: Tuple[OrderItem, ...]) -> str:
+    return ", ".join(render(item.expr) + (" DESC" if item.descending else "") for item in items)
+
+
+def _render_limit(limit: Limit) -> str:
+    count = render(limit.count) if isinstance(limit.count, Placeholder) else limit.count
+    if isinstance(limit.offset, Placeholder) or limit.offset:
+        offset = render(limit.offset) if isinstance(limit.offset, Placeholder) else limit.offset
+        return f"LIMIT {offset}, {count}"
+    return f"LIMIT {count}"
+
+
+def render(node: Any) -> str:
+    """将AST节点输出为规范化SQL"""
+    if isinstance(node, Literal):
+        if node.kind == "string":
+            return "'" + escape_string(node.value) + "'"
+        return node.value
+    if isinstance(node, Placeholder):
+        return "%s"
+    if isinstance(node, Column):
+        name = quote_identifier(node.name)
+        return f"{quote_identifier(node.table)}.{name}" if node.table else name
+    if isinstance(node, Star):
+        return f"{quote_identifier(node.table)}.*" if node.table else "*"
+    if isinstance(node, Function):
+        if node.name in _NILADIC_FUNCTIONS and not node.args:
+            return node.name
+        if node.star:
+            return f"{node.name}(*)"
+        args = _render_list(node.args)
+        if node.separator is not None:
+            args += " SEPARATOR '" + escape_string(node.separator) + "'"
+        return f"{node.name}({'DISTINCT ' if node.distinct else ''}{args})"
+    if isinstance(node, Cast):
+        return f"CAST({render(node.expr)} AS {node.type_name})"
+    if isinstance(node, Interval):
+        return f"INTERVAL {_render_operand(node.expr, 6)} {node.unit}"
+    if isinstance(node, Unary):
+        if node.op == "NOT":
+            return f"NOT {_render_operand(node.operand, _PRECEDENCE['NOT'])}"
+        return f"-{_render_operand(node.operand, 8)}"
+    if isinstance(node, Binary):
+        precedence = _PRECEDENCE[node.op]
+        # 左结合：右操作数同级时也需要括号
+        return (
+            f"{_render_operand(node.left, precedence)} {node.op} "
+            f"{_render_operand(node.right, precedence + 1)}"
+        )
+    if isinstance(node, Between):
+        return (
+            f"{_render_operand(node.expr, 6)} {'NOT ' if node.negated else ''}BETWEEN "
+            f"{_render_operand(node.low, 6)} AND {_render_operand(node.high, 6)}"
+        )
+    if isinstance(node, InList):
+        return f"{_render_operand(node.expr, 6)} {'NOT ' if node.negated else ''}IN ({_render_list(node.items)})"
+    if isinstance(node, InSubquery):
+        return f"{_render_operand(node.expr, 6)} {'NOT ' if node.negated else ''}IN ({render(node.query)})"
+    if isinstance(node, Like):
+        text = f"{_render_operand(node.expr, 6)} {'NOT ' if node.negated else ''}{node.op} {_render_operand(node.pattern, 6)}"
+        if node.escape is not None:
+            text += f" ESCAPE {render(node.escape)}"
+        return text
+    if isinstance(node, IsTest):
+        return f"{_render_operand(node.expr, 6)} IS {'NOT ' if node.negated else ''}{node.value}"
+    if isinstance(node, Exists):
+        return f"EXISTS ({render(node.query)})"
+    if isinstance(node, Subquery):
+        return f"({render(node.query)})"
+    if isinstance(node, Case):
+        parts = ["CASE"]
+        if node.operand is not None:
+            parts.append(render(node.operand))
+        for condition, result in node.whens:
+            parts.append(f"WHEN {render(condition)} THEN {render(result)}")
+        if node.default is not None:
+            parts.append(f"ELSE {render(node.default)}")
+        parts.append("END")
+        return " ".join(parts)
+    if isinstance(node, SelectItem):
+        text = render(node.expr)
+        return f"{text} AS {quote_identifier(node.alias)}" if node.alias else text
+    if isinstance(node, TableRef):
+        name = quote_identifier(node.name)
+        return f"{name} AS {quote_identifier(node.alias)}" if node.alias else name
+    if isinstance(node, DerivedTable):
+        return f"({render(node.query)}) AS {quote_identifier(node.alias)}"
+    if isinstance(node, Join):
+        text = f"{node.kind} {render(node.source)}"
+        if node.condition is not None:
+            text += f" ON {render(node.condition)}"
+        elif node.using:
+            text += f" USING ({', '.join(quote_identifier(name) for name in node.using)})"
+        return text
+    if isinstance(node, Select):
+        parts = ["SELECT"]
+        if node.distinct:
+            parts.append("DISTINCT")
+        parts.append(_render_list(node.items))
+        if node.source is not None:
+            parts.append(f"FROM {render(node.source)}")
+            parts.extend(render(join) for join in node.joins)
+        if node.where is not None:
+            parts.append(f"WHERE {render(node.where)}")
+        if node.group_by:
+            parts.append(f"GROUP BY {_render_list(node.group_by)}")
+            if node.rollup:
+                parts.append("WITH ROLLUP")
+        if node.having is not None:
+            parts.append(f"HAVING {render(node.having)}")
+        if node.order_by:
+            parts.append(f"ORDER BY {_render_order(node.order_by)}")
+        if node.limit is not None:
+            parts.append(_render_limit(node.limit))
+        return " ".join(parts)
+    if isinstance(node, Union_):
+        parts = []
+        for index, select in enumerate(node.selects):
+            if index:
+                parts.append("UNION ALL" if node.all_flags[index - 1] else "UNION")
+            text = render(select)
+            parts.append(f"({text})" if select.order_by or select.limit else text)
+        if node.order_by:
+            parts.append(f"ORDER BY {_render_order(node.order_by)}")
+        if node.limit is not None:
+            parts.append(_render_limit(node.limit))
+        return " ".join(parts)
+    raise TypeError(f"无法输出的节点: {type(node).__name__}")
+
+
+# ---------------------------------------------------------------------------
+# 分析与校验
+# ---------------------------------------------------------------------------
+
+def iter_nodes(node: Any) -> Iterator[Any]:
+    """深度优先遍历节点（含子查询）"""
+    yield node
+    if isinstance(node, (tuple, list)):
+        for child in node:
+            yield from iter_nodes(child)
+        return
+    if not hasattr(node, "__dataclass_fields__"):
+        return
+    for name in node.__dataclass_fields__:
+        value = getattr(node, name)
+        if value is None or isinstance(value, (str, bool, int)):
+            continue
+        yield from iter_nodes(value)
+
+
+def _contains_aggregate(node: Any) -> bool:
+    """表达式中是否含聚合函数（不进入子查询）"""
+    if isinstance(node, Function) and node.name in AGGREGATE_FUNCTIONS:
+        return True
+    if isinstance(node, (Select, Union_, Subquery, Exists, InSubquery)):
+        if isinstance(node, InSubquery):
+            return _contains_aggregate(node.expr)
+        return False
+    if isinstance(node, (tuple, list)):
+        return any(_contains_aggregate(child) for child in node)
+    if hasattr(node, "__dataclass_fields__"):
+        return any(
+            _contains_aggregate(getattr(node, name))
+            for name in node.__dataclass_fields__
+            if not isinstance(getattr(node, name), (str, bool, int, type(None)))
+        )
+    return False
+
+
+class _Scope:
+    """字段解析作用域"""
+
+    def __init__(self, parent: Optional["_Scope"] = None):
+        self.parent = parent
+        self.sources: Dict[str, Optional[FrozenSet[str]]] = {}   # None表示列未知(任意)
+        self.aliases: Set[str] = set()
+
+    def resolve(self, column: Column) -> bool:
+        name = column.name.lower()
+        scope: Optional[_Scope] = self
+        while scope is not None:
+            if column.table is not None:
+                if column.table in scope.sources:
+                    columns = scope.sources[column.table]
+                    return columns is None or name in columns
+            else:
+                if name in scope.aliases:
+                    return True
+                if any(columns is None or name in columns for columns in scope.sources.values()):
+                    return True
+            scope = scope.parent
+        return False
+
+    def has_source(self, table: str) -> bool:
+        scope: Optional[_Scope] = self
+        while scope is not None:
+            if table in scope.sources:
+                return True
+            scope = scope.parent
+        return False
+
+
+class _SchemaChecker:
+    """按表结构白名单校验AST"""
+
+    def __init__(self, schema: Dict[str, FrozenSet[str]], functions: FrozenSet[str]):
+        self.schema = schema
+        self.functions = functions
+        self.tables: Set[str] = set()
+        self.columns: Set[str] = set()
+
+    def query(self, node: Query, parent: Optional[_Scope]) -> Optional[FrozenSet[str]]:
+        """校验查询并返回其输出列（含*且来源未知时返回None）"""
+        if isinstance(node, Union_):
+            outputs = [self.select(select, parent) for select in node.selects]
+            scope = _Scope(parent)
+            scope.sources["_union"] = outputs[0]
+            for item in node.order_by:
+                self.expression(item.expr, scope)
+            return outputs[0]
+        return self.select(node, parent)
+
+    def source(self, node: Any, scope: _Scope) -> None:
+        if isinstance(node, TableRef):
+            table = node.name.lower()
+            if table not in self.schema:
+                raise SQLValidationError(f"不允许访问的表: {node.name}")
+            self.tables.add(table)
+            scope.sources[node.alias or node.name] = self.schema[table]
+        else:
+            scope.sources[node.alias] = self.query(node.query, scope.parent)
+
+    def select(self, node: Select, parent: Optional[_Scope]) -> Optional[FrozenSet[str]]:
+        scope = _Scope(parent)
+        if node.source is not None:
+            self.source(node.source, scope)
+        for join in node.joins:
+            self.source(join.source, scope)
+            if join.condition is not None:
+                self.expression(join.condition, scope)
+            for name in join.using:
+                self.expression(Column(None, name), scope)
+
+        outputs: Set[str] = set()
+        unknown = False
+        for item in node.items:
+            if isinstance(item.expr, Star):
+                if item.expr.table is not None and item.expr.table not in scope.sources:
+                    raise SQLValidationError(f"未知的表或别名: {item.expr.table}")
+                sources = (
+                    [scope.sources[item.expr.table]] if item.expr.table else list(scope.sources.values())
+                )
+                for columns in sources:
+                    if columns is None:
+                        unknown = True
+                    else:
+                        outputs.update(columns)
+                continue
+            self.expression(item.expr, scope)
+            if item.alias:
+                outputs.add(item.alias.lower())
+            elif isinstance(item.expr, Column):
+                outputs.add(item.expr.name.lower())
+            else:
+                unknown = True
+
+        scope.aliases = {item.alias.lower() for item in node.items if item.alias}
+        for expr in (node.where, node.having):
+            if expr is not None:
+                self.expression(expr, scope)
+        for expr in node.group_by:
+            self.expression(expr, scope)
+        for item in node.order_by:
+            self.expression(item.expr, scope)
+
+        return None if unknown else frozenset(outputs)
+
+    def expression(self, node: Any, scope: _Scope) -> None:
+        if isinstance(node, Column):
+            if node.table is not None and not scope.has_source(node.table):
+                raise SQLValidationError(f"未知的表或别名: {node.table}")
+            if not scope.resolve(node):
+                raise SQLValidationError(f"未知字段: {render(node)}")
+            self.columns.add(node.name.lower())
+            return
+        if isinstance(node, Function) and node.name not in self.functions:
+            raise SQLValidationError(f"不允许调用的函数: {node.name}")
+        if isinstance(node, (Select, Union_)):
+            self.query(node, scope)
+            return
+        if isinstance(node, (tuple, list)):
+            for child in node:
+                self.expression(child, scope)
+            return
+        if hasattr(node, "__dataclass_fields__"):
+            for name in node.__dataclass_fields__:
+                value = getattr(node, name)
+                if value is not None and not isinstance(value, (str, bool, int)):
+                    self.expression(value, scope)
+
+
+@dataclass(frozen=True)
+class ParsedSQL:
+    """解析结果"""
+    ast: Query
+    normalized_sql: str
+    fingerprint: str
+    aggregate: bool
+    group_by: Tuple[str, ...]
+    group_cardinality: Optional[int]    # GROUP BY分组数上限估计，无法估计时为None
+    single_row: bool
+    has_placeholders: bool
+
+    @property
+    def limit(self) -> Optional[Limit]:
+        return self.ast.limit
+
+    def with_limit(self, max_rows: int) -> str:
+        """
+        注入或收紧最外层LIMIT后输出SQL
+
+        不带GROUP BY的纯聚合查询只返回一行；分组数上限估计不超过max_rows的GROUP BY查询
+        结果规模已有界，二者均无需注入LIMIT（已有LIMIT时按原样收紧）
+
+        Args:
+            max_rows: 最大行数
+
+        Returns:
+            str: 规范化SQL
+        """
+        if self.single_row:
+            return self.normalized_sql
+        limit = self.ast.limit
+        if limit is None and self.group_cardinality is not None and self.group_cardinality <= max_rows:
+            return self.normalized_sql
+        if limit is not None and isinstance(limit.count, int) and limit.count <= max_rows:
+            return self.normalized_sql
+        new_limit = Limit(count=max_rows, offset=limit.offset if limit else 0)
+        return render(replace(self.ast, limit=new_limit))
+
+
+def _group_cardinality(select: Select) -> Optional[int]:
+    """按低基数字段估算GROUP BY分组数上限（各字段取值数之积），含其他表达式或ROLLUP时返回None"""
+    if (
+        not select.group_by or select.rollup or select.joins
+        or not isinstance(select.source, TableRef) or select.source.name.lower() != "pipeline_info"
+    ):
+        return None
+    cardinality = 1
+    for expr in select.group_by:
+        if not isinstance(expr, Column) or expr.name.lower() not in GROUP_CARDINALITY:
+            return None
+        # 包含NULL分组
+        cardinality *= GROUP_CARDINALITY[expr.name.lower()] + 1
+    return cardinality
+
+
+def _analyze(ast: Query) -> ParsedSQL:
+    normalized = render(ast)
+    aggregate = False
+    group_by: Tuple[str, ...] = ()
+    group_cardinality = None
+    single_row = False
+    if isinstance(ast, Select):
+        aggregate = _contains_aggregate(ast.items) or ast.having is not None and _contains_aggregate(ast.having)
+        group_by = tuple(render(expr) for expr in ast.group_by)
+        group_cardinality = _group_cardinality(ast)
+        single_row = aggregate and not ast.group_by
+    return ParsedSQL(
+        ast=ast,
+        normalized_sql=normalized,
+        fingerprint=hashlib.sha1(normalized.encode("utf-8")).hexdigest(),
+        aggregate=aggregate,
+        group_by=group_by,
+        group_cardinality=group_cardinality,
+        single_row=single_row,
+        has_placeholders=any(isinstance(node, Placeholder) for node in iter_nodes(ast))
+    )
+
+
+# 解析缓存：键为SQL原文，值为解析结果或解析错误
+_parse_cache = LRUCache(maxsize=config.SQL_PARSE_CACHE_SIZE)
+
+
+def parse_sql(sql: str) -> ParsedSQL:
+    """
+    解析SQL（带缓存）
+
+    Args:
+        sql: SQL语句
+
+    Returns:
+        ParsedSQL: 解析结果
+
+    Raises:
+        SQLValidationError: 不是单条SELECT语句或存在语法错误
+    """
+    cached = _parse_cache.get(sql)
+    if cached is None:
+        try:
+            cached = _analyze(_Parser(tokenize(sql)).statement())
+        except SQLValidationError as e:
+            cached = e
+        except RecursionError:
+            cached = SQLValidationError("SQL嵌套层级过深")
+        _parse_cache.set(sql, cached)
+    if isinstance(cached, SQLValidationError):
+        raise cached
+    return cached
+
+
+def validate_sql(
+    sql: str,
+    schema: Optional[Dict[str, FrozenSet[str]]] = None,
+    functions: Optional[FrozenSet[str]] = None
+) -> ParsedSQL:
+    """
+    解析并按白名单校验SQL
+
+    Args:
+        sql: SQL语句
+        schema: 允许访问的表及其字段，默认为pipeline_info
+        functions: 允许调用的函数，默认为ALLOWED_FUNCTIONS
+
+    Returns:
+        ParsedSQL: 解析结果
+
+    Raises:
+        SQLValidationError: 不符合安全要求
+    """
+    parsed = parse_sql(sql)
+    if parsed.has_placeholders:
+        raise SQLValidationError("SQL中不允许包含参数占位符")
+    _SchemaChecker(schema or SCHEMA, functions or ALLOWED_FUNCTIONS).query(parsed.ast, None)
+    return parsed
+
+
+def get_parse_cache_stats() -> Dict[str, Any]:
+    """获取解析缓存统计"""
+    return _parse_cache.get_stats()
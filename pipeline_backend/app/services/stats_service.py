@@ -0,0 +1,111 @@
+"""
+统计快照服务模块
+在后台定期刷新数据库统计信息，接口直接返回内存中的快照
+"""
+
+import asyncio
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Any, Optional, Tuple
+from .database_service import DatabaseService
+from ..models.schemas import DatabaseStats
+from config import config
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class StatsService:
+    """统计快照服务类"""
+
+    def __init__(self, db_service: DatabaseService):
+        """
+        初始化统计快照服务
+
+        Args:
+            db_service: 数据库服务
+        """
+        self.db_service = db_service
+        self._snapshot: Optional[DatabaseStats] = None
+        self._snapshot_version: Optional[Tuple[Any, ...]] = None
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def refresh(self) -> DatabaseStats:
+        """
+        重新计算统计快照
+
+        Returns:
+            DatabaseStats: 新的统计快照
+        """
+        with self._lock:
+            version = self.db_service.get_data_version()
+            start_time = time.time()
+            stats = self.db_service.get_database_stats()
+            stats.refreshed_at = datetime.now()
+            self._snapshot = stats
+            self._snapshot_version = version
+            self._refreshed_at = time.monotonic()
+            logger.info(f"统计快照已刷新，耗时 {time.time() - start_time:.3f} 秒")
+            return stats
+
+    def refresh_if_needed(self) -> bool:
+        """
+        数据版本变化或快照超过最大年龄时刷新
+
+        Returns:
+            bool: 是否执行了刷新
+        """
+        if self._snapshot is not None:
+            version = self.db_service.get_data_version()
+            age = time.monotonic() - self._refreshed_at
+            if (
+                version is not None
+                and version == self._snapshot_version
+                and age < config.STATS_MAX_AGE
+            ):
+                return False
+        self.refresh()
+        return True
+
+    def get_snapshot(self) -> DatabaseStats:
+        """
+        获取统计快照（尚无快照时同步计算一次）
+
+        Returns:
+            DatabaseStats: 带快照年龄的统计信息
+        """
+        if self._snapshot is None:
+            self.refresh()
+
+        age = round(time.monotonic() - self._refreshed_at, 3)
+        return self._snapshot.model_copy(update={"snapshot_age": age})
+
+    async def _run(self) -> None:
+        """后台刷新循环"""
+        while True:
+            try:
+                await self.db_service.run_in_executor(self.refresh_if_needed)
+            except Exception as e:
+                logger.error(f"统计快照刷新失败: {e}")
+            await asyncio.sleep(config.STATS_REFRESH_INTERVAL)
+
+    def start(self) -> None:
+        """启动后台刷新任务（需在事件循环中调用）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info("统计快照后台刷新任务已启动")
+
+    async def stop(self) -> None:
+        """停止后台刷新任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
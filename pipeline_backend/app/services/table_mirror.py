@@ -0,0 +1,212 @@
+"""
+表镜像基础模块
+聚合立方体与列式副本共用的pipeline_info内存镜像维护逻辑：服务端游标分批加载、
+按id/updated_at水位增量同步(检测到删除时全量重建)与后台刷新循环，以及按表排序规则折叠取值
+"""
+
+import asyncio
+import logging
+import pymysql
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from .database_service import DatabaseService
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+def fold_collation(value: Any) -> Any:
+    """按表排序规则(utf8mb4_unicode_ci)的近似：忽略大小写与尾部空格"""
+    return value.lower().rstrip(" ") if isinstance(value, str) else value
+
+
+class TableMirror:
+    """
+    pipeline_info内存镜像的基类
+
+    子类实现 _select_sql(读取SQL，首列为id、末列为updated_at)与 _apply(写入一批行)，
+    按需扩展 _reset 与变化后的回调；基类维护加载、水位、版本与后台刷新任务
+    """
+
+    label = "表镜像"
+
+    def __init__(self, db_service: DatabaseService):
+        """
+        初始化表镜像
+
+        Args:
+            db_service: 数据库服务
+        """
+        self.db_service = db_service
+        self._lock = threading.RLock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.version: Optional[Tuple[Any, ...]] = None
+        self.disabled_reason: Optional[str] = None
+        self.stats: Dict[str, int] = {"builds": 0, "deltas": 0, "delta_rows": 0}
+        self.row_count = 0
+        self.max_id = 0
+        self.max_updated_at: Any = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.version is not None and self.disabled_reason is None
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用后台维护"""
+        return True
+
+    @property
+    def refresh_interval(self) -> float:
+        """后台刷新间隔(秒)"""
+        raise NotImplementedError
+
+    # 子类扩展 -------------------------------------------------------------
+
+    def _select_sql(self, where: str) -> str:
+        """读取行的SQL"""
+        raise NotImplementedError
+
+    def _apply(self, rows: List[Tuple[Any, ...]]) -> None:
+        """写入一批行（超出容量时抛出OverflowError）"""
+        raise NotImplementedError
+
+    def _reset(self) -> None:
+        """清空镜像与水位"""
+        self.row_count = 0
+        self.max_id = 0
+        self.max_updated_at = None
+
+    def _build_summary(self) -> str:
+        """重建完成日志中的附加信息"""
+        return ""
+
+    def _on_rebuilt(self) -> None:
+        """全量重建完成后的回调"""
+
+    def _on_delta(self) -> None:
+        """增量同步写入后的回调"""
+
+    # 维护 ---------------------------------------------------------------
+
+    def _load(self, where: str = "", params: Optional[Tuple[Any, ...]] = None) -> int:
+        """读取行并写入镜像，推进id/updated_at水位，返回读取行数"""
+        loaded = 0
+        # 服务端游标分批读取；未读完即退出时连接不可复用
+        connection = self.db_service.pool.acquire()
+        completed = False
+        try:
+            with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute(self._select_sql(where), params)
+                while True:
+                    rows = cursor.fetchmany(config.EXPORT_BATCH_SIZE)
+                    if not rows:
+                        break
+                    self._apply(rows)
+                    self.max_id = max(self.max_id, max(row[0] for row in rows))
+                    updated = [row[-1] for row in rows if row[-1] is not None]
+                    if updated:
+                        latest = max(updated)
+                        if self.max_updated_at is None or latest > self.max_updated_at:
+                            self.max_updated_at = latest
+                    loaded += len(rows)
+            completed = True
+        finally:
+            self.db_service.pool.release(connection, invalidate=not completed)
+        return loaded
+
+    def rebuild(self) -> None:
+        """全量重建镜像"""
+        with self._lock:
+            start_time = time.time()
+            version = self.db_service.get_data_version(force=True)
+            # 先失效再清空：加载中途失败时镜像保持未就绪，由下次刷新重新全量构建
+            self.version = None
+            self._reset()
+            try:
+                loaded = self._load()
+            except OverflowError as e:
+                self._reset()
+                self.disabled_reason = str(e)
+                logger.warning(f"{self.label}已停用: {e}")
+                return
+            except Exception:
+                self._reset()
+                raise
+            self.disabled_reason = None
+            self.version = version
+            self.stats["builds"] += 1
+            self._on_rebuilt()
+            logger.info(
+                f"{self.label}已重建: {loaded} 行{self._build_summary()}，耗时 {time.time() - start_time:.3f} 秒"
+            )
+
+    def refresh(self) -> bool:
+        """
+        数据版本变化时增量同步
+
+        读取 id 大于已知最大id 或 updated_at 不早于已知最大更新时间 的行；
+        同步后行数与COUNT(*)不一致(存在删除)时全量重建
+
+        Returns:
+            bool: 是否有变化
+        """
+        with self._lock:
+            if self.version is None:
+                if self.disabled_reason is None:
+                    self.rebuild()
+                    return True
+                return False
+
+            version = self.db_service.get_data_version(force=True)
+            if version is None or version == self.version:
+                return False
+
+            if version[0] < self.row_count:
+                self.rebuild()
+                return True
+
+            if self.max_updated_at is not None:
+                loaded = self._load(" WHERE id > %s OR updated_at >= %s", (self.max_id, self.max_updated_at))
+            else:
+                loaded = self._load(" WHERE id > %s", (self.max_id,))
+            self._on_delta()
+            self.stats["deltas"] += 1
+            self.stats["delta_rows"] += loaded
+
+            if self.row_count != version[0]:
+                logger.info(f"{self.label}行数与数据版本不一致(存在删除或并发写入)，全量重建")
+                self.rebuild()
+                return True
+            self.version = version
+            logger.info(f"{self.label}已增量同步 {loaded} 行")
+            return True
+
+    # 后台刷新 -------------------------------------------------------------
+
+    async def _run(self) -> None:
+        """后台刷新循环"""
+        while True:
+            try:
+                await self.db_service.run_in_executor(self.refresh)
+            except Exception as e:
+                logger.error(f"{self.label}刷新失败: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        """启动后台构建与刷新任务（需在事件循环中调用）"""
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"{self.label}后台刷新任务已启动")
+
+    async def stop(self) -> None:
+        """停止后台刷新任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,273 @@
+"""
+规则模板引擎模块
+识别常见问题形态（按省份/城市/管道类型/灾害类型/敷设方式/地质统计或筛选，可带建成年份范围），
+在调用大模型之前以确定性规则生成参数化SQL
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from pymysql.converters import escape_item
+from .entity_index import ENTITY_COLUMNS, EntityIndex
+from .question_normalizer import normalize_question
+
+# 分组维度关键词（按长度降序匹配）
+_DIMENSION_WORDS = [
+    ("管道类型", ["pipeline_type"]), ("管线类型", ["pipeline_type"]),
+    ("灾害类型", ["disaster_type"]), ("敷设方式", ["laying_method"]),
+    ("地质特性", ["geological_feature"]), ("地质条件", ["geological_feature"]),
+    ("建成年份", ["build_year"]), ("建设年份", ["build_year"]),
+    ("省市", ["province", "city"]), ("省份", ["province"]), ("城市", ["city"]),
+    ("类型", ["pipeline_type"]), ("灾害", ["disaster_type"]), ("地质", ["geological_feature"]),
+    ("年份", ["build_year"]), ("省", ["province"]), ("市", ["city"]), ("年", ["build_year"])
+]
+_DIMENSION_ALTERNATION = "|".join(word for word, _ in _DIMENSION_WORDS)
+# "按省份"、"各城市"，以及 "管道类型分布" 形式
+_DIMENSION_PATTERN = re.compile(
+    r"(?:按照|按|各|每个|每|不同)(" + _DIMENSION_ALTERNATION + ")"
+    r"|(?:管道|管线)?(" + _DIMENSION_ALTERNATION + ")(?=分布|占比)"
+)
+# 紧随其后的并列维度，如 "按省份和管道类型"
+_DIMENSION_CHAIN = re.compile(r"(?:和|与|及|、)?(" + _DIMENSION_ALTERNATION + ")")
+_DIMENSION_MAP = dict(_DIMENSION_WORDS)
+
+# 建成年份范围
+_YEAR_BETWEEN = re.compile(r"((?:19|20)\d{2})年?(?:-|到|至)((?:19|20)\d{2})年?(?:之间|期间|间)?")
+_YEAR_AFTER = re.compile(r"((?:19|20)\d{2})年?(?:以后|之后|以来|后|起)")
+_YEAR_BEFORE = re.compile(r"((?:19|20)\d{2})年?(?:以前|之前|前)(?!后)")
+# "2000年前后"、"2000年左右" 等近似年份无法确定边界，交由大模型处理
+_YEAR_APPROXIMATE = re.compile(r"(?:19|20)\d{2}年?(?:前后|左右|上下)")
+_YEAR_RECENT = re.compile(r"(?:近|最近)(\d{1,2})年")
+_YEAR_EXACT = re.compile(r"((?:19|20)\d{2})年")
+
+# 紧邻实体/年份的否定与排除词：规则模板只能表达肯定条件，出现时交由大模型处理；
+# 否定词与实体之间允许夹一个动词，如 "未采用直埋"、"没有发生地震"
+_NEGATION_BEFORE = re.compile(
+    r"(?:不是|不在|不属于|不含|不包括|除了|除去|除|非|不|没有|没|无|未)"
+    r"(?:采用|使用|位于|属于|发生|经过|遭受|有|是|在)?$"
+)
+_NEGATION_WINDOW = 5
+_NEGATION_AFTER = re.compile(r"^(?:以外|之外|除外)")
+
+_COUNT_WORDS = ["数量", "多少", "总数", "总量", "统计", "个数", "计数", "几条", "几个", "分布", "占比"]
+_LIST_WORDS = ["有哪些", "哪些", "列出", "明细", "列表", "详情", "显示"]
+
+# 不影响语义的领域填充词
+_FILLER_WORDS = [
+    "建成的", "建设的", "建成", "建设", "修建", "管道", "管线", "地区", "区域", "条件", "情况",
+    "信息", "数据", "记录", "所有", "全部", "一共", "共有", "总共", "分别", "分组", "类型", "方式",
+    "地质", "灾害", "敷设", "采用", "使用", "位于", "属于", "有", "是", "在", "中", "下",
+    "和", "与", "及", "且", "或", "内", "里", "的", "了", "吗", "呢", "为", "多", "个"
+]
+# 紧跟在指定字之后时不计为已识别的填充词（"没有"中的"有"属于否定）
+_FILLER_EXCLUDED_AFTER = {"有": "没"}
+
+
+@dataclass
+class TemplateMatch:
+    """模板匹配结果"""
+    sql: str
+    template: str
+    params: Tuple[Any, ...]
+    confidence: float
+    intent: str
+    filters: Dict[str, Any] = field(default_factory=dict)
+    group_by: List[str] = field(default_factory=list)
+
+
+class TemplateEngine:
+    """规则模板引擎类"""
+
+    def __init__(self, entity_index: EntityIndex):
+        """
+        初始化规则模板引擎
+
+        Args:
+            entity_index: 实体词典索引（提供字段真实取值）
+        """
+        self.entity_index = entity_index
+
+    def _find_entities(self, text: str) -> Tuple[Dict[str, List[str]], List[Tuple[int, int]]]:
+        """在归一化问题中查找实体，返回各字段取值与命中区间"""
+        found: Dict[str, List[str]] = {}
+        spans: List[Tuple[int, int]] = []
+        for entity in self.entity_index.find(text):
+            spans.append((entity.start, entity.end))
+            values = found.setdefault(entity.column, [])
+            if entity.value not in values:
+                values.append(entity.value)
+        return found, spans
+
+    @staticmethod
+    def _find_year_filter(text: str) -> Tuple[Optional[Tuple[str, Tuple[int, ...]]], List[Tuple[int, int]]]:
+        """识别建成年份范围，返回(条件模板, 参数)与命中区间"""
+        match = _YEAR_BETWEEN.search(text)
+        if match:
+            low, high = sorted((int(match.group(1)), int(match.group(2))))
+            return ("build_year BETWEEN %s AND %s", (low, high)), [match.span()]
+
+        match = _YEAR_RECENT.search(text)
+        if match:
+            since = datetime.now().year - int(match.group(1))
+            return ("build_year >= %s", (since,)), [match.span()]
+
+        match = _YEAR_AFTER.search(text)
+        if match:
+            return ("build_year >= %s", (int(match.group(1)),)), [match.span()]
+
+        match = _YEAR_BEFORE.search(text)
+        if match:
+            return ("build_year < %s", (int(match.group(1)),)), [match.span()]
+
+        match = _YEAR_EXACT.search(text)
+        if match:
+            return ("build_year = %s", (int(match.group(1)),)), [match.span()]
+
+        return None, []
+
+    @staticmethod
+    def _is_negated(text: str, spans: List[Tuple[int, int]]) -> bool:
+        """命中区间前后是否紧邻否定或排除词"""
+        return any(
+            _NEGATION_BEFORE.search(text, max(0, start - _NEGATION_WINDOW), start)
+            or _NEGATION_AFTER.match(text[end:end + 2])
+            for start, end in spans
+        )
+
+    @staticmethod
+    def _mark(taken: List[bool], spans: List[Tuple[int, int]]) -> None:
+        for start, end in spans:
+            for index in range(start, end):
+                taken[index] = True
+
+    @staticmethod
+    def _mark_words(
+        text: str,
+        taken: List[bool],
+        words: List[str],
+        excluded_after: Optional[Dict[str, str]] = None
+    ) -> bool:
+        """标记关键词出现的位置，返回是否出现过；excluded_after 中的词紧跟指定字时跳过"""
+        excluded_after = excluded_after or {}
+        seen = False
+        for word in words:
+            start = text.find(word)
+            while start != -1:
+                end = start + len(word)
+                preceding = excluded_after.get(word)
+                if preceding is not None and text[max(0, start - len(preceding)):start] == preceding:
+                    start = text.find(word, end)
+                    continue
+                if not any(taken[start:end]):
+                    seen = True
+                    for index in range(start, end):
+                        taken[index] = True
+                start = text.find(word, end)
+        return seen
+
+    def match(self, question: str) -> Optional[TemplateMatch]:
+        """
+        尝试用规则模板回答问题
+
+        置信度为问题中被识别部分(实体、维度、年份、意图词与填充词)所占比例；
+        实体或年份紧邻否定/排除词(不是、非、没有、无、未、除了、以外等)或年份为近似表述(前后、左右)时不作匹配
+
+        Args:
+            question: 用户问题
+
+        Returns:
+            Optional[TemplateMatch]: 匹配结果，无法识别时返回None
+        """
+        if not self.entity_index.is_loaded:
+            return None
+
+        text = normalize_question(question)
+        if not text or _YEAR_APPROXIMATE.search(text):
+            return None
+        taken = [False] * len(text)
+
+        # 1. 建成年份范围（先于实体识别，避免年份数字被误判）
+        year_filter, year_spans = self._find_year_filter(text)
+        self._mark(taken, year_spans)
+
+        # 2. 分组维度
+        group_by: List[str] = []
+        for dimension in _DIMENSION_PATTERN.finditer(text):
+            if any(taken[dimension.start():dimension.end()]):
+                continue
+            words = [dimension.group(1) or dimension.group(2)]
+            end = dimension.end()
+            chained = _DIMENSION_CHAIN.match(text, end)
+            while chained and not any(taken[chained.start():chained.end()]):
+                words.append(chained.group(1))
+                end = chained.end()
+                chained = _DIMENSION_CHAIN.match(text, end)
+
+            for word in words:
+                for column in _DIMENSION_MAP[word]:
+                    if column not in group_by:
+                        group_by.append(column)
+            self._mark(taken, [(dimension.start(), end)])
+
+        # 3. 实体（仅在未被占用的位置上识别）
+        masked = "".join("\0" if used else char for char, used in zip(text, taken))
+        entities, entity_spans = self._find_entities(masked)
+        if self._is_negated(text, entity_spans + year_spans):
+            return None
+        self._mark(taken, entity_spans)
+
+        # 4. 意图
+        is_count = self._mark_words(text, taken, _COUNT_WORDS)
+        is_list = self._mark_words(text, taken, _LIST_WORDS)
+        self._mark_words(text, taken, _FILLER_WORDS, _FILLER_EXCLUDED_AFTER)
+
+        if not (entities or group_by or year_filter or is_count or is_list):
+            return None
+        # 分组或出现统计词时为统计查询，否则为明细查询
+        intent = "count" if group_by or is_count else "list"
+
+        confidence = round(sum(taken) / len(text), 4)
+
+        # 5. 生成参数化SQL
+        conditions: List[str] = []
+        params: List[Any] = []
+        filters: Dict[str, Any] = {}
+        for column in ENTITY_COLUMNS:
+            values = entities.get(column)
+            if not values or column in group_by and len(values) > 1:
+                continue
+            filters[column] = values
+            if len(values) == 1:
+                conditions.append(f"{column} = %s")
+            else:
+                conditions.append(f"{column} IN ({', '.join(['%s'] * len(values))})")
+            params.extend(values)
+        if year_filter is not None:
+            conditions.append(year_filter[0])
+            params.extend(year_filter[1])
+            filters["build_year"] = year_filter[1]
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        if intent == "count" and group_by:
+            columns = ", ".join(group_by)
+            order = "build_year" if group_by == ["build_year"] else "count DESC"
+            template = (
+                f"SELECT {columns}, COUNT(*) AS count FROM pipeline_info{where} "
+                f"GROUP BY {columns} ORDER BY {order}"
+            )
+        elif intent == "count":
+            template = f"SELECT COUNT(*) AS count FROM pipeline_info{where}"
+        else:
+            template = f"SELECT * FROM pipeline_info{where}"
+
+        sql = template % tuple(escape_item(param, "utf8mb4") for param in params)
+        return TemplateMatch(
+            sql=sql,
+            template=template,
+            params=tuple(params),
+            confidence=confidence,
+            intent=intent,
+            filters=filters,
+            group_by=group_by
+        )
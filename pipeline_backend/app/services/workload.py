@@ -0,0 +1,394 @@
+"""
+查询负载记录模块
+从每条实际执行的SQL中提取谓词、GROUP BY与ORDER BY涉及的字段集合及耗时，
+按去除字面量的查询摘要汇总，并可追加写入JSONL文件供索引建议工具(index_advisor.py)离线分析与回放；
+超过阈值的慢查询写入轮转的慢查询日志
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, List, Optional, Tuple
+from .sql_parser import (
+    SCHEMA, Between, Binary, Column, DerivedTable, InList, IsTest, Like, Literal,
+    ParsedSQL, Select, SQLValidationError, Star, TableRef, Union_, iter_nodes, parse_sql
+)
+from .sql_fingerprint import query_digest
+from config import config
+
+logger = logging.getLogger(__name__)
+
+TABLE = "pipeline_info"
+_RANGE_OPERATORS = {"<", ">", "<=", ">="}
+
+
+@dataclass(frozen=True)
+class AccessPattern:
+    """单条查询对pipeline_info的访问方式"""
+    equality: Tuple[str, ...]           # 等值/IN/IS NULL 条件字段
+    ranges: Tuple[str, ...]             # 范围/前缀LIKE 条件字段
+    group_by: Tuple[str, ...]
+    order_by: Tuple[str, ...]
+    columns: Optional[Tuple[str, ...]]  # 引用的全部字段，SELECT * 时为None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AccessPattern":
+        columns = data.get("columns")
+        return cls(
+            equality=tuple(data.get("equality", ())),
+            ranges=tuple(data.get("ranges", ())),
+            group_by=tuple(data.get("group_by", ())),
+            order_by=tuple(data.get("order_by", ())),
+            columns=tuple(columns) if columns is not None else None
+        )
+
+
+def _table_column(node: Any, aliases: set) -> Optional[str]:
+    """节点为pipeline_info字段时返回小写字段名"""
+    if not isinstance(node, Column):
+        return None
+    if node.table is not None and node.table not in aliases:
+        return None
+    name = node.name.lower()
+    return name if name in SCHEMA[TABLE] else None
+
+
+def _is_constant(node: Any) -> bool:
+    return not any(isinstance(child, Column) for child in iter_nodes(node))
+
+
+def _conjuncts(node: Any) -> List[Any]:
+    if isinstance(node, Binary) and node.op == "AND":
+        return _conjuncts(node.left) + _conjuncts(node.right)
+    return [node] if node is not None else []
+
+
+def _find_table_select(query: Any) -> Tuple[Optional[Select], List[Select]]:
+    """
+    查找直接读取pipeline_info的SELECT
+
+    Returns:
+        Tuple[Optional[Select], List[Select]]: 读取基表的SELECT与其外层的派生表查询(由内到外)
+    """
+    if isinstance(query, Union_):
+        return _find_table_select(query.selects[0])
+    if not isinstance(query, Select) or query.source is None:
+        return None, []
+    if isinstance(query.source, TableRef) and query.source.name.lower() == TABLE:
+        return query, []
+    if isinstance(query.source, DerivedTable):
+        inner, outers = _find_table_select(query.source.query)
+        if inner is not None:
+            return inner, outers + [query]
+    return None, []
+
+
+def _unique(names: List[str]) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(name for name in names if name))
+
+
+def extract_access_pattern(parsed: ParsedSQL) -> Optional[AccessPattern]:
+    """
+    提取查询对pipeline_info的访问方式
+
+    派生表包装的查询(如键集分页)以外层对派生表字段的条件与排序补充内层模式
+
+    Args:
+        parsed: 解析结果
+
+    Returns:
+        Optional[AccessPattern]: 未读取pipeline_info时返回None
+    """
+    select, outers = _find_table_select(parsed.ast)
+    if select is None:
+        return None
+
+    aliases = {select.source.alias or select.source.name}
+    layers = [(select, aliases)] + [(outer, {outer.source.alias}) for outer in outers]
+
+    equality: List[str] = []
+    ranges: List[str] = []
+    order_by: List[str] = []
+    for layer, layer_aliases in layers:
+        for condition in _conjuncts(layer.where):
+            if isinstance(condition, Binary) and condition.op in {"=", "<=>"} | _RANGE_OPERATORS:
+                for column_node, other in ((condition.left, condition.right), (condition.right, condition.left)):
+                    column = _table_column(column_node, layer_aliases)
+                    if column and _is_constant(other):
+                        (equality if condition.op in ("=", "<=>") else ranges).append(column)
+                        break
+            elif isinstance(condition, (InList, IsTest)) and not condition.negated:
+                equality.append(_table_column(condition.expr, layer_aliases))
+            elif isinstance(condition, Between) and not condition.negated:
+                ranges.append(_table_column(condition.expr, layer_aliases))
+            elif isinstance(condition, Like) and not condition.negated and condition.op == "LIKE":
+                pattern = condition.pattern
+                # 只有前缀匹配能使用索引
+                if isinstance(pattern, Literal) and pattern.kind == "string" and pattern.value[:1] not in ("%", "_", ""):
+                    ranges.append(_table_column(condition.expr, layer_aliases))
+        order_by = [_table_column(item.expr, layer_aliases) for item in layer.order_by] or order_by
+
+    # GROUP BY 中的别名解析为对应的字段
+    item_aliases = {
+        item.alias.lower(): item.expr for item in select.items if item.alias
+    }
+    group_by = [
+        _table_column(item_aliases.get(expr.name.lower(), expr) if isinstance(expr, Column) else expr, aliases)
+        for expr in select.group_by
+    ]
+
+    columns: Optional[List[str]] = []
+    for node in iter_nodes((select.items, select.where, select.group_by, select.having, select.order_by)):
+        if isinstance(node, Star):
+            columns = None
+            break
+        column = _table_column(node, aliases)
+        if column:
+            columns.append(column)
+
+    equality_set = _unique(equality)
+    return AccessPattern(
+        equality=equality_set,
+        ranges=tuple(column for column in _unique(ranges) if column not in equality_set),
+        group_by=_unique(group_by),
+        order_by=_unique(order_by),
+        columns=tuple(sorted(set(columns))) if columns is not None else None
+    )
+
+
+def _open_slow_query_log(path: str) -> Tuple[Optional[logging.Logger], Optional[QueueListener]]:
+    """
+    创建慢查询日志：记录经队列交给后台线程写入轮转文件，执行线程不做文件IO
+
+    Returns:
+        Tuple: 慢查询日志记录器与后台写入线程，无法创建日志文件时均为None
+    """
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=config.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=config.SLOW_QUERY_LOG_BACKUP_COUNT,
+            encoding="utf-8",
+            delay=True
+        )
+    except OSError as e:
+        logger.warning(f"无法创建慢查询日志 {path}，不记录慢查询: {e}")
+        return None, None
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    # 独立的记录器，不受全局日志配置影响，也不向上传播
+    slow_logger = logging.Logger("slow_query")
+    slow_logger.propagate = False
+    slow_logger.addHandler(QueueHandler(records))
+    listener = QueueListener(records, handler)
+    listener.start()
+    return slow_logger, listener
+
+
+class WorkloadRecorder:
+    """
+    查询负载记录器
+
+    内存中按查询摘要(字面量替换为占位符)汇总执行次数、耗时分布、返回行数、失败次数与最近执行时间，
+    摘要数达到上限时淘汰最久未出现的摘要；配置了WORKLOAD_LOG_PATH时，每次执行追加一行JSON
+    (sql、参数、耗时、行数与访问方式)；耗时不低于SLOW_QUERY_THRESHOLD的执行(含超时被终止的)写入慢查询日志
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_fingerprints: Optional[int] = None,
+        slow_query_log_path: Optional[str] = None,
+        slow_query_threshold: Optional[float] = None
+    ):
+        self.path = config.WORKLOAD_LOG_PATH if path is None else path
+        self.max_fingerprints = max_fingerprints or config.WORKLOAD_MAX_FINGERPRINTS
+        # 按最近出现时间排序，最久未出现的在前
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._file = None
+        self.evicted = 0
+
+        self.slow_query_threshold = (
+            config.SLOW_QUERY_THRESHOLD if slow_query_threshold is None else slow_query_threshold
+        )
+        self.slow_query_log_path = (
+            config.SLOW_QUERY_LOG_PATH if slow_query_log_path is None else slow_query_log_path
+        )
+        self.slow_queries = 0
+        self._slow_logger: Optional[logging.Logger] = None
+        self._slow_listener: Optional[QueueListener] = None
+        if self.slow_query_threshold > 0 and self.slow_query_log_path:
+            self._slow_logger, self._slow_listener = _open_slow_query_log(self.slow_query_log_path)
+            if self._slow_logger is None:
+                self.slow_query_log_path = ""
+
+    def record(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]],
+        latency: float,
+        row_count: int,
+        error: Optional[str] = None
+    ) -> None:
+        """
+        记录一次数据库执行
+
+        Args:
+            sql: 执行的SQL
+            params: SQL参数
+            latency: 执行耗时(秒)，执行失败时为失败前的耗时
+            row_count: 返回行数(失败时为已读取的行数)
+            error: 执行失败(含超时被终止)时的错误信息
+        """
+        try:
+            parsed: Optional[ParsedSQL] = parse_sql(sql)
+        except SQLValidationError:
+            parsed = None
+        normalized_sql = parsed.normalized_sql if parsed is not None else sql
+        fingerprint, digest = query_digest(normalized_sql)
+        now = time.time()
+        slow = 0 < self.slow_query_threshold <= latency
+
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            pattern = None
+            if entry is not None:
+                pattern = entry["pattern"]
+            elif parsed is not None:
+                pattern = extract_access_pattern(parsed)
+            if entry is None:
+                while len(self._entries) >= self.max_fingerprints:
+                    self._entries.popitem(last=False)
+                    self.evicted += 1
+                entry = self._entries[fingerprint] = {
+                    "digest": digest,
+                    "sql": normalized_sql,
+                    "pattern": pattern,
+                    "count": 0,
+                    "total_latency": 0.0,
+                    "min_latency": latency,
+                    "max_latency": 0.0,
+                    "latencies": deque(maxlen=config.WORKLOAD_LATENCY_SAMPLES),
+                    "rows": 0,
+                    "slow_count": 0,
+                    "error_count": 0,
+                    "last_error": None,
+                    "last_seen": now
+                }
+            else:
+                self._entries.move_to_end(fingerprint)
+            entry["count"] += 1
+            entry["total_latency"] += latency
+            entry["min_latency"] = min(entry["min_latency"], latency)
+            entry["max_latency"] = max(entry["max_latency"], latency)
+            entry["latencies"].append(latency)
+            entry["rows"] += row_count
+            entry["last_seen"] = now
+            if error is not None:
+                entry["error_count"] += 1
+                entry["last_error"] = error
+            if slow:
+                entry["slow_count"] += 1
+                self.slow_queries += 1
+
+            if self.path:
+                self._append({
+                    "ts": now,
+                    "sql": normalized_sql,
+                    "params": list(params) if params else None,
+                    "latency": round(latency, 6),
+                    "rows": row_count,
+                    "error": error,
+                    "pattern": pattern.to_dict() if pattern else None
+                })
+
+        slow_logger = self._slow_logger
+        if slow and slow_logger is not None:
+            slow_logger.warning(json.dumps({
+                "ts": round(now, 3),
+                "fingerprint": fingerprint,
+                "latency": round(latency, 6),
+                "rows": row_count,
+                "error": error,
+                "sql": normalized_sql,
+                "params": list(params) if params else None
+            }, ensure_ascii=False, default=str))
+
+    def _append(self, line: Dict[str, Any]) -> None:
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._file.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            logger.warning(f"写入查询负载日志失败，停止记录到文件: {e}")
+            self.path = ""
+
+    def get_summary(self, limit: int = 20) -> Dict[str, Any]:
+        """
+        获取按总耗时排序的负载汇总
+
+        Args:
+            limit: 返回的查询摘要数
+
+        Returns:
+            Dict[str, Any]: 负载汇总
+        """
+        with self._lock:
+            items = sorted(self._entries.items(), key=lambda item: item[1]["total_latency"], reverse=True)
+            top = []
+            for fingerprint, entry in items[:limit]:
+                latencies = sorted(entry["latencies"])
+                top.append({
+                    "fingerprint": fingerprint,
+                    "digest": entry["digest"],
+                    "sql": entry["sql"],
+                    "count": entry["count"],
+                    "total_latency": round(entry["total_latency"], 6),
+                    "avg_latency": round(entry["total_latency"] / entry["count"], 6),
+                    "min_latency": round(entry["min_latency"], 6),
+                    "max_latency": round(entry["max_latency"], 6),
+                    "p95_latency": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 6),
+                    "rows": entry["rows"],
+                    "avg_rows": round(entry["rows"] / entry["count"], 2),
+                    "slow_count": entry["slow_count"],
+                    "error_count": entry["error_count"],
+                    "last_error": entry["last_error"],
+                    "last_seen": round(entry["last_seen"], 3),
+                    "pattern": entry["pattern"].to_dict() if entry["pattern"] else None
+                })
+            return {
+                "fingerprints": len(self._entries),
+                "evicted": self.evicted,
+                "log_path": self.path or None,
+                "slow_query_threshold": self.slow_query_threshold,
+                "slow_query_log_path": self.slow_query_log_path or None,
+                "slow_queries": self.slow_queries,
+                "top": top
+            }
+
+    def close(self) -> None:
+        """关闭负载日志文件，并等待慢查询日志写完"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            listener, self._slow_listener = self._slow_listener, None
+            self._slow_logger = None
+        if listener is not None:
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
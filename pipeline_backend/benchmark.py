@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+端到端压测与基准测试工具
+在进程内启动FastAPI应用，连接本地MySQL或以mock_data.py生成数据的SQLite替身，
+以确定性的桩替换大模型调用(可配置延迟分布与按问题预置的SQL)，
+按泊松到达的开环负载并发请求 /query、/stats 与 /suggestions，
+统计各接口与各处理阶段的吞吐量、p50/p95/p99 延迟及内存峰值，结果写入JSON便于跨提交对比
+
+用法:
+    python benchmark.py --duration 30 --rate 50 --output bench.json
+    python benchmark.py --db mysql --llm-latency lognormal:0.8,0.4 --mix query=8,stats=1,suggestions=1
+    python benchmark.py --compare baseline.json --output bench.json
+"""
+
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import platform
+import random
+import re
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pymysql
+import pymysql.converters
+import pymysql.cursors
+from pymysql.constants import FIELD_TYPE
+
+API_PREFIX = os.getenv("API_PREFIX", "/api/v1")
+
+# 预置问题及大模型桩返回的SQL；能由规则模板回答的问题不会调用大模型
+QUESTIONS: Dict[str, str] = {
+    "查询广东省的燃气管道数量":
+        "SELECT COUNT(*) AS count FROM pipeline_info WHERE province = '广东' AND pipeline_type = '燃气管道'",
+    "按敷设方式统计管道数量":
+        "SELECT laying_method, COUNT(*) AS count FROM pipeline_info GROUP BY laying_method",
+    "统计各省市管道类型分布情况":
+        "SELECT province, city, pipeline_type, COUNT(*) AS count FROM pipeline_info "
+        "GROUP BY province, city, pipeline_type",
+    "查询2010年以后建成的供水管道":
+        "SELECT * FROM pipeline_info WHERE build_year > 2010 AND pipeline_type = '供水管道' LIMIT 1000",
+    "统计软土地质且有地震风险的管道数量":
+        "SELECT COUNT(*) AS count FROM pipeline_info WHERE geological_feature = '软土' AND disaster_type = '地震'",
+    "哪些城市的管道平均建成年份最早":
+        "SELECT city, AVG(build_year) AS avg_year FROM pipeline_info GROUP BY city ORDER BY avg_year LIMIT 10",
+    "列出最近建成的20条管道":
+        "SELECT id, province, city, pipeline_type, build_year FROM pipeline_info ORDER BY build_year DESC, id LIMIT 20",
+    "每种管道类型涉及多少个城市":
+        "SELECT pipeline_type, COUNT(DISTINCT city) AS cities FROM pipeline_info GROUP BY pipeline_type"
+}
+DEFAULT_SQL = "SELECT COUNT(*) AS count FROM pipeline_info"
+
+# 被计时的处理阶段：(对象路径, 方法名, 阶段名)；当前代码中不存在的方法自动跳过，便于跨提交对比
+STAGES: List[Tuple[str, str, str]] = [
+    ("sql_generator", "prepare_sql", "prepare_sql"),
+    ("sql_generator", "match_template", "template"),
+    ("sql_generator", "_generate_sql_with_llm", "llm"),
+    ("sql_generator", "execute_shared", "execute"),
+    ("sql_generator", "get_suggestions", "suggestions"),
+    ("sql_generator", "get_database_info_async", "stats"),
+    ("sql_generator.db_service", "check_cost", "cost_guard"),
+    ("sql_generator.db_service", "_execute", "db_execute"),
+    ("sql_generator.cube", "answer", "cube"),
+    ("sql_generator.replica", "answer", "replica")
+]
+
+
+# ==================== 统计 ====================
+
+def percentile(ordered: List[float], q: float) -> float:
+    """最近秩法分位数"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """延迟样本(秒) -> 毫秒分位数"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    return {
+        "p50": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99": round(percentile(ordered, 0.99) * 1000, 3),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3)
+    }
+
+
+class StageTimer:
+    """以包装方法的方式记录各处理阶段耗时"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, elapsed: float) -> None:
+        with self._lock:
+            self.samples.setdefault(stage, []).append(elapsed)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples = {}
+
+    def wrap(self, owner: Any, name: str, stage: str) -> bool:
+        """包装owner上的方法，不存在时返回False"""
+        method = getattr(owner, name, None)
+        if method is None or not callable(method):
+            return False
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+        else:
+            @functools.wraps(method)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+
+        setattr(owner, name, timed)
+        return True
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                stage: {"count": len(samples), "latency_ms": summarize(samples)}
+                for stage, samples in sorted(self.samples.items())
+            }
+
+
+# ==================== 大模型桩 ====================
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    解析延迟分布
+
+    fixed:0.05 | uniform:0.2,1.0 | lognormal:中位数,sigma | exponential:均值
+    """
+    kind, _, values = spec.partition(":")
+    numbers = [float(value) for value in values.split(",") if value]
+    if kind == "fixed" and len(numbers) == 1:
+        return lambda rng: numbers[0]
+    if kind == "uniform" and len(numbers) == 2:
+        return lambda rng: rng.uniform(numbers[0], numbers[1])
+    if kind == "lognormal" and len(numbers) == 2:
+        import math
+        mu = math.log(numbers[0])
+        return lambda rng: rng.lognormvariate(mu, numbers[1])
+    if kind == "exponential" and len(numbers) == 1:
+        return lambda rng: rng.expovariate(1.0 / numbers[0])
+    raise argparse.ArgumentTypeError(f"无法解析的延迟分布: {spec}")
+
+
+class StubLLMClient:
+    """
+    确定性的大模型桩
+
+    按提示词中的用户问题返回预置SQL，意图分析返回固定JSON；
+    延迟按给定分布由固定种子的随机数生成器抽取，可按比例返回可重试的错误
+    """
+
+    def __init__(self, questions: Dict[str, str], latency: Callable[[random.Random], float],
+                 error_rate: float = 0.0, seed: int = 42):
+        self.questions = questions
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    async def call(self, **params: Any) -> Any:
+        self.calls += 1
+        await asyncio.sleep(self.latency(self.rng))
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            return SimpleNamespace(status_code=503, output=None, message="stub error", usage=None)
+
+        prompt = params.get("prompt", "")
+        match = re.search(r"用户问题:\s*(.*)", prompt)
+        question = match.group(1).strip() if match else ""
+        if "查询意图" in prompt:
+            text = json.dumps({"intent_type": "统计查询", "confidence": 0.9}, ensure_ascii=False)
+        else:
+            text = self.questions.get(question, DEFAULT_SQL)
+        return SimpleNamespace(
+            status_code=200,
+            output=SimpleNamespace(text=text),
+            message="",
+            usage=SimpleNamespace(input_tokens=len(prompt), output_tokens=len(text))
+        )
+
+
+# ==================== SQLite替身 ====================
+
+_HINT = re.compile(r"/\*\+.*?\*/", re.S)
+_INTEGER_NAMES = re.compile(r"^(id|build_year|count.*|.*_count|cities|total|c|cnt)$", re.I)
+
+
+class SQLiteCursor:
+    """提供pymysql游标接口的SQLite游标"""
+
+    def __init__(self, connection: "SQLiteConnection", as_dict: bool):
+        self._cursor = connection.db.cursor()
+        self._as_dict = as_dict
+        self.description = None
+        self.rowcount = -1
+
+    def execute(self, sql: str, args: Any = None) -> int:
+        statement = _HINT.sub("", sql).strip()
+        if statement.upper().startswith("EXPLAIN"):
+            # SQLite没有MySQL格式的执行计划，返回空计划(代价检查视为通过)
+            statement, args = "SELECT NULL AS id WHERE 0", None
+        if args:
+            statement = statement.replace("%s", "?").replace("%%", "%")
+        self._cursor.execute(statement, tuple(args) if args else ())
+        if self._cursor.description:
+            self.description = [
+                (column[0], FIELD_TYPE.LONGLONG if _INTEGER_NAMES.match(column[0]) else FIELD_TYPE.VAR_STRING)
+                + (None,) * 5
+                for column in self._cursor.description
+            ]
+        else:
+            self.description = None
+        self.rowcount = self._cursor.rowcount
+        return self.rowcount
+
+    def _convert(self, row: Any) -> Any:
+        if row is None or not self._as_dict:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self) -> Any:
+        return self._convert(self._cursor.fetchone())
+
+    def fetchmany(self, size: int = 1) -> List[Any]:
+        return [self._convert(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self) -> List[Any]:
+        return [self._convert(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._convert(row)
+
+    def close(self) -> None:
+        self._cursor.close()
+
+    def __enter__(self) -> "SQLiteCursor":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class SQLiteConnection:
+    """提供连接池所需pymysql连接接口的SQLite连接"""
+
+    def __init__(self, path: str, **kwargs: Any):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.cursorclass = kwargs.get("cursorclass") or pymysql.cursors.Cursor
+        self.open = True
+
+    def cursor(self, cursor: Any = None) -> SQLiteCursor:
+        cursor_class = cursor or self.cursorclass
+        return SQLiteCursor(self, issubclass(cursor_class, pymysql.cursors.DictCursorMixin))
+
+    def ping(self, reconnect: bool = False) -> None:
+        if not self.open:
+            raise pymysql.err.InterfaceError("connection closed")
+
+    def escape(self, value: Any) -> str:
+        return pymysql.converters.escape_item(value, "utf8mb4")
+
+    def commit(self) -> None:
+        self.db.commit()
+
+    def rollback(self) -> None:
+        self.db.rollback()
+
+    def close(self) -> None:
+        self.open = False
+        self.db.close()
+
+
+def seed_sqlite(path: str, rows: int, seed: int) -> None:
+    """按init.sql的表结构建表，并以mock_data.py的生成器写入模拟数据"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "database"))
+    import mock_data
+
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("""
+        CREATE TABLE pipeline_info (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, province TEXT NOT NULL, city TEXT NOT NULL,
+            street TEXT, road TEXT, location TEXT, disaster_type TEXT, geological_feature TEXT,
+            pipeline_type TEXT NOT NULL, build_year INTEGER, laying_method TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP, updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    insert = (
+        f"INSERT INTO pipeline_info ({', '.join(mock_data.DATA_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(mock_data.DATA_COLUMNS))})"
+    )
+    for chunk_index, count, _ in mock_data.plan_chunks(rows, 100000):
+        db.executemany(insert, mock_data.generate_rows(count, seed, chunk_index))
+    for statement in (
+        "CREATE INDEX idx_province_city ON pipeline_info(province, city)",
+        "CREATE INDEX idx_pipeline_type ON pipeline_info(pipeline_type)",
+        "CREATE INDEX idx_disaster_type ON pipeline_info(disaster_type)",
+        "CREATE INDEX idx_build_year ON pipeline_info(build_year)"
+    ):
+        db.execute(statement)
+    db.commit()
+    db.close()
+
+
+# ==================== 负载 ====================
+
+class LoadResult:
+    """各接口的请求结果"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = (self.last_end - self.first_start) if self.first_start and self.last_end else 0.0
+        endpoints = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            samples = self.latencies.get(endpoint, [])
+            endpoints[endpoint] = {
+                "count": len(samples),
+                "errors": self.errors.get(endpoint, 0),
+                "throughput": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+                "latency_ms": summarize(samples)
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "elapsed": round(elapsed, 3),
+            "requests": total,
+            "throughput": round(total / elapsed, 3) if elapsed else 0.0,
+            "max_in_flight": self.max_in_flight,
+            "endpoints": endpoints
+        }
+
+
+def build_request(endpoint: str, questions: List[str], rng: random.Random) -> Tuple[str, str, Dict[str, Any]]:
+    """构造接口请求：(方法, 路径, httpx参数)"""
+    question = rng.choice(questions)
+    if endpoint == "query":
+        return "POST", f"{API_PREFIX}/query", {"json": {"question": question}}
+    if endpoint == "stats":
+        return "GET", f"{API_PREFIX}/stats", {}
+    if endpoint == "suggestions":
+        return "GET", f"{API_PREFIX}/suggestions", {"params": {"q": question[:rng.randint(1, 4)]}}
+    raise ValueError(f"未知接口: {endpoint}")
+
+
+async def run_load(client: Any, mix: Dict[str, float], rate: float, duration: float,
+                   questions: List[str], rng: random.Random) -> LoadResult:
+    """
+    开环负载：请求按泊松过程到达，与响应快慢无关
+
+    延迟从计划发出时刻算起，服务端排队造成的延迟不会被协调遗漏(coordinated omission)掩盖
+    """
+    result = LoadResult()
+    loop = asyncio.get_running_loop()
+    endpoints, weights = list(mix), list(mix.values())
+    tasks = []
+
+    async def fire(endpoint: str, scheduled: float) -> None:
+        method, path, kwargs = build_request(endpoint, questions, rng)
+        result.in_flight += 1
+        result.max_in_flight = max(result.max_in_flight, result.in_flight)
+        try:
+            response = await client.request(method, path, **kwargs)
+            ok = response.status_code < 400 and (endpoint != "query" or response.json().get("status") == "success")
+        except Exception:
+            ok = False
+        finally:
+            result.in_flight -= 1
+        end = loop.time()
+        result.last_end = end
+        if ok:
+            result.latencies.setdefault(endpoint, []).append(end - scheduled)
+        else:
+            result.errors[endpoint] = result.errors.get(endpoint, 0) + 1
+
+    start = loop.time()
+    result.first_start = start
+    scheduled = start
+    while True:
+        scheduled += rng.expovariate(rate)
+        if scheduled - start > duration:
+            break
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        endpoint = rng.choices(endpoints, weights)[0]
+        tasks.append(asyncio.create_task(fire(endpoint, scheduled)))
+    await asyncio.gather(*tasks)
+    return result
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """query=8,stats=1,suggestions=1 -> 权重"""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def resolve(root: Any, path: str) -> Any:
+    for name in path.split(".")[1:]:
+        root = getattr(root, name, None)
+        if root is None:
+            return None
+    return root
+
+
+async def wait_for_background_builds(sql_generator: Any, timeout: float = 300) -> None:
+    """等待后台构建的内存结构(聚合立方体、列式副本)就绪，避免构建过程计入负载"""
+    deadline = time.monotonic() + timeout
+    for name in ("cube", "replica"):
+        component = getattr(sql_generator, name, None)
+        if component is None or getattr(component, "_task", None) is None:
+            continue
+        while not component.is_ready and component.disabled_reason is None and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        print(f"{name}: {'就绪' if component.is_ready else component.disabled_reason or '构建超时'}")
+
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True
+        ).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """启动应用、注入桩并执行预热与正式负载"""
+    import httpx
+    import app.api.routes as routes
+    from main import app
+
+    sql_generator = routes.sql_generator
+    if sql_generator is None:
+        raise SystemExit("服务初始化失败，请检查配置")
+
+    questions = dict(QUESTIONS)
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions.update(json.load(f))
+    stub = StubLLMClient(questions, args.llm_latency, args.llm_error_rate, args.seed)
+    sql_generator.llm_service.gateway.client = stub
+
+    timer = StageTimer()
+    timed = [stage for path, name, stage in STAGES if timer.wrap(resolve(sql_generator, path), name, stage)]
+
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        await wait_for_background_builds(sql_generator)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            if args.warmup > 0:
+                print(f"预热 {args.warmup} 秒...")
+                await run_load(client, mix, args.rate, args.warmup, list(questions), rng)
+                timer.reset()
+            print(f"正式负载: {args.rate} 请求/秒，持续 {args.duration} 秒，接口权重 {mix}")
+            if args.tracemalloc:
+                tracemalloc.start()
+            result = await run_load(client, mix, args.rate, args.duration, list(questions), rng)
+            traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+            if args.tracemalloc:
+                tracemalloc.stop()
+
+    # Linux下ru_maxrss单位为KB，macOS为字节
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    max_rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+    options = {key: value for key, value in vars(args).items() if key not in ("llm_latency", "compare", "output")}
+    options["llm_latency"] = args.llm_latency_spec
+    return {
+        "meta": {
+            **git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": options,
+            "timed_stages": timed
+        },
+        "load": {key: value for key, value in result.report().items() if key != "endpoints"},
+        "endpoints": result.report()["endpoints"],
+        "stages": timer.report(),
+        "llm_stub": {"calls": stub.calls, "errors": stub.errors},
+        "memory": {
+            "max_rss_mb": round(max_rss_mb, 1),
+            "tracemalloc_peak_mb": round(traced_peak / (1024 * 1024), 1) if traced_peak is not None else None
+        }
+    }
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """打印结果，给出基线时附带p95与吞吐量的变化"""
+    def delta(current: float, previous: Optional[float]) -> str:
+        if not previous:
+            return ""
+        return f" ({(current - previous) / previous * 100:+.1f}%)"
+
+    load = report["load"]
+    print(f"\n共 {load['requests']} 个请求，{load['throughput']} 请求/秒，最大并发 {load['max_in_flight']}")
+    print(f"{'接口':<14}{'数量':>8}{'错误':>6}{'吞吐/秒':>10}{'p50':>10}{'p95':>10}{'p99':>10}  (毫秒)")
+    for name, stats in report["endpoints"].items():
+        latency = stats["latency_ms"]
+        previous = (baseline or {}).get("endpoints", {}).get(name, {})
+        print(
+            f"{name:<14}{stats['count']:>8}{stats['errors']:>6}{stats['throughput']:>10}"
+            f"{latency['p50']:>10}{latency['p95']:>10}{latency['p99']:>10}"
+            f"{delta(latency['p95'], previous.get('latency_ms', {}).get('p95'))}"
+        )
+    print(f"\n{'阶段':<16}{'次数':>8}{'p50':>10}{'p95':>10}{'p99':>10}  (毫秒)")
+    for name, stats in report["stages"].items():
+        latency = stats["latency_ms"]
+        previous = (baseline or {}).get("stages", {}).get(name, {})
+        print(
+            f"{name:<16}{stats['count']:>8}{latency['p50']:>10}{latency['p95']:>10}{latency['p99']:>10}"
+            f"{delta(latency['p95'], previous.get('latency_ms', {}).get('p95'))}"
+        )
+    memory = report["memory"]
+    print(f"\n内存峰值: RSS {memory['max_rss_mb']} MB"
+          + (f"，tracemalloc {memory['tracemalloc_peak_mb']} MB" if memory["tracemalloc_peak_mb"] is not None else ""))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="管道信息查询系统端到端基准测试")
+    parser.add_argument("--db", choices=["sqlite", "mysql"], default="sqlite",
+                        help="sqlite: 以mock_data.py生成数据的本地替身；mysql: 使用.env中配置的数据库")
+    parser.add_argument("--rows", type=int, default=100000, help="SQLite替身的数据行数")
+    parser.add_argument("--duration", type=float, default=20, help="正式负载持续时间(秒)")
+    parser.add_argument("--warmup", type=float, default=3, help="预热时间(秒)，结果不计入统计")
+    parser.add_argument("--rate", type=float, default=50, help="请求到达速率(请求/秒)")
+    parser.add_argument("--mix", default="query=8,stats=1,suggestions=1", help="接口权重")
+    parser.add_argument("--llm-latency", dest="llm_latency_spec", default="lognormal:0.8,0.4",
+                        help="大模型桩延迟分布: fixed:秒 | uniform:下限,上限 | lognormal:中位数,sigma | exponential:均值")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="大模型桩返回可重试错误的比例")
+    parser.add_argument("--questions", help="JSON文件 {问题: SQL}，补充或覆盖预置问题")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子(数据、负载与桩延迟)")
+    parser.add_argument("--tracemalloc", action="store_true", help="统计Python堆内存峰值(有额外开销)")
+    parser.add_argument("--output", help="结果JSON文件")
+    parser.add_argument("--compare", help="对比的基线结果JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="输出应用INFO日志")
+    args = parser.parse_args(argv)
+    args.llm_latency = parse_latency(args.llm_latency_spec)
+
+    # 应用模块在导入时读取配置并创建服务，替身与默认配置需在导入前就绪
+    os.environ.setdefault("DASHSCOPE_API_KEY", "benchmark")
+    if args.db == "sqlite":
+        path = os.path.join(tempfile.mkdtemp(prefix="pipeline-bench-"), "pipeline.db")
+        print(f"生成SQLite替身数据 {args.rows} 行: {path}")
+        seed_sqlite(path, args.rows, args.seed)
+        pymysql.connect = lambda **kwargs: SQLiteConnection(path, **kwargs)
+        os.environ.setdefault("DB_PASSWORD", "benchmark")
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    report = asyncio.run(benchmark(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,13 +20,135 @@ class Config:
     DB_USER: str = os.getenv("DB_USER", "root")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "your_password")
     DB_NAME: str = os.getenv("DB_NAME", "pipeline_management")
-    
+
+    # 数据库连接池配置
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_POOL_MAX_OVERFLOW: int = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() in ("true", "1", "t")
+    DB_POOL_PING_INTERVAL: float = float(os.getenv("DB_POOL_PING_INTERVAL", "5"))
+    # 异步接口执行阻塞数据库操作的线程数，默认与连接池最大连接数一致
+    DB_EXECUTOR_WORKERS: int = int(
+        os.getenv("DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW))
+    )
+
+    # 客户端读取超时(秒)：单次读取等待超过该时间即断开，0表示不限制
+    DB_READ_TIMEOUT: float = float(os.getenv("DB_READ_TIMEOUT", "60"))
+
+    # 执行保护配置：执行前以EXPLAIN(按SQL指纹缓存)估算代价，预计扫描行数超过
+    # QUERY_MAX_EXAMINED_ROWS的查询直接拒绝；查询以MAX_EXECUTION_TIME提示限制服务端执行时间(毫秒，0表示不限制)，
+    # 预计全表扫描超过QUERY_FULL_SCAN_ROWS行的查询改用更严格的QUERY_FULL_SCAN_MAX_EXECUTION_TIME
+    QUERY_COST_GUARD_ENABLED: bool = os.getenv("QUERY_COST_GUARD_ENABLED", "True").lower() in ("true", "1", "t")
+    QUERY_MAX_EXAMINED_ROWS: int = int(os.getenv("QUERY_MAX_EXAMINED_ROWS", "20000000"))
+    QUERY_FULL_SCAN_ROWS: int = int(os.getenv("QUERY_FULL_SCAN_ROWS", "1000000"))
+    QUERY_MAX_EXECUTION_TIME: int = int(os.getenv("QUERY_MAX_EXECUTION_TIME", "15000"))
+    QUERY_FULL_SCAN_MAX_EXECUTION_TIME: int = int(os.getenv("QUERY_FULL_SCAN_MAX_EXECUTION_TIME", "5000"))
+    QUERY_PLAN_CACHE_SIZE: int = int(os.getenv("QUERY_PLAN_CACHE_SIZE", "2048"))
+    QUERY_PLAN_CACHE_TTL: float = float(os.getenv("QUERY_PLAN_CACHE_TTL", "600"))
+
+    # 查询负载记录：配置路径后每次数据库执行追加一行JSON，供 index_advisor.py 分析
+    WORKLOAD_LOG_PATH: str = os.getenv("WORKLOAD_LOG_PATH", "")
+    WORKLOAD_MAX_FINGERPRINTS: int = int(os.getenv("WORKLOAD_MAX_FINGERPRINTS", "1000"))
+    # 每个查询摘要保留的最近耗时样本数，用于计算p95
+    WORKLOAD_LATENCY_SAMPLES: int = int(os.getenv("WORKLOAD_LATENCY_SAMPLES", "256"))
+    # 慢查询日志：执行耗时不低于阈值(秒，0表示关闭)的查询由后台线程写入按大小轮转的日志文件
+    SLOW_QUERY_THRESHOLD: float = float(os.getenv("SLOW_QUERY_THRESHOLD", "1.0"))
+    # 慢查询日志文件路径，为空时只计数不写文件
+    SLOW_QUERY_LOG_PATH: str = os.getenv("SLOW_QUERY_LOG_PATH", "")
+    SLOW_QUERY_LOG_MAX_BYTES: int = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    SLOW_QUERY_LOG_BACKUP_COUNT: int = int(os.getenv("SLOW_QUERY_LOG_BACKUP_COUNT", "5"))
+
+    # 查询结果缓存配置
+    RESULT_CACHE_ENABLED: bool = os.getenv("RESULT_CACHE_ENABLED", "True").lower() in ("true", "1", "t")
+    RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "4096"))
+    RESULT_CACHE_MAX_BYTES: int = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    # 数据版本探测(COUNT/MAX(id)/MAX(updated_at))的最小间隔(秒)，决定数据变更后缓存失效的最长延迟
+    DATA_VERSION_CHECK_INTERVAL: float = float(os.getenv("DATA_VERSION_CHECK_INTERVAL", "5"))
+
+    # 统计快照配置：后台每隔STATS_REFRESH_INTERVAL秒检查数据版本，
+    # 数据变化或快照超过STATS_MAX_AGE秒时重新计算
+    STATS_REFRESH_INTERVAL: float = float(os.getenv("STATS_REFRESH_INTERVAL", "10"))
+    STATS_MAX_AGE: float = float(os.getenv("STATS_MAX_AGE", "300"))
+
+    # 聚合立方体配置：按低基数维度预聚合的内存计数立方体，后台每隔CUBE_REFRESH_INTERVAL秒增量刷新；
+    # 维度组合数超过CUBE_MAX_CELLS时停用，按需物化的子立方体最多保留CUBE_MAX_CUBOIDS个
+    CUBE_ENABLED: bool = os.getenv("CUBE_ENABLED", "True").lower() in ("true", "1", "t")
+    CUBE_REFRESH_INTERVAL: float = float(os.getenv("CUBE_REFRESH_INTERVAL", "10"))
+    CUBE_MAX_CELLS: int = int(os.getenv("CUBE_MAX_CELLS", "2000000"))
+    CUBE_MAX_CUBOIDS: int = int(os.getenv("CUBE_MAX_CUBOIDS", "64"))
+
+    # 列式副本配置：将pipeline_info以字典编码加载到内存(需要numpy)，后台每隔REPLICA_REFRESH_INTERVAL秒按水位同步；
+    # 每条SQL首次由副本回答前与MySQL结果比对，之后按REPLICA_VERIFY_SAMPLE_RATE比例抽样复核
+    REPLICA_ENABLED: bool = os.getenv("REPLICA_ENABLED", "False").lower() in ("true", "1", "t")
+    REPLICA_REFRESH_INTERVAL: float = float(os.getenv("REPLICA_REFRESH_INTERVAL", "10"))
+    REPLICA_VERIFY_SAMPLE_RATE: float = float(os.getenv("REPLICA_VERIFY_SAMPLE_RATE", "0.01"))
+    REPLICA_MAX_ROWS: int = int(os.getenv("REPLICA_MAX_ROWS", "20000000"))
+
+    # 流式查询配置
+    STREAM_BATCH_SIZE: int = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+    STREAM_MAX_ROWS: int = int(os.getenv("STREAM_MAX_ROWS", "100000"))
+    # 流式查询与导出的服务端执行时间上限(毫秒)，包含结果传输时间
+    STREAM_MAX_EXECUTION_TIME: int = int(os.getenv("STREAM_MAX_EXECUTION_TIME", "300000"))
+
+    # 批量查询配置：单批最多问题数、默认与最大并行数
+    BATCH_MAX_QUESTIONS: int = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+
+    # 分页配置：续页令牌签名密钥（多进程部署时需配置为相同值）与每页最大行数
+    PAGINATION_SECRET: str = os.getenv("PAGINATION_SECRET", "")
+    PAGE_SIZE_MAX: int = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+
+    # 导出配置：每批从服务端游标读取的行数与单次导出的最大行数
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+    EXPORT_MAX_ROWS: int = int(os.getenv("EXPORT_MAX_ROWS", "10000000"))
+
+    # 响应体超过该字节数且客户端支持时启用gzip/brotli压缩
+    RESPONSE_COMPRESSION_MIN_SIZE: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "4096"))
+
     # 阿里云百炼大模型配置
     DASHSCOPE_API_KEY: str = os.getenv("DASHSCOPE_API_KEY", "")
     
+    # 大模型调用治理配置
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "30"))  # 单次调用截止时间(含重试与对冲)
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_MODEL_CONCURRENCY: int = int(os.getenv("LLM_MODEL_CONCURRENCY", "8"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BACKOFF: float = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "True").lower() in ("true", "1", "t")
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+    LLM_BREAKER_RESET_TIMEOUT: float = float(os.getenv("LLM_BREAKER_RESET_TIMEOUT", "30"))
+    # SQL生成使用流式输出，语句完整后提前结束生成
+    LLM_STREAMING: bool = os.getenv("LLM_STREAMING", "True").lower() in ("true", "1", "t")
+    
+    # 问题->SQL缓存配置
+    SQL_CACHE_SIZE: int = int(os.getenv("SQL_CACHE_SIZE", "2048"))
+    SQL_CACHE_TTL: float = float(os.getenv("SQL_CACHE_TTL", "86400"))
+    # SQL解析缓存条目数（键为SQL原文）
+    SQL_PARSE_CACHE_SIZE: int = int(os.getenv("SQL_PARSE_CACHE_SIZE", "4096"))
+    
+    # 规则模板快速路径配置（置信度低于阈值时交由大模型处理）
+    TEMPLATE_ENGINE_ENABLED: bool = os.getenv("TEMPLATE_ENGINE_ENABLED", "True").lower() in ("true", "1", "t")
+    TEMPLATE_MIN_CONFIDENCE: float = float(os.getenv("TEMPLATE_MIN_CONFIDENCE", "0.85"))
+    # 大模型不可用时降级使用模板结果的最低置信度；低于该值时返回错误，避免只识别了部分条件的问题得到错误答案
+    TEMPLATE_FALLBACK_MIN_CONFIDENCE: float = float(os.getenv("TEMPLATE_FALLBACK_MIN_CONFIDENCE", "0.8"))
+    # 实体词典索引全量重建间隔(秒)，期间按新增行增量加载
+    ENTITY_INDEX_REFRESH_INTERVAL: float = float(os.getenv("ENTITY_INDEX_REFRESH_INTERVAL", "300"))
+    
     # 应用配置
     API_PREFIX: str = os.getenv("API_PREFIX", "/api/v1")
     DEBUG: bool = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
+    # 管理接口令牌，未配置时仅在调试模式下开放管理接口
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    # 是否开放 /metrics 指标接口(Prometheus文本格式)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() in ("true", "1", "t")
+    # 性能剖析：开启后管理接口可对运行中的进程采样，查询请求可通过请求头 X-Profile: 1 附带cProfile结果
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "False").lower() in ("true", "1", "t")
+    PROFILE_MAX_DURATION: float = float(os.getenv("PROFILE_MAX_DURATION", "60"))
+    PROFILE_SAMPLE_INTERVAL: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+    PROFILE_TOP_FUNCTIONS: int = int(os.getenv("PROFILE_TOP_FUNCTIONS", "30"))
     
     # CORS配置
     CORS_ORIGINS: List[str] = os.getenv(
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+pipeline_info 索引建议工具
+读取查询负载日志(WORKLOAD_LOG_PATH)，按谓词、GROUP BY与ORDER BY字段集合生成组合索引与覆盖索引候选，
+结合各字段的基数估算收益并贪心选出收益最高的索引，输出DDL；
+可在本地MySQL上回放负载，对比建索引前后的耗时验证收益（验证会建删索引，
+默认拒绝对应用配置的数据库执行，需用 --host/--port/--database 指定验证库）
+
+用法:
+    python index_advisor.py workload.jsonl
+    python index_advisor.py workload.jsonl --max-indexes 3 --validate --repeat 5 --host 127.0.0.1 --database pipeline_test
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pymysql
+
+from app.services.sql_parser import SQLValidationError, parse_sql
+from app.services.workload import TABLE, AccessPattern, extract_access_pattern
+from config import config
+
+# 范围条件的默认选择率
+RANGE_SELECTIVITY = 0.3
+# 回表代价占查询耗时的估计比例（覆盖索引可省去）
+LOOKUP_COST_RATIO = 0.5
+# 指向本机的主机名，判断是否为应用数据库时视为同一主机
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+@dataclass
+class WorkloadQuery:
+    """按SQL汇总的负载"""
+    sql: str
+    pattern: AccessPattern
+    params: Optional[List[Any]] = None
+    count: int = 0
+    total_latency: float = 0.0
+
+
+@dataclass
+class IndexCandidate:
+    """索引候选"""
+    columns: Tuple[str, ...]
+    benefit: float = 0.0
+    queries: List[str] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return ("idx_" + "_".join(self.columns))[:64]
+
+    @property
+    def ddl(self) -> str:
+        return f"CREATE INDEX {self.name} ON {TABLE}({', '.join(self.columns)});"
+
+
+def load_workload(path: str) -> List[WorkloadQuery]:
+    """
+    读取负载日志并按规范化SQL汇总
+
+    Args:
+        path: JSONL负载日志路径
+
+    Returns:
+        List[WorkloadQuery]: 读取pipeline_info的查询
+    """
+    queries: Dict[str, WorkloadQuery] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            query = queries.get(record["sql"])
+            if query is None:
+                if record.get("pattern"):
+                    pattern = AccessPattern.from_dict(record["pattern"])
+                else:
+                    try:
+                        pattern = extract_access_pattern(parse_sql(record["sql"]))
+                    except SQLValidationError:
+                        pattern = None
+                if pattern is None:
+                    continue
+                query = queries[record["sql"]] = WorkloadQuery(record["sql"], pattern, record.get("params"))
+            query.count += 1
+            query.total_latency += float(record.get("latency") or 0.0)
+    return list(queries.values())
+
+
+def fetch_table_profile(conn: "pymysql.connections.Connection") -> Tuple[int, Dict[str, int], List[Tuple[str, ...]]]:
+    """
+    读取表行数、各字段基数与现有索引
+
+    Returns:
+        Tuple[int, Dict[str, int], List[Tuple[str, ...]]]: 行数、字段基数与现有索引字段序列
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(f"SHOW INDEX FROM {TABLE}")
+        indexes: Dict[str, List[Tuple[int, str]]] = {}
+        for row in cursor.fetchall():
+            indexes.setdefault(row["Key_name"], []).append((row["Seq_in_index"], row["Column_name"].lower()))
+        existing = [tuple(column for _, column in sorted(columns)) for columns in indexes.values()]
+
+        cursor.execute(f"SHOW COLUMNS FROM {TABLE}")
+        columns = [row["Field"].lower() for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT COUNT(*) AS row_count, "
+            + ", ".join(f"COUNT(DISTINCT `{column}`) AS `{column}`" for column in columns)
+            + f" FROM {TABLE}"
+        )
+        row = cursor.fetchone()
+    row_count = int(row.pop("row_count"))
+    return row_count, {column: max(int(value), 1) for column, value in row.items()}, existing
+
+
+def _usable(index: Sequence[str], pattern: AccessPattern, ndv: Dict[str, int]) -> Tuple[float, bool]:
+    """
+    估算查询使用索引后仍需读取的行比例
+
+    Returns:
+        Tuple[float, bool]: 读取比例(1.0表示无法使用索引)与是否覆盖查询
+    """
+    selectivity = 1.0
+    matched = 0
+    for column in index:
+        if column in pattern.equality:
+            selectivity /= ndv.get(column, 10)
+            matched += 1
+            continue
+        if column in pattern.ranges:
+            selectivity *= RANGE_SELECTIVITY
+            matched += 1
+        break
+
+    # 二级索引隐含主键id
+    covering = pattern.columns is not None and set(pattern.columns) <= set(index) | {"id"}
+    if matched:
+        return selectivity, covering
+    # 无可用谓词时，前缀与GROUP BY/ORDER BY一致的覆盖索引可替代全表扫描与临时表/排序
+    leading = pattern.group_by or pattern.order_by
+    if covering and leading and tuple(index[:len(leading)]) == leading:
+        return 1.0 - LOOKUP_COST_RATIO, covering
+    return 1.0, False
+
+
+def _benefit(index: Sequence[str], query: WorkloadQuery, ndv: Dict[str, int]) -> float:
+    """索引为该查询节省的耗时估计"""
+    fraction, covering = _usable(index, query.pattern, ndv)
+    if fraction >= 1.0:
+        return 0.0
+    saved = 1.0 - fraction
+    if covering:
+        saved += fraction * LOOKUP_COST_RATIO
+    return query.total_latency * saved
+
+
+def generate_candidates(queries: Iterable[WorkloadQuery], ndv: Dict[str, int], max_columns: int) -> List[Tuple[str, ...]]:
+    """
+    由访问方式生成索引候选
+
+    等值字段在前(基数高者优先)，其后为一个范围字段或GROUP BY/ORDER BY字段；
+    字段总数不超过max_columns时另生成补齐查询全部字段的覆盖索引
+    """
+    candidates = set()
+    for query in queries:
+        pattern = query.pattern
+        prefix = sorted(pattern.equality, key=lambda column: -ndv.get(column, 10))
+        if pattern.ranges:
+            tail = [max(pattern.ranges, key=lambda column: ndv.get(column, 10))]
+        else:
+            tail = [column for column in pattern.group_by or pattern.order_by if column not in prefix]
+        columns = tuple(column for column in prefix + tail if column != "id")[:max_columns]
+        if not columns:
+            continue
+        candidates.add(columns)
+        if pattern.columns is not None:
+            rest = sorted(set(pattern.columns) - set(columns) - {"id"})
+            if rest and len(columns) + len(rest) <= max_columns:
+                candidates.add(columns + tuple(rest))
+    return sorted(candidates)
+
+
+def recommend(
+    queries: List[WorkloadQuery],
+    ndv: Dict[str, int],
+    existing: List[Tuple[str, ...]],
+    max_indexes: int = 5,
+    max_columns: int = 4,
+    min_benefit_ratio: float = 0.01
+) -> List[IndexCandidate]:
+    """
+    贪心选择索引：每轮选出相对已有索引(含已选索引)边际收益最大的候选
+
+    Args:
+        queries: 负载
+        ndv: 字段基数
+        existing: 现有索引
+        max_indexes: 最多建议的索引数
+        max_columns: 单个索引最多字段数
+        min_benefit_ratio: 边际收益低于总耗时该比例时停止
+
+    Returns:
+        List[IndexCandidate]: 按选择顺序排列的建议索引
+    """
+    total_latency = sum(query.total_latency for query in queries) or 1.0
+    # 每条查询在当前索引集合下的最大收益
+    best = {
+        query.sql: max((_benefit(index, query, ndv) for index in existing), default=0.0)
+        for query in queries
+    }
+    candidates = [column for column in generate_candidates(queries, ndv, max_columns) if column not in existing]
+
+    chosen: List[IndexCandidate] = []
+    while candidates and len(chosen) < max_indexes:
+        scored = []
+        for columns in candidates:
+            candidate = IndexCandidate(columns)
+            for query in queries:
+                gain = _benefit(columns, query, ndv) - best[query.sql]
+                if gain > 0:
+                    candidate.benefit += gain
+                    candidate.queries.append(query.sql)
+            scored.append(candidate)
+        top = max(scored, key=lambda candidate: (candidate.benefit, -len(candidate.columns)))
+        if top.benefit < total_latency * min_benefit_ratio:
+            break
+        chosen.append(top)
+        candidates.remove(top.columns)
+        for query in queries:
+            best[query.sql] = max(best[query.sql], _benefit(top.columns, query, ndv))
+    return chosen
+
+
+def replay(conn: "pymysql.connections.Connection", queries: List[WorkloadQuery], repeat: int) -> Dict[str, float]:
+    """
+    回放负载，返回每条SQL的耗时中位数(秒)
+
+    Args:
+        conn: 数据库连接
+        queries: 负载
+        repeat: 每条SQL的执行次数
+    """
+    timings = {}
+    with conn.cursor() as cursor:
+        for query in queries:
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                cursor.execute(query.sql, query.params)
+                cursor.fetchall()
+                samples.append(time.perf_counter() - start)
+            timings[query.sql] = statistics.median(samples)
+    return timings
+
+
+def validate(
+    conn: "pymysql.connections.Connection",
+    queries: List[WorkloadQuery],
+    chosen: List[IndexCandidate],
+    repeat: int,
+    keep: bool
+) -> None:
+    """在本地MySQL上建索引前后回放负载，按执行次数加权对比耗时"""
+    print(f"\n回放 {len(queries)} 条SQL（每条 {repeat} 次）...")
+    before = replay(conn, queries, repeat)
+    with conn.cursor() as cursor:
+        for candidate in chosen:
+            print(f"创建索引: {candidate.ddl}")
+            cursor.execute(candidate.ddl)
+        cursor.execute(f"ANALYZE TABLE {TABLE}")
+        cursor.fetchall()
+    try:
+        after = replay(conn, queries, repeat)
+    finally:
+        if not keep:
+            with conn.cursor() as cursor:
+                for candidate in chosen:
+                    cursor.execute(f"DROP INDEX {candidate.name} ON {TABLE}")
+
+    weighted_before = sum(before[query.sql] * query.count for query in queries)
+    weighted_after = sum(after[query.sql] * query.count for query in queries)
+    print(f"\n{'建索引前':>10} {'建索引后':>10} {'加速比':>8}  SQL")
+    for query in sorted(queries, key=lambda query: before[query.sql] * query.count, reverse=True):
+        speedup = before[query.sql] / after[query.sql] if after[query.sql] else float("inf")
+        print(f"{before[query.sql] * 1000:>9.2f}ms {after[query.sql] * 1000:>9.2f}ms {speedup:>7.2f}x  {query.sql[:100]}")
+    if weighted_after:
+        print(f"\n按执行次数加权的总耗时: {weighted_before:.3f}s -> {weighted_after:.3f}s "
+              f"({weighted_before / weighted_after:.2f}x)")
+    if not keep:
+        print("已删除验证用索引（使用 --keep 保留）")
+
+
+def is_app_database(host: str, port: int, database: str) -> bool:
+    """判断连接目标是否为应用配置(DB_HOST/DB_PORT/DB_NAME)的数据库"""
+    def normalize(value: str) -> str:
+        value = value.strip().lower()
+        return "localhost" if value in LOCAL_HOSTS else value
+
+    return (
+        normalize(host) == normalize(config.DB_HOST)
+        and port == config.DB_PORT
+        and database == config.DB_NAME
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """主函数"""
+    parser = argparse.ArgumentParser(description="根据查询负载为pipeline_info建议索引")
+    parser.add_argument("workload", nargs="?", default=config.WORKLOAD_LOG_PATH, help="负载日志路径(JSONL)")
+    parser.add_argument("--max-indexes", type=int, default=5, help="最多建议的索引数")
+    parser.add_argument("--max-columns", type=int, default=4, help="单个索引最多字段数")
+    parser.add_argument("--validate", action="store_true", help="在本地MySQL上回放负载验证收益")
+    parser.add_argument("--repeat", type=int, default=3, help="验证时每条SQL的执行次数")
+    parser.add_argument("--keep", action="store_true", help="验证后保留创建的索引")
+    parser.add_argument("--host", default=config.DB_HOST, help="MySQL主机（默认DB_HOST）")
+    parser.add_argument("--port", type=int, default=config.DB_PORT, help="MySQL端口（默认DB_PORT）")
+    parser.add_argument("--user", default=config.DB_USER, help="MySQL用户（默认DB_USER）")
+    parser.add_argument("--password", default=config.DB_PASSWORD, help="MySQL密码（默认DB_PASSWORD）")
+    parser.add_argument("--database", default=config.DB_NAME, help="数据库名（默认DB_NAME）")
+    parser.add_argument(
+        "--allow-app-database",
+        action="store_true",
+        help="允许在应用配置的数据库上执行 --validate（会在线上表建删索引并执行ANALYZE）"
+    )
+    args = parser.parse_args(argv)
+
+    if not args.workload:
+        parser.error("请指定负载日志路径或配置WORKLOAD_LOG_PATH")
+    # 验证会执行CREATE INDEX/ANALYZE TABLE/DROP INDEX，大表上会长时间占用IO并影响线上查询
+    if args.validate and not args.allow_app_database and is_app_database(args.host, args.port, args.database):
+        parser.error(
+            f"--validate 会在 {args.host}:{args.port}/{args.database} 上建删索引，该库即应用配置的数据库；"
+            "请用 --host/--port/--database 指定验证库，或加 --allow-app-database 确认"
+        )
+
+    queries = load_workload(args.workload)
+    if not queries:
+        print("负载日志中没有读取pipeline_info的查询")
+        return 1
+    print(f"读取负载: {len(queries)} 条不同SQL，共 {sum(query.count for query in queries)} 次执行")
+
+    conn = pymysql.connect(
+        host=args.host,
+        port=args.port,
+        user=args.user,
+        password=args.password,
+        database=args.database,
+        charset="utf8mb4",
+        cursorclass=pymysql.cursors.DictCursor,
+        autocommit=True
+    )
+    try:
+        row_count, ndv, existing = fetch_table_profile(conn)
+        print(f"表行数: {row_count}，现有索引: {', '.join('(' + ', '.join(index) + ')' for index in existing)}")
+
+        chosen = recommend(queries, ndv, existing, args.max_indexes, args.max_columns)
+        if not chosen:
+            print("现有索引已能较好地支持当前负载，没有建议")
+            return 0
+
+        total_latency = sum(query.total_latency for query in queries)
+        print(f"\n建议索引（按预估收益排序，负载总耗时 {total_latency:.3f}s）:")
+        for rank, candidate in enumerate(chosen, 1):
+            print(f"{rank}. ({', '.join(candidate.columns)}) 预估节省 {candidate.benefit:.3f}s，"
+                  f"受益SQL {len(candidate.queries)} 条")
+        print("\nDDL:")
+        for candidate in chosen:
+            print(candidate.ddl)
+
+        if args.validate:
+            validate(conn, queries, chosen, args.repeat, args.keep)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,10 +7,11 @@ import logging
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 
-from app.api.routes import router
+from app.api.routes import router, sql_generator
+from app.services.metrics import registry
 from config import config
 
 # 配置日志
@@ -35,10 +36,29 @@ async def lifespan(app: FastAPI):
         logger.error("配置验证失败，请检查环境变量")
         raise RuntimeError("配置验证失败")
     
+    # 预热数据库连接池
+    if sql_generator:
+        try:
+            sql_generator.db_service.warm_up()
+        except Exception as e:
+            logger.warning(f"数据库连接池预热失败，将在首次查询时建立连接: {e}")
+        
+        # 启动统计快照后台刷新
+        sql_generator.stats_service.start()
+        # 启动聚合立方体构建与增量维护
+        sql_generator.cube.start()
+        # 启动列式副本加载与同步（REPLICA_ENABLED）
+        sql_generator.replica.start()
+    
     yield
     
     # 关闭时
     logger.info("=== 系统正在关闭 ===")
+    if sql_generator:
+        await sql_generator.stats_service.stop()
+        await sql_generator.cube.stop()
+        await sql_generator.replica.stop()
+        sql_generator.db_service.close()
 
 
 # 创建FastAPI应用
@@ -103,6 +123,17 @@ async def health_check():
     }
 
 
+# 指标接口（独立于API前缀）
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus文本格式的指标"""
+    if not config.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 if __name__ == "__main__":
     # 开发环境启动
     logger.info(f"启动服务 - 地址: {config.HOST}:{config.PORT}")
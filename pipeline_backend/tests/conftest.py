@@ -0,0 +1,70 @@
+"""测试共用的假数据库服务"""
+
+import re
+
+import pytest
+
+
+class FakeDatabaseService:
+    """
+    按字段返回固定取值的假数据库服务，支持实体词典加载所需的 MAX(id) 与 DISTINCT 查询
+
+    Args:
+        values: 各字段的取值
+        max_id: MAX(id) 与数据版本中的行数
+        on_query: 每次执行SQL前的回调
+    """
+
+    def __init__(self, values, max_id=10, on_query=None):
+        self.values = values
+        self.max_id = max_id
+        self.on_query = on_query
+        self.version = 1
+
+    def get_connection(self):
+        service = self
+
+        class Cursor:
+            rows = []
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params=None):
+                if service.on_query is not None:
+                    service.on_query()
+                if "MAX(id)" in sql:
+                    self.rows = [{"max_id": service.max_id}]
+                else:
+                    column = re.search(r"DISTINCT (\w+)", sql).group(1)
+                    self.rows = [{"value": value} for value in service.values.get(column, [])]
+
+            def fetchone(self):
+                return self.rows[0]
+
+            def fetchall(self):
+                return self.rows
+
+        class Connection:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def cursor(self):
+                return Cursor()
+
+        return Connection()
+
+    def get_data_version(self, force=False):
+        return (self.max_id, self.max_id, self.version)
+
+
+@pytest.fixture(scope="session")
+def fake_database():
+    """返回假数据库服务类，由测试按需构造"""
+    return FakeDatabaseService
@@ -0,0 +1,51 @@
+"""聚合立方体回归测试"""
+
+import pytest
+
+from app.services.aggregate_cube import DIMENSIONS, AggregateCube
+
+VERSION = (3, 3, None)
+
+
+class VersionOnlyDatabase:
+    def get_data_version(self, force=False):
+        return VERSION
+
+
+def _row(province, pipeline_type="燃气管道"):
+    values = dict.fromkeys(DIMENSIONS)
+    values.update(province=province, pipeline_type=pipeline_type, build_year=2000)
+    return tuple(values[name] for name in DIMENSIONS)
+
+
+@pytest.fixture
+def cube():
+    cube = AggregateCube(VersionOnlyDatabase())
+    for row_id, province in enumerate(["Guangdong", "guangdong ", "Zhejiang"], 1):
+        cube._apply_row(row_id, _row(province))
+    cube.version = VERSION
+    return cube
+
+
+def _rows(cube, sql):
+    answer = cube.answer(sql)
+    assert answer is not None
+    return answer[1]
+
+
+def test_group_by_folds_case_and_trailing_spaces(cube):
+    rows = _rows(cube, "SELECT province, COUNT(*) AS count FROM pipeline_info GROUP BY province ORDER BY province")
+    assert rows == [("Guangdong", 2), ("Zhejiang", 1)]
+
+
+def test_group_by_agrees_with_distinct_and_filter(cube):
+    groups = _rows(cube, "SELECT province, COUNT(*) FROM pipeline_info GROUP BY province")
+    distinct = _rows(cube, "SELECT COUNT(DISTINCT province) FROM pipeline_info")
+    filtered = _rows(cube, "SELECT COUNT(*) FROM pipeline_info WHERE province = 'GUANGDONG'")
+    assert len(groups) == distinct[0][0] == 2
+    assert filtered == [(2,)]
+
+
+def test_order_by_count_output(cube):
+    rows = _rows(cube, "SELECT province, COUNT(*) AS count FROM pipeline_info GROUP BY province ORDER BY count DESC LIMIT 1")
+    assert rows == [("Guangdong", 2)]
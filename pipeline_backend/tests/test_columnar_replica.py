@@ -0,0 +1,90 @@
+"""列式副本向量化执行器测试"""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.services.columnar_replica import COLUMNS, ColumnarReplica  # noqa: E402
+
+# (id, province, city, build_year)
+ROWS = [
+    (1, "A", "x", 1990),
+    (2, "a ", "y", 2005),
+    (3, "A", None, None),
+    (4, "B", "x", 2010),
+    (5, None, "z", None),
+    (6, "A", "x", 2001)
+]
+
+
+@pytest.fixture
+def replica(fake_database):
+    db = fake_database({}, max_id=len(ROWS))
+    replica = ColumnarReplica(db)
+    rows = []
+    for row_id, province, city, build_year in ROWS:
+        values = dict.fromkeys(COLUMNS)
+        values.update(id=row_id, province=province, city=city, build_year=build_year)
+        rows.append(tuple(values[name] for name in COLUMNS))
+    replica._apply(rows)
+    replica.version = db.get_data_version()
+    return replica
+
+
+def _rows(replica, sql):
+    answer = replica.answer(sql)
+    assert answer is not None, sql
+    return answer[1]
+
+
+def _ids(replica, where):
+    return [row[0] for row in _rows(replica, f"SELECT id FROM pipeline_info WHERE {where} ORDER BY id")]
+
+
+@pytest.mark.parametrize("where, expected", [
+    # NULL参与比较为UNKNOWN，NOT UNKNOWN 仍为UNKNOWN
+    ("NOT (build_year > 2000)", [1]),
+    # FALSE AND UNKNOWN 为FALSE，TRUE AND UNKNOWN 为UNKNOWN
+    ("NOT (province = 'a' AND build_year > 2000)", [1, 4]),
+    # TRUE OR UNKNOWN 为TRUE，UNKNOWN OR UNKNOWN 为UNKNOWN
+    ("build_year > 2000 OR province = 'a'", [1, 2, 3, 4, 6]),
+    ("NOT (build_year > 2000 OR province = 'b')", [1]),
+    ("province IN ('a') AND NOT city = 'x'", [2]),
+    ("city IS NULL OR build_year BETWEEN 2000 AND 2005", [2, 3, 6]),
+    ("city LIKE 'X%'", [1, 4, 6])
+])
+def test_three_valued_logic(replica, where, expected):
+    assert _ids(replica, where) == expected
+
+
+def test_group_by_folds_and_counts(replica):
+    answer = replica.answer(
+        "SELECT province, COUNT(*) AS n, COUNT(city), COUNT(DISTINCT city) "
+        "FROM pipeline_info GROUP BY province ORDER BY province"
+    )
+    assert answer[0] == ["province", "n", "COUNT(city)", "COUNT(DISTINCT city)"]
+    assert answer[1] == [(None, 1, 1, 1), ("A", 4, 3, 2), ("B", 1, 1, 1)]
+
+
+def test_multi_column_group_order_and_limit(replica):
+    rows = _rows(
+        replica,
+        "SELECT province, city, COUNT(*) AS n FROM pipeline_info "
+        "GROUP BY province, city ORDER BY n DESC, province, city LIMIT 2"
+    )
+    assert rows == [("A", "x", 2), (None, "z", 1)]
+
+
+def test_distinct_and_empty_aggregate(replica):
+    assert _rows(replica, "SELECT DISTINCT province FROM pipeline_info ORDER BY province") == [
+        (None,), ("A",), ("B",)
+    ]
+    assert _rows(replica, "SELECT COUNT(*) FROM pipeline_info WHERE province = 'zzz'") == [(0,)]
+
+
+def test_update_rewrites_row_in_place(replica):
+    values = dict.fromkeys(COLUMNS)
+    values.update(id=4, province="A", city="x", build_year=2010)
+    replica._apply([tuple(values[name] for name in COLUMNS)])
+    assert _rows(replica, "SELECT COUNT(*) FROM pipeline_info WHERE province = 'b'") == [(0,)]
+    assert replica.row_count == len(ROWS)
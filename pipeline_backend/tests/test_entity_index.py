@@ -0,0 +1,18 @@
+"""实体词典索引回归测试"""
+
+from app.services.entity_index import EntityIndex
+
+
+def test_find_during_full_rebuild_uses_previous_vocabulary(fake_database):
+    db = fake_database({"province": ["广东"], "pipeline_type": ["燃气管道"]})
+    index = EntityIndex(db)
+    index.refresh()
+
+    found = []
+    db.values = {"province": ["浙江"]}
+    db.on_query = lambda: found.append([entity.value for entity in index.find("广东燃气管道")])
+    index.refresh(full=True)
+
+    assert found and all(values == ["广东", "燃气管道"] for values in found)
+    assert [entity.value for entity in index.find("广东浙江")] == ["浙江"]
+    assert index.canonicalize("province", "浙江省") == "浙江"
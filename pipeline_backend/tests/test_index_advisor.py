@@ -0,0 +1,17 @@
+import pytest
+
+import index_advisor
+from config import config
+
+
+def test_validate_refuses_app_database_without_confirmation(capsys):
+    with pytest.raises(SystemExit):
+        index_advisor.main(["workload.jsonl", "--validate"])
+    assert "--allow-app-database" in capsys.readouterr().err
+
+
+def test_is_app_database_matches_local_host_aliases(monkeypatch):
+    monkeypatch.setattr(config, "DB_HOST", "localhost")
+    assert index_advisor.is_app_database("127.0.0.1", config.DB_PORT, config.DB_NAME)
+    assert not index_advisor.is_app_database("127.0.0.1", config.DB_PORT, "pipeline_test")
+    assert not index_advisor.is_app_database("127.0.0.1", config.DB_PORT + 1, config.DB_NAME)
@@ -0,0 +1,44 @@
+"""大模型调用网关回归测试"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.llm_gateway import CircuitBreaker, CircuitOpenError, LLMGateway
+
+
+class SlowClient:
+    """第一次调用挂起，之后立即成功"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def call(self, **params):
+        self.calls += 1
+        if self.calls == 1:
+            await asyncio.sleep(3600)
+        return SimpleNamespace(status_code=200, output=SimpleNamespace(text="SELECT 1"), message="")
+
+
+def test_cancelled_probe_releases_half_open_breaker():
+    async def scenario():
+        gateway = LLMGateway(SlowClient())
+        gateway.hedge_enabled = False
+        gateway.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        gateway.breaker.record_failure()
+        assert gateway.breaker.state == CircuitBreaker.HALF_OPEN
+
+        probe = asyncio.ensure_future(gateway.call({"model": "m"}, timeout=3600))
+        await asyncio.sleep(0.01)
+        with pytest.raises(CircuitOpenError):
+            await gateway.call({"model": "m"})
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        response = await gateway.call({"model": "m"})
+        assert response.status_code == 200
+        assert gateway.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+"""键集分页判定测试"""
+
+import pytest
+
+from app.services.pagination import pageable_base_sql
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM pipeline_info WHERE city = '广州'", "SELECT * FROM pipeline_info WHERE city = '广州'"),
+    ("SELECT * FROM pipeline_info ORDER BY id", "SELECT * FROM pipeline_info"),
+    ("SELECT p.id, p.city FROM pipeline_info p ORDER BY p.id ASC", "SELECT p.id, p.city FROM pipeline_info AS p"),
+    (
+        "SELECT id, city FROM pipeline_info WHERE location LIKE '%group by%'",
+        "SELECT id, city FROM pipeline_info WHERE location LIKE '%group by%'"
+    )
+])
+def test_pageable(sql, expected):
+    assert pageable_base_sql(sql) == expected
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT city FROM pipeline_info",
+    "SELECT city AS id FROM pipeline_info",
+    "SELECT id AS pipeline_id FROM pipeline_info",
+    "SELECT *, city FROM pipeline_info",
+    "SELECT * FROM pipeline_info a JOIN pipeline_info b ON a.city = b.city",
+    "SELECT DISTINCT id, city FROM pipeline_info",
+    "SELECT id, COUNT(*) FROM pipeline_info GROUP BY id",
+    "SELECT * FROM pipeline_info LIMIT 10",
+    "SELECT * FROM pipeline_info ORDER BY build_year",
+    "SELECT * FROM pipeline_info ORDER BY id DESC",
+    "SELECT * FROM (SELECT * FROM pipeline_info) AS t",
+    "SELECT id FROM pipeline_info UNION SELECT id FROM pipeline_info"
+])
+def test_not_pageable(sql):
+    assert pageable_base_sql(sql) is None
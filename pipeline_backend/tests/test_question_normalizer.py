@@ -0,0 +1,19 @@
+"""问题归一化回归测试"""
+
+from app.services.question_normalizer import normalize_question
+
+
+def test_decimal_point_is_kept():
+    decimal = normalize_question("管道长度大于1.5公里的数量")
+    integer = normalize_question("管道长度大于15公里的数量")
+    assert decimal == "管道长度大于1.5公里数量"
+    assert decimal != integer
+
+
+def test_separators_between_digits_are_kept():
+    assert normalize_question("编号1,2、3的管道") == "编号1,2、3管道"
+    assert normalize_question("1.5。") == "1.5"
+
+
+def test_punctuation_outside_numbers_is_dropped():
+    assert normalize_question("请问，广东省的燃气管道有多少？") == "广东燃气管道有多少"
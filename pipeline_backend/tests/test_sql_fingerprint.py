@@ -0,0 +1,27 @@
+"""查询摘要测试"""
+
+import pytest
+
+from app.services.sql_fingerprint import query_digest
+
+
+@pytest.mark.parametrize("first, second", [
+    ("SELECT * FROM pipeline_info WHERE id IN (1, 2, 3)", "SELECT * FROM pipeline_info WHERE id IN (7)"),
+    ("SELECT * FROM pipeline_info WHERE city NOT IN ('a', 'b')", "select * from pipeline_info where city not in ('c')")
+])
+def test_in_lists_share_a_digest(first, second):
+    assert query_digest(first) == query_digest(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("SELECT IF(build_year > 2000, 1, 0) FROM pipeline_info", "SELECT IF(build_year > 2000, 1) FROM pipeline_info"),
+    ("SELECT * FROM pipeline_info LIMIT 0, 1000", "SELECT * FROM pipeline_info LIMIT 1000")
+])
+def test_other_value_lists_are_not_folded(first, second):
+    assert query_digest(first)[1] != query_digest(second)[1]
+
+
+def test_digest_text():
+    assert query_digest("SELECT * FROM pipeline_info WHERE id IN (1, 2) LIMIT 0, 10")[1] == (
+        "SELECT * FROM pipeline_info WHERE id IN (?+) LIMIT ?, ?"
+    )
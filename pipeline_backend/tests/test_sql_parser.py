@@ -0,0 +1,59 @@
+"""SQL解析与白名单校验测试"""
+
+import pytest
+
+from app.services.sql_parser import SQLValidationError, parse_sql, validate_sql
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT created_at, updated_at FROM pipeline_info WHERE updated_at > '2020-01-01'",
+    "SELECT province, COUNT(*) AS count FROM pipeline_info WHERE city LIKE '%州' GROUP BY province",
+    "SELECT id FROM pipeline_info WHERE location = 'update; drop table'",
+    "SELECT id FROM pipeline_info;"
+])
+def test_accepts_valid_select(sql):
+    validate_sql(sql)
+
+
+@pytest.mark.parametrize("sql, message", [
+    ("SELECT SLEEP(5) FROM pipeline_info", "SLEEP"),
+    ("SELECT LOAD_FILE('/etc/passwd') FROM pipeline_info", "LOAD_FILE"),
+    ("SELECT id FROM pipeline_info /*!50000 UNION SELECT 1 */", "可执行注释"),
+    ("SELECT id FROM pipeline_info; DROP TABLE pipeline_info", "多余内容"),
+    ("SELECT id FROM pipeline_info -- x\n; DELETE FROM pipeline_info", "多余内容"),
+    ("SELECT id FROM pipeline_info INTO OUTFILE '/tmp/x'", "多余内容"),
+    ("UPDATE pipeline_info SET city = 'x'", "只允许SELECT"),
+    ("SELECT * FROM users", "users"),
+    ("SELECT password FROM pipeline_info", "password"),
+    ("SELECT id FROM pipeline_info WHERE id = %s", "占位符")
+])
+def test_rejects_unsafe_sql(sql, message):
+    with pytest.raises(SQLValidationError, match=message):
+        validate_sql(sql)
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM pipeline_info", "SELECT * FROM pipeline_info LIMIT 1000"),
+    ("SELECT * FROM pipeline_info LIMIT 5000", "SELECT * FROM pipeline_info LIMIT 1000"),
+    ("SELECT * FROM pipeline_info LIMIT 10, 5000", "SELECT * FROM pipeline_info LIMIT 10, 1000"),
+    ("SELECT * FROM pipeline_info LIMIT 10, 20", "SELECT * FROM pipeline_info LIMIT 10, 20"),
+    ("SELECT COUNT(*) FROM pipeline_info", "SELECT COUNT(*) FROM pipeline_info"),
+    # 分组数上限 35 * 51，超过1000时仍注入LIMIT
+    (
+        "SELECT province, pipeline_type, COUNT(*) FROM pipeline_info GROUP BY province, pipeline_type",
+        "SELECT province, pipeline_type, COUNT(*) FROM pipeline_info GROUP BY province, pipeline_type LIMIT 1000"
+    ),
+    (
+        "SELECT street, COUNT(*) FROM pipeline_info GROUP BY street",
+        "SELECT street, COUNT(*) FROM pipeline_info GROUP BY street LIMIT 1000"
+    )
+])
+def test_with_limit(sql, expected):
+    assert parse_sql(sql).with_limit(1000) == expected
+
+
+def test_low_cardinality_group_by_is_not_limited():
+    parsed = parse_sql("SELECT province, COUNT(*) FROM pipeline_info GROUP BY province")
+    assert parsed.group_cardinality == 35
+    assert parsed.with_limit(1000) == parsed.normalized_sql
+    assert parsed.with_limit(10).endswith("LIMIT 10")
@@ -0,0 +1,29 @@
+"""流式SQL提取器回归测试"""
+
+import pytest
+
+from app.services.llm_service import SQLStreamExtractor
+
+
+def extract(text, chunk=3):
+    extractor = SQLStreamExtractor()
+    for start in range(0, len(text), chunk):
+        if extractor.feed(text[start:start + chunk]):
+            break
+    return extractor.sql
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 1000])
+def test_select_in_prose_is_not_a_statement_start(chunk):
+    text = "Here is the select statement you need:\n```sql\nSELECT id FROM pipeline_info LIMIT 5\n```\nDone."
+    assert extract(text, chunk) == "SELECT id FROM pipeline_info LIMIT 5"
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 1000])
+def test_blank_line_does_not_end_statement(chunk):
+    text = "SELECT province,\n COUNT(*) AS c\nFROM pipeline_info\n\nGROUP BY province;\n说明：按省份统计"
+    assert extract(text, chunk) == "SELECT province,\n COUNT(*) AS c\nFROM pipeline_info\n\nGROUP BY province"
+
+
+def test_statement_without_terminator_is_not_finished():
+    assert extract("SELECT * FROM pipeline_info", 5) is None
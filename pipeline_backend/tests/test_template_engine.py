@@ -0,0 +1,76 @@
+"""规则模板引擎回归测试"""
+
+import pytest
+
+from app.services.entity_index import EntityIndex
+from app.services.template_engine import TemplateEngine
+
+VALUES = {
+    "province": ["广东", "浙江"],
+    "city": ["广州", "杭州"],
+    "pipeline_type": ["燃气管道", "供水管道"],
+    "disaster_type": ["地震"],
+    "geological_feature": ["软土"],
+    "laying_method": ["直埋"]
+}
+
+
+@pytest.fixture(scope="module")
+def engine(fake_database):
+    index = EntityIndex(fake_database(VALUES, max_id=100))
+    index.refresh()
+    return TemplateEngine(index)
+
+
+@pytest.mark.parametrize("question", [
+    "不是广东省的燃气管道有多少",
+    "非燃气管道数量",
+    "燃气管道不在广东的数量",
+    "除了广东以外的燃气管道数量",
+    "广东以外的燃气管道有哪些"
+])
+def test_negated_entities_are_not_matched(engine, question):
+    assert engine.match(question) is None
+
+
+def test_positive_question_still_matches(engine):
+    match = engine.match("广东省的燃气管道有多少")
+    assert match is not None
+    assert match.filters == {"province": ["广东"], "pipeline_type": ["燃气管道"]}
+
+
+@pytest.mark.parametrize("question", ["2000年到2010年建成的燃气管道数量", "2000年至2010年的燃气管道数量"])
+def test_year_range_with_chinese_connector(engine, question):
+    match = engine.match(question)
+    assert match is not None
+    assert "build_year BETWEEN %s AND %s" in match.template
+    assert match.filters["build_year"] == (2000, 2010)
+
+
+@pytest.mark.parametrize("question", [
+    "没有地震灾害的管道数量",
+    "无地震灾害的燃气管道数量",
+    "未采用直埋敷设的管道数量",
+    "没有发生地震的燃气管道有哪些"
+])
+def test_negation_with_mei_wu_wei_is_not_matched(engine, question):
+    assert engine.match(question) is None
+
+
+def test_you_after_mei_is_not_counted_as_filler(engine):
+    match = engine.match("广东没有记录的燃气管道数量")
+    assert match is not None
+    # 归一化后为 "广东没有记录燃气管道数量"，仅 "没有" 两字未被识别
+    assert match.confidence == round(10 / 12, 4)
+
+
+@pytest.mark.parametrize("question", ["2000年前后建成的燃气管道数量", "2000年左右的燃气管道有哪些"])
+def test_approximate_year_is_not_matched(engine, question):
+    assert engine.match(question) is None
+
+
+def test_year_before_still_matches(engine):
+    match = engine.match("2000年前建成的燃气管道数量")
+    assert match is not None
+    assert match.filters["build_year"] == (2000,)
+    assert "build_year < %s" in match.template
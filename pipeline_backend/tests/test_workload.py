@@ -0,0 +1,36 @@
+"""查询负载记录回归测试"""
+
+from app.services.workload import WorkloadRecorder
+
+
+def make_recorder(max_fingerprints=2):
+    return WorkloadRecorder(path="", max_fingerprints=max_fingerprints, slow_query_log_path="", slow_query_threshold=0)
+
+
+def test_least_recently_seen_digest_is_evicted():
+    recorder = make_recorder()
+    recorder.record("SELECT * FROM pipeline_info WHERE province = '广东'", None, 0.1, 1)
+    recorder.record("SELECT * FROM pipeline_info WHERE city = '广州'", None, 0.1, 1)
+    # 再次出现，使province摘要成为最近出现
+    recorder.record("SELECT * FROM pipeline_info WHERE province = '浙江'", None, 0.1, 1)
+    recorder.record("SELECT COUNT(*) FROM pipeline_info", None, 0.1, 1)
+
+    summary = recorder.get_summary()
+    digests = {entry["digest"] for entry in summary["top"]}
+    assert summary["evicted"] == 1
+    assert digests == {
+        "SELECT * FROM pipeline_info WHERE province = ?",
+        "SELECT count(*) FROM pipeline_info"
+    }
+
+
+def test_failed_executions_are_recorded():
+    recorder = make_recorder()
+    recorder.record("SELECT * FROM pipeline_info WHERE province = '广东'", None, 0.2, 3)
+    recorder.record("SELECT * FROM pipeline_info WHERE province = '浙江'", None, 15.0, 0, error="(3024, 'timeout')")
+
+    entry = recorder.get_summary()["top"][0]
+    assert entry["count"] == 2
+    assert entry["error_count"] == 1
+    assert entry["last_error"] == "(3024, 'timeout')"
+    assert entry["max_latency"] == 15.0